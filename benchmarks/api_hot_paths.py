@@ -0,0 +1,319 @@
+"""
+Benchmark the API hot paths in process, through the full Django/DRF stack
+
+A separate test database is created (and destroyed afterwards, unless --keepdb), seeded
+with --wallets wallets and --transactions transactions, and each case is timed with the
+DRF test client. Results are printed and can be written as JSON and compared with an
+earlier run:
+
+    POSTGRES_HOST=localhost python benchmarks/api_hot_paths.py --output after.json \\
+        --compare before.json
+    python benchmarks/api_hot_paths.py --sqlite /tmp/bench.sqlite3
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wallet_api.settings")
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+HEADERS = {
+    "Content-Type": "application/vnd.api+json",
+    "Accept": "application/vnd.api+json",
+}
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "ops_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 3),
+    }
+
+
+def timed_requests(client, make_request, iterations, before=None):
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for index in range(iterations):
+        if before is not None:
+            before()
+        request_started = time.perf_counter()
+        response = make_request(index)
+        latencies.append(time.perf_counter() - request_started)
+        errors += response.status_code >= 400
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def transaction_document(wallet_id, txid, amount):
+    return {
+        "data": {
+            "type": "Transaction",
+            "attributes": {"txid": txid, "amount": str(amount)},
+            "relationships": {
+                "wallet": {"data": {"type": "Wallet", "id": str(wallet_id)}}
+            },
+        }
+    }
+
+
+def seed(wallet_count, transaction_count, batch=5000):
+    from wallets.models import Transaction, Wallet
+    from wallets.services import bulk_create_transactions
+
+    wallets = Wallet.objects.bulk_create(
+        [Wallet(label=f"Benchmark wallet {index}") for index in range(wallet_count)]
+    )
+    rng = random.Random(0)
+    for first in range(0, transaction_count, batch):
+        bulk_create_transactions(
+            [
+                Transaction(
+                    wallet=rng.choice(wallets),
+                    txid=f"seed-{index}",
+                    amount=Decimal(rng.randint(1, 1000)),
+                )
+                for index in range(first, min(first + batch, transaction_count))
+            ]
+        )
+    return [wallet.pk for wallet in wallets]
+
+
+def clear_caches():
+    from django.core.cache import cache
+
+    from wallets.cache import wallet_cache
+
+    cache.clear()
+    wallet_cache.clear_local()
+
+
+def run_cases(wallet_ids, iterations):
+    from rest_framework.test import APIClient
+
+    client = APIClient(headers=HEADERS)
+    rng = random.Random(1)
+    run = time.time_ns()
+    results = {}
+
+    results["transaction_create"] = timed_requests(
+        client,
+        lambda index: client.post(
+            "/api/transactions/",
+            transaction_document(rng.choice(wallet_ids), f"create-{run}-{index}", 1),
+            format="json",
+            headers=HEADERS,
+        ),
+        iterations,
+    )
+
+    list_urls = {
+        "transaction_list": "/api/transactions/?page[cursor]=",
+        "transaction_list_page_number": "/api/transactions/",
+        "transaction_filter_wallet": "/api/transactions/?filter[wallet]={wallet}"
+        "&page[cursor]=",
+        "transaction_filter_amount": "/api/transactions/?filter[amount_min]=100"
+        "&filter[amount_max]=200&page[cursor]=",
+        "wallet_list": "/api/wallets/",
+    }
+    for name, url in list_urls.items():
+        results[name] = timed_requests(
+            client,
+            lambda index, url=url: client.get(
+                url.format(wallet=rng.choice(wallet_ids))
+            ),
+            iterations,
+            before=clear_caches,
+        )
+
+    results["wallet_retrieve"] = timed_requests(
+        client,
+        lambda index: client.get(f"/api/wallets/{rng.choice(wallet_ids)}/"),
+        iterations,
+        before=clear_caches,
+    )
+    results["wallet_retrieve_cached"] = timed_requests(
+        client, lambda index: client.get(f"/api/wallets/{wallet_ids[0]}/"), iterations
+    )
+
+    # Polling with If-None-Match, answered with 304 from a probe
+    not_modified_urls = {
+        "wallet_retrieve_not_modified": f"/api/wallets/{wallet_ids[0]}/",
+        "transaction_list_not_modified": "/api/transactions/?filter[wallet]="
+        f"{wallet_ids[0]}&page[cursor]=",
+    }
+    for name, url in not_modified_urls.items():
+        etag = client.get(url)["ETag"]
+        results[name] = timed_requests(
+            client,
+            lambda index, url=url, etag=etag: client.get(
+                url, headers={"If-None-Match": etag}
+            ),
+            iterations,
+            before=clear_caches,
+        )
+    return results
+
+
+def concurrent_deposits(wallet_id, threads, deposits):
+    """
+    Deposits to one wallet from several threads, each with its own connection
+    """
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    run = time.time_ns()
+
+    def worker(number):
+        client = APIClient(headers=HEADERS)
+        try:
+            for index in range(deposits):
+                started = time.perf_counter()
+                try:
+                    response = client.post(
+                        "/api/transactions/",
+                        transaction_document(
+                            wallet_id, f"deposit-{run}-{number}-{index}", 1
+                        ),
+                        format="json",
+                        headers=HEADERS,
+                    )
+                    failed = response.status_code >= 400
+                except Exception:
+                    failed = True
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    errors.append(failed)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    result = summarize(latencies, time.perf_counter() - started, sum(errors))
+    result["threads"] = threads
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'case':<30}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}", end="")
+    print(f"{'p50 change':>12}" if baseline else "")
+    for name, result in results.items():
+        print(
+            f"{name:<30}{result['ops_per_s']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['errors']:>8}",
+            end="",
+        )
+        before = (baseline or {}).get(name)
+        if before and before["p50_ms"]:
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            print(f"{change:>+11.1f}%")
+        else:
+            print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=200, help="Requests per case")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument(
+        "--deposits", type=int, default=50, help="Concurrent deposits per thread"
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument("--sqlite", help="Use a SQLite database file instead")
+    parser.add_argument(
+        "--keepdb", action="store_true", help="Keep the benchmark database"
+    )
+    args = parser.parse_args()
+
+    if args.sqlite:
+        settings.DATABASES["default"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": args.sqlite,
+            "TEST": {"NAME": args.sqlite},
+        }
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=args.keepdb)
+    try:
+        seed_started = time.perf_counter()
+        wallet_ids = seed(args.wallets, args.transactions)
+        seed_seconds = time.perf_counter() - seed_started
+
+        results = run_cases(wallet_ids, args.iterations)
+        results["concurrent_deposits"] = concurrent_deposits(
+            wallet_ids[0], args.threads, args.deposits
+        )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+    document = {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "seed_seconds": round(seed_seconds, 2),
+            "parameters": {
+                name: getattr(args, name)
+                for name in ("wallets", "transactions", "iterations", "threads")
+            }
+            | {"deposits": args.deposits},
+        },
+        "results": results,
+    }
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+    print_results(results, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark request latency per database connection mode: per request, persistent, pooled
+
+Each mode runs in a fresh interpreter configured through the `POSTGRES_*` environment
+variables, and calls the WSGI application directly, so that connections are closed or
+returned to the pool at the end of every request as under a real server (the test client
+skips that). A separate test database is created and seeded with --wallets wallets and
+--transactions transactions, and the connections opened per mode are reported:
+
+    POSTGRES_HOST=localhost python benchmarks/connections.py --threads 8
+    python benchmarks/connections.py --modes per_request,pooled --output results.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wallet_api.settings")
+
+import django  # noqa: E402
+
+from benchmarks.api_hot_paths import git_revision, seed, summarize  # noqa: E402
+
+MODES = {
+    "per_request": {"POSTGRES_CONN_MAX_AGE": "0", "POSTGRES_POOL": "false"},
+    "persistent": {"POSTGRES_CONN_MAX_AGE": "60", "POSTGRES_POOL": "false"},
+    "pooled": {"POSTGRES_POOL": "true"},
+}
+
+WORKER = """
+import json, sys, threading, time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.wsgi import get_wsgi_application
+
+application = get_wsgi_application()
+
+from wallets.metrics import DB_CONNECTIONS, get_pool_stats
+
+path, threads, requests = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+query = path.partition("?")[2]
+latencies, errors = [], []
+lock = threading.Lock()
+
+
+def request():
+    environ = {
+        "PATH_INFO": path.partition("?")[0],
+        "QUERY_STRING": query,
+        "HTTP_HOST": "localhost",
+        "HTTP_ACCEPT": "application/vnd.api+json",
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers: statuses.append(status))
+    try:
+        b"".join(response)
+    finally:
+        # Fires request_finished, which closes or returns the connection
+        response.close()
+    return int(statuses[0].split()[0])
+
+
+def worker():
+    for _ in range(requests):
+        started = time.perf_counter()
+        status = request()
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            errors.append(status >= 400)
+
+
+request()  # Warm up imports and the pool
+DB_CONNECTIONS.values.clear()
+pool = [threading.Thread(target=worker) for _ in range(threads)]
+started = time.perf_counter()
+for thread in pool:
+    thread.start()
+for thread in pool:
+    thread.join()
+print(json.dumps({
+    "latencies": latencies,
+    "errors": sum(errors),
+    "elapsed": time.perf_counter() - started,
+    "connections": int(sum(DB_CONNECTIONS.values.values())),
+    "pool": get_pool_stats().get("default"),
+}))
+"""
+
+
+def run_mode(mode, database, path, threads, requests):
+    env = os.environ | MODES[mode] | {"POSTGRES_DB": database}
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER, path, str(threads), str(requests)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env=env,
+    ).stdout
+    sample = json.loads(output.splitlines()[-1])
+    result = summarize(sample["latencies"], sample["elapsed"], sample["errors"])
+    result["connections_opened"] = sample["connections"]
+    if sample["pool"]:
+        pool = sample["pool"]
+        # Django sees a new connection per checkout, the pool opens far fewer
+        result["checkouts"] = sample["connections"]
+        result["connections_opened"] = pool.get("connections_num", 0)
+        # Checkouts only wait once every pooled connection is in use
+        result["pool_size"] = pool["pool_size"]
+        result["pool_waits"] = pool.get("requests_queued", 0)
+        result["pool_wait_ms"] = pool.get("requests_wait_ms", 0)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--wallets", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per thread")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument(
+        "--modes", default=",".join(MODES), help="Comma separated connection modes"
+    )
+    parser.add_argument("--path", default="/api/transactions/?page[cursor]=")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument(
+        "--keepdb", action="store_true", help="Keep the benchmark database"
+    )
+    args = parser.parse_args()
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=args.keepdb)
+    try:
+        database = connection.settings_dict["NAME"]
+        seed(args.wallets, args.transactions)
+        connection.close()
+        results = {
+            mode: run_mode(mode, database, args.path, args.threads, args.requests)
+            for mode in args.modes.split(",")
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+    print(f"{'mode':<14}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}", end="")
+    print(f"{'connections':>13}{'pool waits':>12}")
+    for mode, result in results.items():
+        print(
+            f"{mode:<14}{result['ops_per_s']:>10.1f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['errors']:>8}"
+            f"{result['connections_opened']:>13}{result.get('pool_waits', '-'):>12}"
+        )
+    if args.output:
+        document = {
+            "meta": {
+                "revision": git_revision(),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "parameters": {
+                    name: getattr(args, name)
+                    for name in ("wallets", "transactions", "requests", "threads")
+                }
+                | {"path": args.path},
+            },
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
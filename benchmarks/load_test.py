@@ -0,0 +1,162 @@
+"""
+Compare throughput and latency of the sync (WSGI) and async (ASGI) read endpoints
+
+Start both servers first, e.g. with `docker compose up web web-async`, then:
+
+    python benchmarks/load_test.py --concurrency 500 --requests 20000
+
+Every client keeps its connection open and sends requests back to back. Only the
+standard library is used, so the script runs anywhere.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+PATHS = {
+    "wallet-detail": ("/api/wallets/{wallet}/", "/api/async/wallets/{wallet}/"),
+    "wallet-list": (
+        "/api/wallets/",
+        "/api/async/wallets/?page[cursor]=",
+    ),
+    "transaction-list": (
+        "/api/transactions/?page[cursor]=",
+        "/api/async/transactions/?page[cursor]=",
+    ),
+}
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+        elif name == "connection" and "close" in value.lower():
+            keep_alive = False
+
+    if not chunked:
+        await reader.readexactly(length)
+        return status, keep_alive
+    while True:
+        size = int((await reader.readline()).split(b";")[0], 16)
+        await reader.readexactly(size + 2)
+        if not size:
+            return status, keep_alive
+
+
+async def client(url, path, deadline, counter, latencies, errors):
+    parts = urlsplit(url)
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        "Accept: application/vnd.api+json\r\n"
+        "\r\n"
+    ).encode()
+    reader = writer = None
+    while counter[0] > 0 and time.monotonic() < deadline:
+        counter[0] -= 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    parts.hostname, parts.port or 80
+                )
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                # Sync gunicorn workers close the connection after every response
+                writer.close()
+                reader = writer = None
+        except (
+            OSError,
+            ValueError,
+            asyncio.IncompleteReadError,
+        ) as exc:
+            errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, path, concurrency, requests, duration):
+    latencies = []
+    errors = []
+    counter = [requests]
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client(url, path, deadline, counter, latencies, errors)
+            for _ in range(concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": p99 * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sync-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--async-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--endpoint", choices=PATHS, action="append", dest="endpoints")
+    parser.add_argument("--wallet", type=int, default=1, help="Wallet id to read")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per run")
+    args = parser.parse_args()
+
+    print(
+        f"{'endpoint':<18}{'server':<8}{'requests':>10}{'errors':>8}"
+        f"{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+    )
+    for endpoint in args.endpoints or list(PATHS):
+        for server, url, path in zip(
+            ("sync", "async"), (args.sync_url, args.async_url), PATHS[endpoint]
+        ):
+            result = asyncio.run(
+                run(
+                    url,
+                    path.format(wallet=args.wallet),
+                    args.concurrency,
+                    args.requests,
+                    args.duration,
+                )
+            )
+            print(
+                f"{endpoint:<18}{server:<8}{result['requests']:>10}"
+                f"{result['errors']:>8}{result['rps']:>10.1f}"
+                f"{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark inserts and date-range reads on a plain and a monthly partitioned table
+
+Both tables are temporary copies of the transaction table (nothing is written to the
+real one), indexed like it. The partitioned copy keeps txids unique through a registry
+table and trigger, as `partition_transactions convert` does. PostgreSQL only:
+
+    POSTGRES_HOST=localhost python benchmarks/partitioning.py --rows 5000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wallet_api.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+INSERT_SQL = """
+INSERT INTO {table} (id, wallet_id, txid, amount, created_at, updated_at)
+SELECT i, i %% 1000 + 1, 'tx-' || i, 1,
+       timestamptz '2024-01-01' + i * %s * interval '1 second', now()
+FROM generate_series(%s, %s) AS i
+"""
+
+# Date-range reads as the API runs them with created_after/created_before
+QUERIES = {
+    "month count": (
+        "SELECT count(*) FROM {table} "
+        "WHERE created_at >= '2024-06-01' AND created_at < '2024-07-01'"
+    ),
+    "wallet month": (
+        "SELECT * FROM {table} WHERE wallet_id = 7 "
+        "AND created_at >= '2024-06-01' AND created_at < '2024-07-01' "
+        "ORDER BY created_at DESC LIMIT 100"
+    ),
+    "day page": (
+        "SELECT * FROM {table} "
+        "WHERE created_at >= '2024-06-15' AND created_at < '2024-06-16' "
+        "ORDER BY created_at, id LIMIT 100"
+    ),
+}
+
+
+def setup(cursor, months):
+    cursor.execute(
+        "CREATE TEMP TABLE bench_plain (LIKE wallets_transaction) ON COMMIT DROP"
+    )
+    cursor.execute("ALTER TABLE bench_plain ADD PRIMARY KEY (id)")
+    cursor.execute("CREATE UNIQUE INDEX ON bench_plain (txid)")
+
+    cursor.execute(
+        "CREATE TEMP TABLE bench_partitioned (LIKE wallets_transaction) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    for month in range(months):
+        cursor.execute(
+            f"CREATE TEMP TABLE bench_partitioned_{month} PARTITION OF "
+            "bench_partitioned FOR VALUES "
+            f"FROM (timestamptz '2024-01-01' + interval '{month} month') "
+            f"TO (timestamptz '2024-01-01' + interval '{month + 1} month') "
+            "ON COMMIT DROP"
+        )
+    cursor.execute("ALTER TABLE bench_partitioned ADD PRIMARY KEY (id, created_at)")
+    cursor.execute(
+        "CREATE TEMP TABLE bench_txid (txid varchar(255) PRIMARY KEY) ON COMMIT DROP"
+    )
+    cursor.execute(
+        """
+        CREATE FUNCTION pg_temp.bench_txid_sync() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO bench_txid (txid) VALUES (NEW.txid);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    cursor.execute(
+        "CREATE TRIGGER bench_txid_sync AFTER INSERT ON bench_partitioned "
+        "FOR EACH ROW EXECUTE FUNCTION pg_temp.bench_txid_sync()"
+    )
+
+    for table in ("bench_plain", "bench_partitioned"):
+        cursor.execute(f"CREATE INDEX ON {table} (wallet_id, id)")
+        cursor.execute(f"CREATE INDEX ON {table} (created_at, id)")
+
+
+def insert(cursor, table, rows, step, batch):
+    # Rows are spread evenly over the months, `step` seconds apart
+    started = time.perf_counter()
+    for first in range(1, rows + 1, batch):
+        last = min(first + batch - 1, rows)
+        cursor.execute(INSERT_SQL.format(table=table), [step, first, last])
+    return rows / (time.perf_counter() - started)
+
+
+def explain(cursor, sql):
+    cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+    (result,) = cursor.fetchone()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Execution Time"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--batch", type=int, default=10_000, help="Rows per INSERT")
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        sys.exit("This benchmark needs PostgreSQL")
+
+    step = args.months * 28 * 24 * 3600 / args.rows
+    with connection.cursor() as cursor, transaction.atomic():
+        setup(cursor, args.months)
+
+        print(f"{'table':<20}{'inserts/s':>12}")
+        for table in ("bench_plain", "bench_partitioned"):
+            rate = insert(cursor, table, args.rows, step, args.batch)
+            cursor.execute(f"ANALYZE {table}")
+            print(f"{table:<20}{rate:>12.0f}")
+
+        print(f"\n{'query':<16}{'plain ms':>12}{'partitioned ms':>16}")
+        for name, sql in QUERIES.items():
+            plain = explain(cursor, sql.format(table="bench_plain"))
+            partitioned = explain(cursor, sql.format(table="bench_partitioned"))
+            print(f"{name:<16}{plain:>12.2f}{partitioned:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark txid and label search modes with and without the search indexes
+
+Copies of the transaction and wallet tables are filled with generated rows in
+temporary tables (nothing is written to the real tables), indexed like the real
+ones, and every search mode is timed with EXPLAIN ANALYZE. PostgreSQL only:
+
+    POSTGRES_HOST=localhost python benchmarks/search.py --rows 10000000
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wallet_api.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+# Predicates as Django compiles the filter lookups on PostgreSQL
+TRANSACTION_SEARCHES = {
+    "txid_exact": "txid = %s",
+    "txid_prefix": "txid::text LIKE %s",
+    "txid": "UPPER(txid::text) LIKE UPPER(%s)",
+}
+WALLET_SEARCHES = {
+    "label_exact": "UPPER(label::text) = UPPER(%s)",
+    "label_prefix": "UPPER(label::text) LIKE UPPER(%s)",
+    "label": "UPPER(label::text) LIKE UPPER(%s)",
+}
+
+
+def trigram_installed(cursor) -> bool:
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+def setup(cursor, rows, wallet_rows):
+    cursor.execute(
+        "CREATE TEMP TABLE bench_transaction (LIKE wallets_transaction) "
+        "ON COMMIT DROP"
+    )
+    cursor.execute(
+        """
+        INSERT INTO bench_transaction
+            (id, wallet_id, txid, amount, created_at, updated_at)
+        SELECT i, i %% 1000 + 1, 'tx-' || lpad(i::text, 10, '0') || '-' || md5(i::text),
+               1, now(), now()
+        FROM generate_series(1, %s) AS i
+        """,
+        [rows],
+    )
+    cursor.execute(
+        "CREATE TEMP TABLE bench_wallet (LIKE wallets_wallet) ON COMMIT DROP"
+    )
+    cursor.execute(
+        """
+        INSERT INTO bench_wallet (id, label, balance, created_at, updated_at)
+        SELECT i, 'Wallet ' || md5(i::text), 0, now(), now()
+        FROM generate_series(1, %s) AS i
+        """,
+        [wallet_rows],
+    )
+
+    # The same indexes the migrations create on the real tables
+    indexes = [
+        "CREATE UNIQUE INDEX ON bench_transaction (txid)",
+        "CREATE INDEX ON bench_transaction (txid varchar_pattern_ops)",
+        "CREATE INDEX ON bench_wallet (UPPER(label::text) text_pattern_ops)",
+    ]
+    if trigram_installed(cursor):
+        indexes += [
+            "CREATE INDEX ON bench_transaction "
+            "USING gin (UPPER(txid::text) gin_trgm_ops)",
+            "CREATE INDEX ON bench_wallet USING gin (UPPER(label::text) gin_trgm_ops)",
+        ]
+    else:
+        print("pg_trgm is not installed, substring searches have no index")
+    for statement in indexes:
+        cursor.execute(statement)
+    cursor.execute("ANALYZE bench_transaction")
+    cursor.execute("ANALYZE bench_wallet")
+
+
+def explain(cursor, table, predicate, value, use_indexes):
+    enabled = "on" if use_indexes else "off"
+    cursor.execute(f"SET LOCAL enable_indexscan = {enabled}")
+    cursor.execute(f"SET LOCAL enable_bitmapscan = {enabled}")
+    cursor.execute(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) SELECT * FROM {table} WHERE {predicate} "
+        "LIMIT 100",
+        [value],
+    )
+    (result,) = cursor.fetchone()
+    if isinstance(result, str):
+        result = json.loads(result)
+    node = result[0]["Plan"]
+    while node.get("Plans"):
+        node = node["Plans"][0]
+    return result[0]["Execution Time"], node["Node Type"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--wallet-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        sys.exit("This benchmark needs PostgreSQL")
+
+    middle = args.rows // 2
+    wallet_middle = args.wallet_rows // 2
+    with connection.cursor() as cursor, transaction.atomic():
+        cursor.execute("SELECT md5(%s::text), md5(%s::text)", [middle, wallet_middle])
+        txid_hash, label_hash = cursor.fetchone()
+        values = {
+            "txid_exact": f"tx-{middle:010d}-{txid_hash}",
+            "txid_prefix": f"tx-{middle // 100:08d}%",
+            "txid": f"%{txid_hash[8:16]}%",
+            "label_exact": f"wallet {label_hash}",
+            "label_prefix": f"wallet {label_hash[:6]}%",
+            "label": f"%{label_hash[10:18]}%",
+        }
+
+        setup(cursor, args.rows, args.wallet_rows)
+
+        print(f"{'search':<14}{'indexed ms':>12}{'plan':>22}{'scan ms':>12}")
+        for table, searches in (
+            ("bench_transaction", TRANSACTION_SEARCHES),
+            ("bench_wallet", WALLET_SEARCHES),
+        ):
+            for name, predicate in searches.items():
+                indexed, node = explain(cursor, table, predicate, values[name], True)
+                scan, _ = explain(cursor, table, predicate, values[name], False)
+                print(f"{name:<14}{indexed:>12.2f}{node:>22}{scan:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
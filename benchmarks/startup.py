@@ -0,0 +1,93 @@
+"""
+Benchmark worker startup: import time, resident memory and loaded modules per profile
+
+Every run starts a fresh interpreter that loads the WSGI application and the URLconf,
+as a worker does before serving its first request, and reports the time taken, the
+peak RSS and the number of imported modules. The median of --runs is printed:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --settings wallet_api.settings_api --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = """
+import json, resource, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+print(json.dumps({
+    "load_ms": (time.perf_counter() - started) * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def run_worker(settings_module):
+    env = os.environ | {"DJANGO_SETTINGS_MODULE": settings_module}
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env=env,
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def measure(settings_module, runs):
+    samples = [run_worker(settings_module) for _ in range(runs)]
+    return {
+        name: round(statistics.median(sample[name] for sample in samples), 1)
+        for name in ("process_ms", "load_ms", "rss_mb", "modules")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--settings",
+        action="append",
+        help="Settings module to compare, may be repeated "
+        "(default: wallet_api.settings and wallet_api.settings_api)",
+    )
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {
+        settings_module: measure(settings_module, args.runs)
+        for settings_module in args.settings
+        or ["wallet_api.settings", "wallet_api.settings_api"]
+    }
+
+    print(f"{'settings':<28}{'process ms':>12}{'load ms':>10}{'RSS MB':>10}", end="")
+    print(f"{'modules':>10}")
+    for settings_module, result in results.items():
+        print(
+            f"{settings_module:<28}{result['process_ms']:>12.1f}"
+            f"{result['load_ms']:>10.1f}{result['rss_mb']:>10.1f}"
+            f"{result['modules']:>10.0f}"
+        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Concurrency benchmark for wallet transfers
+
+Threads move money between a small pool of wallets in random directions, either with
+`create_transfers` or with the old two separate transaction creates. Reports
+throughput, latency, deadlocks and whether the total balance was conserved.
+Wallets are created for the run and deleted afterwards. Use a development database:
+
+    POSTGRES_HOST=localhost python benchmarks/transfer_concurrency.py --threads 32
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wallet_api.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.exceptions import ValidationError  # noqa: E402
+from django.db import OperationalError, connection  # noqa: E402
+from django.db.models import Sum  # noqa: E402
+
+from wallets.models import Transaction, Wallet  # noqa: E402
+from wallets.services import Transfer, create_transfers  # noqa: E402
+
+LABEL = "benchmark-transfer"
+
+
+def transfer(source, destination, amount, txid):
+    create_transfers(
+        [Transfer(txid=txid, source=source, destination=destination, amount=amount)]
+    )
+
+
+def two_step(source, destination, amount, txid):
+    # What clients had to do before: two requests, each in its own transaction
+    Transaction.objects.create(wallet=source, txid=f"{txid}:debit", amount=-amount)
+    Transaction.objects.create(wallet=destination, txid=f"{txid}:credit", amount=amount)
+
+
+MODES = {"transfer": transfer, "two-step": two_step}
+
+
+def worker(func, wallets, deadline, latencies, outcomes, lock):
+    rng = random.Random()
+    try:
+        while time.monotonic() < deadline:
+            source, destination = rng.sample(wallets, 2)
+            amount = Decimal(rng.randint(1, 100))
+            started = time.perf_counter()
+            try:
+                func(source, destination, amount, uuid.uuid4().hex)
+                outcome = "ok"
+            except ValidationError:
+                outcome = "insufficient"
+            except OperationalError as exc:
+                outcome = "deadlock" if "deadlock" in str(exc) else "error"
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                outcomes[outcome] += 1
+    finally:
+        connection.close()
+
+
+def run(mode, wallet_count, threads, duration):
+    wallets = [Wallet.objects.create(label=LABEL) for _ in range(wallet_count)]
+    for wallet in wallets:
+        Transaction.objects.create(
+            wallet=wallet, txid=uuid.uuid4().hex, amount=Decimal("10000")
+        )
+    expected = Decimal("10000") * wallet_count
+
+    latencies = []
+    outcomes = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    pool = [
+        threading.Thread(
+            target=worker,
+            args=(MODES[mode], wallets, deadline, latencies, outcomes, lock),
+        )
+        for _ in range(threads)
+    ]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = Wallet.objects.filter(pk__in=[wallet.pk for wallet in wallets]).aggregate(
+        total=Sum("balance")
+    )["total"]
+    Wallet.objects.filter(pk__in=[wallet.pk for wallet in wallets]).delete()
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": (
+            latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+        ),
+        "outcomes": dict(outcomes),
+        "conserved": total == expected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=MODES, action="append", dest="modes")
+    parser.add_argument("--wallets", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    args = parser.parse_args()
+
+    for mode in args.modes or list(MODES):
+        result = run(mode, args.wallets, args.threads, args.duration)
+        print(
+            f"{mode:<10} {result['ops']:>8} ops {result['ops_per_s']:>9.1f} ops/s "
+            f"p50 {result['p50_ms']:>7.1f} ms p99 {result['p99_ms']:>7.1f} ms "
+            f"conserved={result['conserved']} {result['outcomes']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
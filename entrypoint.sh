@@ -9,7 +9,7 @@ done
 echo "PostgreSQL started"
 
 # Миграции, сбор статики
-python manage.py migrate
-python manage.py collectstatic --noinput
+python manage.py migrate --settings wallet_api.settings
+python manage.py collectstatic --noinput --settings wallet_api.settings
 
 exec "$@"
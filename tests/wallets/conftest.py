@@ -1,11 +1,41 @@
+import copy
+from datetime import datetime, timezone
 from decimal import Decimal
 
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
+from wallets.cache import wallet_cache
+from wallets.metrics import reset_metrics
 from wallets.models import Transaction, Wallet
 
 
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    """
+    Adds a `replica` database, a separate copy of the schema that the primary's writes
+    do not reach, so tests can tell which database a read went to
+    """
+    from django.db import connections
+
+    replica = copy.deepcopy(connections.settings["default"])
+    test_name = replica["TEST"]["NAME"] or f"test_{replica['NAME']}"
+    replica["TEST"]["NAME"] = f"{test_name}_replica"
+    connections.settings["replica"] = replica
+
+
+@pytest.fixture(autouse=True)
+def clear_wallet_cache():
+    cache.clear()
+    wallet_cache.clear_local()
+
+
+@pytest.fixture
+def clear_metrics():
+    reset_metrics()
+
+
 @pytest.fixture
 def api_client():
     headers = {
@@ -32,9 +62,46 @@ def wallet():
     return Wallet.objects.create(label="Test Wallet")
 
 
+@pytest.fixture
+def transaction_document():
+    """
+    JSON:API document of a Transaction, with its wallet relationship and id if given
+    """
+
+    def _document(attributes, wallet=None, pk=None):
+        data = {"type": "Transaction", "attributes": attributes}
+        if wallet is not None:
+            data["relationships"] = {
+                "wallet": {"data": {"type": "Wallet", "id": str(wallet.pk)}}
+            }
+        if pk is not None:
+            data["id"] = str(pk)
+        return {"data": data}
+
+    return _document
+
+
 @pytest.fixture
 def create_transaction(wallet):
     def _create(txid: str, amount: Decimal):
         return Transaction.objects.create(wallet=wallet, txid=txid, amount=amount)
 
     return _create
+
+
+@pytest.fixture
+def booked(wallet, create_transaction):
+    """
+    The wallet with transactions on 2026-01-01 (100), 2026-01-03 (-30, +5) and
+    2026-01-05 (10)
+    """
+    for txid, amount, created_at in [
+        ("st-1", Decimal("100"), datetime(2026, 1, 1, 10, tzinfo=timezone.utc)),
+        ("st-2", Decimal("-30"), datetime(2026, 1, 3, 9, tzinfo=timezone.utc)),
+        ("st-3", Decimal("5"), datetime(2026, 1, 3, 15, tzinfo=timezone.utc)),
+        ("st-4", Decimal("10"), datetime(2026, 1, 5, 1, tzinfo=timezone.utc)),
+    ]:
+        tx = create_transaction(txid, amount)
+        Transaction.objects.filter(pk=tx.pk).update(created_at=created_at)
+    wallet.refresh_from_db()
+    return wallet
@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+import pytest
+
+from wallets.models import Transaction, Wallet
+
+
+def bulk_payload(*items):
+    return {
+        "data": [
+            {
+                "type": "Transaction",
+                "attributes": {"txid": txid, "amount": str(amount)},
+                "relationships": {
+                    "wallet": {"data": {"type": "Wallet", "id": str(wallet_id)}}
+                },
+            }
+            for wallet_id, txid, amount in items
+        ]
+    }
+
+
+@pytest.mark.django_db
+def test_bulk_create_applies_one_update_per_wallet(
+    api_client, headers, wallet, django_assert_max_num_queries
+):
+    other = Wallet.objects.create(label="Other Wallet")
+    payload = bulk_payload(
+        *[(wallet.id, f"bulk-{i}", Decimal("1.5")) for i in range(50)],
+        (wallet.id, "bulk-withdraw", Decimal("-25")),
+        (other.id, "bulk-other", Decimal("10")),
+    )
+
+    with django_assert_max_num_queries(8):
+        response = api_client.post(
+            "/api/transactions/bulk/", payload, headers=headers, format="json"
+        )
+
+    assert response.status_code == 201
+    assert len(response.json()["data"]) == 52
+
+    wallet.refresh_from_db()
+    other.refresh_from_db()
+    assert wallet.balance == Decimal("50")
+    assert other.balance == Decimal("10")
+    assert Transaction.objects.count() == 52
+
+
+@pytest.mark.django_db
+def test_bulk_create_is_all_or_nothing(api_client, headers, wallet):
+    other = Wallet.objects.create(label="Other Wallet")
+    payload = bulk_payload(
+        (wallet.id, "bulk-ok", Decimal("10")),
+        (other.id, "bulk-overdraft", Decimal("-5")),
+    )
+
+    response = api_client.post(
+        "/api/transactions/bulk/", payload, headers=headers, format="json"
+    )
+
+    assert response.status_code == 400
+    assert Transaction.objects.count() == 0
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("0.0")
+
+
+@pytest.mark.django_db
+def test_bulk_create_reports_txid_collisions_per_item(
+    api_client, headers, wallet, create_transaction
+):
+    create_transaction("bulk-existing", Decimal("10"))
+    payload = bulk_payload(
+        (wallet.id, "bulk-new", Decimal("1")),
+        (wallet.id, "bulk-existing", Decimal("1")),
+        (wallet.id, "bulk-new", Decimal("1")),
+    )
+
+    response = api_client.post(
+        "/api/transactions/bulk/", payload, headers=headers, format="json"
+    )
+
+    assert response.status_code == 400
+    errors = response.json()["errors"]
+    assert errors[0] == {}
+    assert "txid" in errors[1]
+    assert "txid" in errors[2]
+    assert Transaction.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_create_rejects_unknown_wallet(api_client, headers, wallet):
+    payload = bulk_payload((wallet.id + 100, "bulk-missing", Decimal("1")))
+
+    response = api_client.post(
+        "/api/transactions/bulk/", payload, headers=headers, format="json"
+    )
+
+    assert response.status_code == 400
+    assert Transaction.objects.count() == 0
@@ -0,0 +1,165 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.utils.http import http_date
+
+from wallets.cache import wallet_cache
+from wallets.models import Transaction, Wallet
+
+
+def clear_caches():
+    cache.clear()
+    wallet_cache.clear_local()
+
+
+def revalidate(api_client, url, etag):
+    return api_client.get(url, headers={"If-None-Match": etag})
+
+
+@pytest.mark.django_db
+def test_wallet_detail_validators(api_client, wallet, django_assert_num_queries):
+    url = f"/api/wallets/{wallet.pk}/"
+    response = api_client.get(url)
+
+    wallet.refresh_from_db()
+    etag = response["ETag"]
+    assert etag.startswith('"')
+    assert response["Last-Modified"] == http_date(wallet.updated_at.timestamp())
+    assert response["Cache-Control"] == "no-cache"
+
+    # Answered from the cached validators, then from a probe of the row
+    with django_assert_num_queries(0):
+        response = revalidate(api_client, url, etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    clear_caches()
+    with django_assert_num_queries(1):
+        assert revalidate(api_client, url, etag).status_code == 304
+
+    Transaction.objects.create(wallet=wallet, txid="tx-1", amount=Decimal("5"))
+    response = revalidate(api_client, url, etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert response.json()["data"]["attributes"]["balance"] == "5.000000000000000000"
+
+
+@pytest.mark.django_db
+def test_etag_depends_on_the_representation(api_client, wallet):
+    url = f"/api/wallets/{wallet.pk}/"
+    sparse = api_client.get(url + "?fields[Wallet]=label")
+
+    assert sparse["ETag"] != api_client.get(url)["ETag"]
+    assert revalidate(api_client, url, sparse["ETag"]).status_code == 200
+    clear_caches()
+    assert (
+        revalidate(
+            api_client, url + "?fields[Wallet]=label", sparse["ETag"]
+        ).status_code
+        == 304
+    )
+
+
+@pytest.mark.django_db
+def test_pending_deposits_change_the_wallet_etag(api_client):
+    hot_wallet = Wallet.objects.create(label="Hot Wallet", is_hot=True)
+    url = f"/api/wallets/{hot_wallet.pk}/"
+    before = api_client.get(url)["ETag"]
+
+    deposit = Transaction.objects.create(
+        wallet=hot_wallet, txid="hot-1", amount=Decimal("10")
+    )
+    clear_caches()
+    with_deposit = revalidate(api_client, url, before)
+    assert with_deposit.status_code == 200
+
+    deposit.delete()
+    clear_caches()
+    response = revalidate(api_client, url, with_deposit["ETag"])
+    assert response.status_code == 200
+    assert response["ETag"] == before
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/transactions/",
+        "/api/transactions/?page[cursor]=&page[size]=1",
+        "/api/transactions/?fields[Transaction]=amount&filter[amount_min]=1",
+        "/api/wallets/",
+    ],
+)
+def test_list_revalidation(api_client, create_transaction, url):
+    create_transaction("tx-1", Decimal("1"))
+    create_transaction("tx-2", Decimal("2"))
+    etag = api_client.get(url)["ETag"]
+
+    clear_caches()
+    assert revalidate(api_client, url, etag).status_code == 304
+
+    Transaction.objects.get(txid="tx-2").delete()
+    response = revalidate(api_client, url, etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_transaction_list_revalidation_does_not_serialize(
+    api_client, create_transaction, monkeypatch
+):
+    create_transaction("tx-1", Decimal("1"))
+    etag = api_client.get("/api/transactions/")["ETag"]
+
+    monkeypatch.setattr("wallets.views.ResourceBuilder.build_many", None)
+    assert revalidate(api_client, "/api/transactions/", etag).status_code == 304
+
+
+@pytest.mark.django_db
+def test_transaction_detail_and_include(api_client, create_transaction):
+    tx = create_transaction("tx-1", Decimal("1"))
+    response = api_client.get(f"/api/transactions/{tx.pk}/")
+
+    assert response["Last-Modified"] == http_date(tx.updated_at.timestamp())
+    assert "ETag" not in api_client.get("/api/transactions/?include=wallet")
+
+
+def patch_label(api_client, wallet, label, **extra):
+    headers = {
+        "Content-Type": "application/vnd.api+json",
+        "Accept": "application/vnd.api+json",
+        **extra,
+    }
+    return api_client.patch(
+        f"/api/wallets/{wallet.pk}/",
+        {
+            "data": {
+                "type": "Wallet",
+                "id": str(wallet.pk),
+                "attributes": {"label": label},
+            }
+        },
+        format="json",
+        headers=headers,
+    )
+
+
+@pytest.mark.django_db
+def test_if_match_on_patch(api_client, wallet):
+    etag = api_client.get(f"/api/wallets/{wallet.pk}/")["ETag"]
+
+    assert (
+        patch_label(api_client, wallet, "First", **{"If-Match": etag}).status_code
+        == 200
+    )
+
+    response = patch_label(api_client, wallet, "Second", **{"If-Match": etag})
+    assert response.status_code == 412
+    assert "errors" in response.json()
+    wallet.refresh_from_db()
+    assert wallet.label == "First"
+
+    assert (
+        patch_label(api_client, wallet, "Third", **{"If-Match": "*"}).status_code == 200
+    )
+    assert patch_label(api_client, wallet, "Fourth").status_code == 200
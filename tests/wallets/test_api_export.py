@@ -0,0 +1,52 @@
+import csv
+import json
+from decimal import Decimal
+
+import pytest
+
+from wallets.models import Wallet
+
+
+def read_stream(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_export_ndjson_streams_filtered_rows(api_client, wallet, create_transaction):
+    tx = create_transaction("exp-1", Decimal("10.5"))
+    create_transaction("exp-2", Decimal("-3"))
+    other = Wallet.objects.create(label="Other Wallet")
+    other.transactions.create(txid="exp-other", amount=Decimal("1"))
+
+    response = api_client.get(
+        f"/api/transactions/export/?filter[wallet]={wallet.id}&sort=created_at"
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in read_stream(response).splitlines()]
+    assert [row["txid"] for row in rows] == ["exp-1", "exp-2"]
+    assert rows[0]["id"] == tx.id
+    assert rows[0]["wallet"] == wallet.id
+    assert Decimal(rows[0]["amount"]) == Decimal("10.5")
+    assert rows[0]["created_at"].endswith("Z")
+
+
+@pytest.mark.django_db
+def test_export_csv(api_client, create_transaction):
+    create_transaction("exp-1", Decimal("10"))
+
+    response = api_client.get("/api/transactions/export/?export_format=csv")
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/csv"
+    rows = list(csv.reader(read_stream(response).splitlines()))
+    assert rows[0] == ["id", "wallet", "txid", "amount", "created_at"]
+    assert rows[1][2] == "exp-1"
+
+
+@pytest.mark.django_db
+def test_export_rejects_unknown_format(api_client):
+    response = api_client.get("/api/transactions/export/?export_format=xml")
+
+    assert response.status_code == 400
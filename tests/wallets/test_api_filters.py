@@ -1,6 +1,28 @@
 from decimal import Decimal
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from wallets.models import Transaction, Wallet
+
+
+def api_plan(api_client, url):
+    """
+    Plan of the transaction query the API runs for `url`
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.get(url)
+    assert response.status_code == 200
+    (sql,) = [
+        query["sql"]
+        for query in context.captured_queries
+        if 'FROM "wallets_transaction"' in query["sql"]
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {sql}")
+        return "\n".join(row[0] for row in cursor.fetchall())
 
 
 @pytest.mark.django_db
@@ -98,3 +120,85 @@ def test_ordering_by_created_at_desc(api_client, wallet, create_transaction):
     ids = [int(tx["id"]) for tx in data]
 
     assert ids == sorted(ids, reverse=True)
+
+
+@pytest.mark.django_db
+def test_filter_by_wallet_set(api_client, wallet, create_transaction):
+    other = Wallet.objects.create(label="Other Wallet")
+    third = Wallet.objects.create(label="Third Wallet")
+    create_transaction("tx-1", Decimal("1"))
+    Transaction.objects.create(wallet=other, txid="tx-2", amount=Decimal("2"))
+    Transaction.objects.create(wallet=third, txid="tx-3", amount=Decimal("3"))
+
+    response = api_client.get(
+        f"/api/transactions/?filter[wallet__in]={wallet.pk},{other.pk}&sort=txid"
+    )
+
+    assert response.status_code == 200
+    assert [tx["attributes"]["txid"] for tx in response.json()["data"]] == [
+        "tx-1",
+        "tx-2",
+    ]
+
+
+@pytest.mark.django_db
+def test_filter_by_created_at_range(api_client, wallet, create_transaction):
+    for txid, created_at in [
+        ("tx-old", "2026-01-01T00:00:00Z"),
+        ("tx-in", "2026-02-01T00:00:00Z"),
+        ("tx-new", "2026-03-01T00:00:00Z"),
+    ]:
+        tx = create_transaction(txid, Decimal("1"))
+        Transaction.objects.filter(pk=tx.pk).update(created_at=created_at)
+
+    response = api_client.get(
+        "/api/transactions/?filter[created_after]=2026-02-01T00:00:00Z"
+        "&filter[created_before]=2026-03-01T00:00:00Z"
+    )
+
+    assert response.status_code == 200
+    assert [tx["attributes"]["txid"] for tx in response.json()["data"]] == ["tx-in"]
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Plans are checked on PostgreSQL"
+)
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "query",
+    [
+        "filter[wallet]={wallet}&page[cursor]=",
+        "filter[wallet]={wallet}&filter[created_after]=2026-01-01T00:00:00Z"
+        "&filter[created_before]=2026-02-01T00:00:00Z&page[cursor]=",
+        "filter[wallet]={wallet}&filter[amount_min]=5&page[cursor]=",
+    ],
+)
+def test_latest_wallet_transactions_are_an_index_range_scan(
+    api_client, wallet, create_transaction, query
+):
+    for index in range(20):
+        create_transaction(f"tx-{index}", Decimal(index))
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE wallets_transaction")
+
+    plan = api_plan(api_client, "/api/transactions/?" + query.format(wallet=wallet.pk))
+
+    assert "Index Only Scan using transaction_wallet_recent_idx" in plan
+    assert "Sort" not in plan
+    assert "Bitmap" not in plan
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Plans are checked on PostgreSQL"
+)
+@pytest.mark.django_db
+def test_wallet_set_uses_the_wallet_index(api_client, wallet):
+    other = Wallet.objects.create(label="Other Wallet")
+
+    plan = api_plan(
+        api_client,
+        f"/api/transactions/?filter[wallet__in]={wallet.pk},{other.pk}"
+        "&page[cursor]=",
+    )
+
+    assert "transaction_wallet_recent_idx" in plan
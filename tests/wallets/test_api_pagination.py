@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+
+
+def collect_pages(api_client, url):
+    ids = []
+    pages = 0
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == 200
+        body = response.json()
+        ids.extend(int(item["id"]) for item in body["data"])
+        url = body["links"]["next"]
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_walks_every_row_once(api_client, create_transaction):
+    txs = [create_transaction(f"cp-{i}", Decimal("1")) for i in range(25)]
+
+    ids, pages = collect_pages(
+        api_client, "/api/transactions/?page[cursor]=&page[size]=10"
+    )
+
+    assert pages == 3
+    assert ids == [tx.id for tx in reversed(txs)]
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_honours_sort_with_ties(api_client, create_transaction):
+    for i in range(12):
+        create_transaction(f"cp-{i}", Decimal(i % 3))
+
+    ids, _ = collect_pages(
+        api_client, "/api/transactions/?sort=amount&page[cursor]=&page[size]=5"
+    )
+
+    assert len(ids) == len(set(ids)) == 12
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_skips_count(
+    api_client, create_transaction, django_assert_num_queries
+):
+    create_transaction("cp-1", Decimal("1"))
+
+    with django_assert_num_queries(1):
+        response = api_client.get("/api/transactions/?page[cursor]=")
+
+    assert response.status_code == 200
+    assert "count" not in response.json()["meta"]["pagination"]
+
+
+@pytest.mark.django_db
+def test_cursor_from_other_sort_is_rejected(api_client, create_transaction):
+    for i in range(3):
+        create_transaction(f"cp-{i}", Decimal("1"))
+    response = api_client.get("/api/transactions/?page[cursor]=&page[size]=1")
+    next_url = response.json()["links"]["next"]
+
+    response = api_client.get(next_url + "&sort=amount")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_page_number_pagination_still_available(api_client, create_transaction):
+    create_transaction("cp-1", Decimal("1"))
+
+    response = api_client.get("/api/transactions/?page[number]=1")
+
+    assert response.status_code == 200
+    assert response.json()["meta"]["pagination"]["count"] == 1
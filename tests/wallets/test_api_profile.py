@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+LOADED_MODULES = """
+import json, sys
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().url_patterns
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def loaded_modules(settings_module):
+    output = subprocess.run(
+        [sys.executable, "-c", LOADED_MODULES],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env=os.environ | {"DJANGO_SETTINGS_MODULE": settings_module},
+    ).stdout
+    return set(json.loads(output))
+
+
+def test_api_profile_skips_admin_and_schema_generator():
+    full = loaded_modules("wallet_api.settings")
+    lean = loaded_modules("wallet_api.settings_api")
+
+    for module in ("wallets.admin", "django.contrib.sessions.middleware"):
+        assert module in full
+        assert module not in lean
+    assert not any(module.startswith("drf_spectacular") for module in lean)
+    assert "wallets.views" in lean
+    assert len(lean) < len(full)
+
+
+@pytest.mark.django_db
+def test_api_profile_serves_the_api(client, settings, wallet):
+    settings.ROOT_URLCONF = "wallet_api.urls_api"
+    response = client.get(
+        f"/api/wallets/{wallet.pk}/", headers={"Accept": "application/vnd.api+json"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"]["id"] == str(wallet.pk)
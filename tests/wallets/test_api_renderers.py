@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+
+from wallets.cache import wallet_cache
+from wallets.models import Transaction, Wallet
+from wallets.views import TransactionViewSet, WalletViewSet
+
+
+def get_both(api_client, monkeypatch, viewset, url):
+    fast = api_client.get(url)
+    cache.clear()
+    wallet_cache.clear_local()
+    with monkeypatch.context() as patch:
+        patch.setattr(viewset, "fast_list", False)
+        regular = api_client.get(url)
+    assert fast.status_code == regular.status_code == 200
+    assert fast.get("ETag") == regular.get("ETag")
+    return fast.content, regular.content
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/transactions/",
+        "/api/transactions/?page[number]=2&page[size]=3",
+        "/api/transactions/?sort=amount&filter[amount_min]=-1",
+        "/api/transactions/?page[cursor]=&page[size]=4",
+        "/api/transactions/?fields[Transaction]=txid,amount",
+        "/api/transactions/?fields[Transaction]=&page[cursor]=&sort=-amount",
+        "/api/transactions/?include=wallet",
+        "/api/transactions/?include=wallet&fields[Wallet]=label,balance",
+        "/api/transactions/?include=wallet&fields[Transaction]=txid,wallet",
+        "/api/transactions/?include=wallet&fields[Transaction]=txid",
+    ],
+)
+def test_transaction_list_matches_regular_renderer(
+    api_client, monkeypatch, wallet, create_transaction, url
+):
+    create_transaction("fr-1", Decimal("100"))
+    other = Wallet.objects.create(label="Other wallet")
+    Transaction.objects.create(wallet=other, txid="fr-other", amount=Decimal("1"))
+    create_transaction("fr-2", Decimal("-0.000000000000000001"))
+    create_transaction("fr-3", Decimal("12345678.123456789012345678"))
+    for i in range(6):
+        create_transaction(f"fr-x-{i}", Decimal(i))
+
+    fast, regular = get_both(api_client, monkeypatch, TransactionViewSet, url)
+
+    assert fast == regular
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url", ["/api/wallets/?sort=-label", "/api/wallets/?fields[Wallet]=label,balance"]
+)
+def test_wallet_list_matches_regular_renderer(api_client, monkeypatch, wallet, url):
+    Wallet.objects.create(label="Ünïcode   wallet")
+
+    fast, regular = get_both(api_client, monkeypatch, WalletViewSet, url)
+
+    assert fast == regular
+
+
+@pytest.mark.django_db
+def test_fast_list_does_not_build_model_instances(
+    api_client, wallet, create_transaction, monkeypatch
+):
+    create_transaction("fr-1", Decimal("1"))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("model instance built")
+
+    monkeypatch.setattr("wallets.models.Transaction.from_db", fail)
+
+    response = api_client.get("/api/transactions/")
+
+    assert response.status_code == 200
+    assert response.json()["data"][0]["attributes"]["txid"] == "fr-1"
@@ -0,0 +1,88 @@
+import pytest
+from django.core.management import call_command
+
+from wallets import schema
+
+
+@pytest.fixture(autouse=True)
+def schema_dir(settings, tmp_path):
+    settings.WALLETS_SCHEMA_DIR = tmp_path
+    settings.WALLETS_CODE_VERSION = "v1"
+    schema.code_version.cache_clear()
+    schema.read_schema.cache_clear()
+    yield tmp_path
+    schema.code_version.cache_clear()
+    schema.read_schema.cache_clear()
+
+
+def test_schema_is_generated_once_per_code_version(client, settings, schema_dir):
+    response = client.get("/api/schema/")
+
+    assert response.status_code == 200
+    assert response["ETag"] == '"v1-yaml"'
+    assert response["Content-Type"] == "application/vnd.oai.openapi; charset=utf-8"
+    assert response.content.startswith(b"openapi: 3.0.3")
+    assert (schema_dir / "openapi-v1.yml").read_bytes() == response.content
+
+    (schema_dir / "openapi-v1.yml").write_text("openapi: stale\n")
+    assert client.get("/api/schema/").content == response.content
+
+    settings.WALLETS_CODE_VERSION = "v2"
+    schema.code_version.cache_clear()
+    response = client.get("/api/schema/")
+
+    assert response["ETag"] == '"v2-yaml"'
+    assert (schema_dir / "openapi-v2.yml").read_bytes() == response.content
+
+
+def test_schema_conditional_get(client):
+    response = client.get("/api/schema/?format=json")
+
+    assert response["ETag"] == '"v1-json"'
+    assert response["Cache-Control"] == "no-cache"
+    assert response.json()["openapi"] == "3.0.3"
+    assert (
+        client.get("/api/schema/?format=json", headers={"If-None-Match": '"v1-json"'})
+    ).status_code == 304
+    assert (
+        client.get("/api/schema/", headers={"If-None-Match": '"v1-json"'})
+    ).status_code == 200
+    assert client.get("/api/schema/?format=xml").status_code == 404
+
+
+def test_docs_pages_conditional_get(client):
+    client.get("/api/docs/")
+
+    for url in ("/api/docs/", "/api/redoc/"):
+        etag = client.get(url)["ETag"]
+        assert etag.startswith('"v1-')
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_schema_without_generator_needs_artifact(client, settings, schema_dir):
+    settings.ROOT_URLCONF = "wallet_api.urls_api"
+    settings.INSTALLED_APPS = [
+        app for app in settings.INSTALLED_APPS if app != "drf_spectacular"
+    ]
+
+    assert client.get("/api/schema/").status_code == 404
+    assert not list(schema_dir.iterdir())
+
+    (schema_dir / "openapi-v1.yml").write_text("openapi: 3.0.3\n")
+    assert client.get("/api/schema/").content == b"openapi: 3.0.3\n"
+
+
+def test_build_schema_command(capsys, schema_dir):
+    (schema_dir / "openapi-v0.yml").write_text("openapi: old\n")
+
+    call_command("build_schema")
+    assert "Wrote" in capsys.readouterr().out
+    call_command("build_schema", "--prune")
+
+    output = capsys.readouterr().out
+    assert "Schema v1 is up to date" in output
+    assert "openapi-v0.yml" in output
+    assert sorted(path.name for path in schema_dir.iterdir()) == [
+        "openapi-v1.json",
+        "openapi-v1.yml",
+    ]
@@ -0,0 +1,111 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from wallets.models import Transaction, Wallet
+
+
+def get(api_client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get(url)
+    assert response.status_code == 200, response.content
+    return response.json(), [query["sql"] for query in queries]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("cursor", ["", "&page[cursor]="])
+def test_sparse_fieldset_reads_only_its_columns(api_client, booked, cursor):
+    document, queries = get(
+        api_client, f"/api/transactions/?fields[Transaction]=txid{cursor}"
+    )
+
+    assert document["data"][0] == {
+        "type": "Transaction",
+        "id": str(Transaction.objects.get(txid="st-4").pk),
+        "attributes": {"txid": "st-4"},
+    }
+    select = queries[-1]
+    assert '"txid"' in select
+    # The sort field is read for cursors, nothing else is
+    assert '"amount"' not in select
+    assert '"wallet_id"' not in select
+    assert '"updated_at"' not in select
+
+
+@pytest.mark.django_db
+def test_included_wallets_are_read_once(api_client, booked, monkeypatch):
+    other = Wallet.objects.create(label="Other wallet")
+    Transaction.objects.create(wallet=other, txid="sp-other", amount=Decimal("1"))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("model instance built")
+
+    monkeypatch.setattr("wallets.models.Wallet.from_db", fail)
+
+    # COUNT, page, included wallets
+    document, queries = get(
+        api_client, "/api/transactions/?include=wallet&fields[Wallet]=label"
+    )
+
+    assert len(queries) == 3
+    assert document["included"] == [
+        {"type": "Wallet", "id": str(booked.pk), "attributes": {"label": booked.label}},
+        {"type": "Wallet", "id": str(other.pk), "attributes": {"label": other.label}},
+    ]
+    assert '"balance"' not in queries[-1]
+
+
+@pytest.mark.django_db
+def test_retrieve_joins_the_included_wallet(api_client, booked):
+    tx = Transaction.objects.get(txid="st-1")
+
+    document, queries = get(
+        api_client,
+        f"/api/transactions/{tx.pk}/?include=wallet"
+        "&fields[Transaction]=amount,wallet&fields[Wallet]=balance",
+    )
+
+    assert len(queries) == 1
+    assert '"txid"' not in queries[0]
+    assert '"label"' not in queries[0]
+    assert document["data"]["attributes"] == {"amount": "100.000000000000000000"}
+    assert document["included"] == [
+        {
+            "type": "Wallet",
+            "id": str(booked.pk),
+            "attributes": {"balance": "85.000000000000000000"},
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_wallet_retrieve_sparse_fieldset(api_client, wallet):
+    document, queries = get(
+        api_client, f"/api/wallets/{wallet.pk}/?fields[Wallet]=label"
+    )
+
+    assert document["data"]["attributes"] == {"label": wallet.label}
+    assert '"balance"' not in queries[-1]
+
+
+@pytest.mark.django_db
+def test_included_hot_wallets_add_pending_deposits(api_client):
+    hot = Wallet.objects.create(label="Hot wallet", is_hot=True)
+    tx = Transaction.objects.create(wallet=hot, txid="sp-hot", amount=Decimal("7"))
+
+    for url in (
+        "/api/transactions/?include=wallet&fields[Wallet]=balance",
+        f"/api/transactions/{tx.pk}/?include=wallet&fields[Wallet]=balance",
+    ):
+        document, _ = get(api_client, url)
+        (included,) = document["included"]
+        assert included["attributes"] == {"balance": "7.000000000000000000"}
+
+
+@pytest.mark.django_db
+def test_unknown_include_is_rejected(api_client, booked):
+    response = api_client.get("/api/transactions/?include=transfers")
+
+    assert response.status_code == 400
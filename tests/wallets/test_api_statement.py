@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone as django_timezone
+from django.utils.dateparse import parse_datetime
+
+from wallets.models import Transaction, Wallet, WalletStatementRollup
+from wallets.statements import wallet_statement
+
+
+def at(day, hour=0):
+    return datetime(2026, 1, day, hour, tzinfo=timezone.utc)
+
+
+def statement(api_client, wallet, **params):
+    response = api_client.get(f"/api/wallets/{wallet.pk}/statement/", params)
+    assert response.status_code == 200, response.content
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_statement_buckets_with_running_balance(api_client, booked):
+    document = statement(
+        api_client,
+        booked,
+        interval="day",
+        start="2026-01-02T00:00:00Z",
+        end="2026-01-04T00:00:00Z",
+    )
+
+    assert document["meta"] == {
+        "interval": "day",
+        "start": "2026-01-02T00:00:00Z",
+        "end": "2026-01-04T00:00:00Z",
+        "opening_balance": "100.000000000000000000",
+    }
+    data = document["data"]
+    assert [resource["id"] for resource in data] == [
+        f"{booked.pk}:2026-01-02T00:00:00Z",
+        f"{booked.pk}:2026-01-03T00:00:00Z",
+    ]
+    assert data[0]["type"] == "WalletStatement"
+    assert data[0]["attributes"]["transaction_count"] == 0
+    assert data[0]["attributes"]["closing_balance"] == "100.000000000000000000"
+    assert data[1]["attributes"] == {
+        "start": "2026-01-03T00:00:00Z",
+        "end": "2026-01-04T00:00:00Z",
+        "opening_balance": "100.000000000000000000",
+        "closing_balance": "75.000000000000000000",
+        "credits": "5.000000000000000000",
+        "debits": "30.000000000000000000",
+        "transaction_count": 2,
+    }
+
+
+@pytest.mark.django_db
+def test_statement_rounds_range_to_buckets(api_client, booked):
+    document = statement(
+        api_client,
+        booked,
+        interval="month",
+        start="2026-01-15T12:00:00Z",
+        end="2026-01-20T00:00:00Z",
+    )
+
+    assert document["meta"]["start"] == "2026-01-01T00:00:00Z"
+    assert document["meta"]["end"] == "2026-02-01T00:00:00Z"
+    assert document["meta"]["opening_balance"] == "0.000000000000000000"
+    (bucket,) = document["data"]
+    assert bucket["attributes"]["closing_balance"] == "85.000000000000000000"
+    assert bucket["attributes"]["transaction_count"] == 4
+
+
+@pytest.mark.django_db
+def test_statement_hourly_defaults_to_last_day(api_client, wallet):
+    before = django_timezone.now()
+    document = statement(api_client, wallet, interval="hour")
+
+    assert len(document["data"]) == 24
+    last = document["data"][-1]["attributes"]
+    assert parse_datetime(last["start"]) <= before < parse_datetime(last["end"])
+    assert document["meta"]["opening_balance"] == "0.000000000000000000"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"interval": "week"},
+        {"start": "2026-01-05T00:00:00Z", "end": "2026-01-01T00:00:00Z"},
+        {"interval": "hour", "start": "2020-01-01T00:00:00Z", "end": "2026-01-01"},
+    ],
+)
+def test_statement_rejects_invalid_ranges(api_client, wallet, params):
+    response = api_client.get(f"/api/wallets/{wallet.pk}/statement/", params)
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_statement_is_cached_until_the_wallet_changes(
+    api_client, booked, django_assert_num_queries
+):
+    params = {"start": "2026-01-01T00:00:00Z", "end": "2026-01-06T00:00:00Z"}
+    first = statement(api_client, booked, **params)
+    with django_assert_num_queries(0):
+        assert statement(api_client, booked, **params) == first
+
+    Transaction.objects.create(wallet=booked, txid="st-5", amount=Decimal("1"))
+    last = statement(api_client, booked, **params)["data"][-1]
+    assert last["attributes"]["closing_balance"] == "85.000000000000000000"
+
+
+@pytest.mark.django_db
+def test_statement_reads_rolled_up_hours_in_ledger_mode(settings, booked):
+    settings.WALLETS_LEDGER_MODE = True
+    expected = wallet_statement(booked, "day", at(1), at(6))
+
+    call_command("refresh_statement_rollups", settle_seconds=0)
+    assert WalletStatementRollup.objects.filter(wallet=booked).count() == 4
+
+    # Rolled up hours are no longer read from the transactions
+    Transaction.objects.filter(wallet=booked, created_at__lt=at(4)).update(
+        amount=Decimal("0")
+    )
+    opening, buckets = wallet_statement(booked, "day", at(1), at(6))
+    assert (opening, buckets) == expected
+
+    other = Wallet.objects.create(label="Other Wallet")
+    assert wallet_statement(other, "day", at(1), at(6))[1][-1].closing_balance == 0
+
+
+@pytest.mark.django_db
+def test_refresh_statement_rollups_is_incremental(booked, create_transaction):
+    call_command("refresh_statement_rollups", settle_seconds=0)
+    tx = create_transaction("st-5", Decimal("7"))
+
+    call_command("refresh_statement_rollups", settle_seconds=3600 * 24 * 365 * 10)
+    assert not WalletStatementRollup.objects.filter(transaction_count=0).exists()
+    assert WalletStatementRollup.objects.filter(wallet=booked).count() == 4
+
+    Transaction.objects.filter(pk=tx.pk).update(created_at=at(6))
+    call_command("refresh_statement_rollups", settle_seconds=0)
+    rollup = WalletStatementRollup.objects.get(bucket=at(6))
+    assert (rollup.net, rollup.credits, rollup.transaction_count) == (
+        Decimal("7"),
+        Decimal("7"),
+        1,
+    )
@@ -0,0 +1,162 @@
+from decimal import Decimal
+
+import pytest
+
+from wallets.models import Transaction, Wallet
+
+
+def transfer_resource(source, destination, amount, txid):
+    return {
+        "type": "Transfer",
+        "attributes": {"txid": txid, "amount": str(amount)},
+        "relationships": {
+            "source": {"data": {"type": "Wallet", "id": str(source.pk)}},
+            "destination": {"data": {"type": "Wallet", "id": str(destination.pk)}},
+        },
+    }
+
+
+@pytest.fixture
+def funded_wallets(wallet):
+    other = Wallet.objects.create(label="Other Wallet")
+    Transaction.objects.create(wallet=wallet, txid="fund", amount=Decimal("100"))
+    wallet.refresh_from_db()
+    return wallet, other
+
+
+@pytest.mark.django_db
+def test_transfer_books_both_legs(api_client, headers, funded_wallets):
+    wallet, other = funded_wallets
+
+    response = api_client.post(
+        "/api/transfers/",
+        {"data": transfer_resource(wallet, other, Decimal("30"), "tr-1")},
+        headers=headers,
+        format="json",
+    )
+
+    assert response.status_code == 201
+    data = response.json()["data"]
+    assert data["type"] == "Transfer"
+    assert data["id"] == "tr-1"
+    debit = Transaction.objects.get(txid="tr-1:debit")
+    credit = Transaction.objects.get(txid="tr-1:credit")
+    assert data["relationships"]["debit"]["data"]["id"] == str(debit.pk)
+    assert data["relationships"]["credit"]["data"]["id"] == str(credit.pk)
+    assert (debit.wallet_id, debit.amount) == (wallet.pk, Decimal("-30"))
+    assert (credit.wallet_id, credit.amount) == (other.pk, Decimal("30"))
+    wallet.refresh_from_db()
+    other.refresh_from_db()
+    assert wallet.balance == Decimal("70")
+    assert other.balance == Decimal("30")
+
+
+@pytest.mark.django_db
+def test_transfer_batch_nets_legs_per_wallet(api_client, headers, funded_wallets):
+    wallet, other = funded_wallets
+    third = Wallet.objects.create(label="Third Wallet")
+
+    # `other` only has funds once the first leg of the batch is applied
+    response = api_client.post(
+        "/api/transfers/",
+        {
+            "data": [
+                transfer_resource(wallet, other, Decimal("40"), "tr-1"),
+                transfer_resource(other, third, Decimal("40"), "tr-2"),
+            ]
+        },
+        headers=headers,
+        format="json",
+    )
+
+    assert response.status_code == 201
+    assert [item["id"] for item in response.json()["data"]] == ["tr-1", "tr-2"]
+    balances = dict(Wallet.objects.values_list("pk", "balance"))
+    assert balances == {
+        wallet.pk: Decimal("60"),
+        other.pk: Decimal("0"),
+        third.pk: Decimal("40"),
+    }
+
+
+@pytest.mark.django_db
+def test_transfer_batch_is_all_or_nothing(api_client, headers, funded_wallets):
+    wallet, other = funded_wallets
+
+    response = api_client.post(
+        "/api/transfers/",
+        {
+            "data": [
+                transfer_resource(wallet, other, Decimal("40"), "tr-1"),
+                transfer_resource(wallet, other, Decimal("70"), "tr-2"),
+            ]
+        },
+        headers=headers,
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert Transaction.objects.count() == 1
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("100")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "amount, same_wallet, field",
+    [
+        (Decimal("0"), False, "amount"),
+        (Decimal("-5"), False, "amount"),
+        (Decimal("5"), True, "non_field_errors"),
+    ],
+)
+def test_transfer_rejects_invalid_legs(
+    api_client, headers, funded_wallets, amount, same_wallet, field
+):
+    wallet, other = funded_wallets
+
+    response = api_client.post(
+        "/api/transfers/",
+        {
+            "data": transfer_resource(
+                wallet, wallet if same_wallet else other, amount, "tr-1"
+            )
+        },
+        headers=headers,
+        format="json",
+    )
+
+    assert response.status_code == 400
+    assert field in response.json()["errors"]
+    assert Transaction.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_transfer_reports_txid_collisions_per_item(api_client, headers, funded_wallets):
+    wallet, other = funded_wallets
+    api_client.post(
+        "/api/transfers/",
+        {"data": transfer_resource(wallet, other, Decimal("1"), "tr-1")},
+        headers=headers,
+        format="json",
+    )
+
+    response = api_client.post(
+        "/api/transfers/",
+        {
+            "data": [
+                transfer_resource(wallet, other, Decimal("1"), "tr-2"),
+                transfer_resource(wallet, other, Decimal("1"), "tr-1"),
+                transfer_resource(wallet, other, Decimal("1"), "tr-2"),
+            ]
+        },
+        headers=headers,
+        format="json",
+    )
+
+    assert response.status_code == 400
+    errors = response.json()["errors"]
+    assert errors[0] == {}
+    assert "txid" in errors[1]
+    assert "txid" in errors[2]
+    assert Transaction.objects.count() == 3
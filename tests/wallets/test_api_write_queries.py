@@ -0,0 +1,164 @@
+from decimal import Decimal
+
+import pytest
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from wallets.models import Transaction, WalletBalanceSnapshot
+from wallets.views import txid_collisions
+
+# Writes run in a savepoint (SAVEPOINT and RELEASE are counted as queries too): one
+# conditional UPDATE of the wallet, with no reads before it other than the lookups
+# of the objects named in the request
+
+
+@pytest.mark.django_db
+def test_create_queries(
+    api_client, headers, wallet, django_assert_num_queries, transaction_document
+):
+    # Wallet lookup, SAVEPOINT, wallet UPDATE, INSERT, RELEASE
+    with django_assert_num_queries(5):
+        response = api_client.post(
+            "/api/transactions/",
+            transaction_document({"txid": "tx-1", "amount": "5"}, wallet),
+            format="json",
+            headers=headers,
+        )
+
+    assert response.status_code == 201
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("5")
+
+
+@pytest.mark.django_db
+def test_create_overdraft_is_rejected_by_the_update(
+    api_client, headers, wallet, django_assert_num_queries, transaction_document
+):
+    # Wallet lookup, SAVEPOINT, wallet UPDATE matching no row, ROLLBACK TO, RELEASE
+    with django_assert_num_queries(5):
+        response = api_client.post(
+            "/api/transactions/",
+            transaction_document({"txid": "tx-1", "amount": "-5"}, wallet),
+            format="json",
+            headers=headers,
+        )
+
+    assert response.status_code == 400
+    assert not Transaction.objects.exists()
+
+
+@pytest.mark.django_db
+def test_duplicate_txid_is_rejected_by_the_unique_index(
+    api_client, headers, wallet, create_transaction, transaction_document
+):
+    create_transaction("tx-1", Decimal("10"))
+
+    response = api_client.post(
+        "/api/transactions/",
+        transaction_document({"txid": "tx-1", "amount": "5"}, wallet),
+        format="json",
+        headers=headers,
+    )
+
+    assert response.status_code == 400
+    assert "txid" in response.json()["errors"]
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("10")
+    assert wallet.transaction_count == 1
+
+
+@pytest.mark.django_db
+def test_only_txid_integrity_errors_are_collisions(wallet, create_transaction):
+    tx = create_transaction("tx-1", Decimal("10"))
+    with pytest.raises(ValidationError), transaction.atomic(), txid_collisions():
+        create_transaction("tx-1", Decimal("5"))
+
+    snapshot = {"wallet": wallet, "transaction_id": tx.pk, "balance": Decimal("10")}
+    WalletBalanceSnapshot.objects.create(**snapshot, transaction_count=1)
+    with pytest.raises(IntegrityError), transaction.atomic(), txid_collisions():
+        WalletBalanceSnapshot.objects.create(**snapshot, transaction_count=1)
+
+
+@pytest.mark.django_db
+def test_update_amount_queries(
+    api_client,
+    headers,
+    wallet,
+    create_transaction,
+    django_assert_num_queries,
+    transaction_document,
+):
+    tx = create_transaction("tx-1", Decimal("10"))
+
+    # Transaction lookup, SAVEPOINT, locked read of the row, wallet UPDATE, snapshot
+    # invalidation, transaction UPDATE, RELEASE
+    with django_assert_num_queries(7):
+        response = api_client.patch(
+            f"/api/transactions/{tx.pk}/",
+            transaction_document({"amount": "4"}, pk=tx.pk),
+            format="json",
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("4")
+
+
+@pytest.mark.django_db
+def test_update_without_balance_change_skips_the_wallet(
+    api_client,
+    headers,
+    wallet,
+    create_transaction,
+    django_assert_num_queries,
+    transaction_document,
+):
+    tx = create_transaction("tx-1", Decimal("10"))
+
+    # Transaction lookup, SAVEPOINT, transaction UPDATE, RELEASE
+    with django_assert_num_queries(4) as captured:
+        response = api_client.patch(
+            f"/api/transactions/{tx.pk}/",
+            transaction_document({"txid": "tx-2"}, pk=tx.pk),
+            format="json",
+            headers=headers,
+        )
+
+    assert response.status_code == 200
+    (update,) = [query["sql"] for query in captured if "UPDATE" in query["sql"]]
+    assert '"txid"' in update
+    assert '"amount"' not in update
+    assert '"wallet_id"' not in update
+    tx.refresh_from_db()
+    assert tx.txid == "tx-2"
+
+
+@pytest.mark.django_db
+def test_delete_queries(
+    api_client, headers, wallet, create_transaction, django_assert_num_queries
+):
+    tx = create_transaction("tx-1", Decimal("10"))
+
+    # Transaction lookup, SAVEPOINT, locked read of the row, wallet UPDATE, snapshot
+    # invalidation, DELETE, RELEASE
+    with django_assert_num_queries(7):
+        response = api_client.delete(f"/api/transactions/{tx.pk}/", headers=headers)
+
+    assert response.status_code == 204
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("0")
+
+
+@pytest.mark.django_db
+def test_save_writes_only_changed_fields(wallet, create_transaction):
+    tx = create_transaction("tx-1", Decimal("10"))
+    assert tx.get_changed_fields() == []
+
+    tx.amount = Decimal("3")
+    assert tx.get_changed_fields() == ["amount"]
+    tx.save()
+
+    assert tx.get_changed_fields() == []
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("3")
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+
+from wallets.models import Wallet
+
+
+@pytest.mark.django_db
+def test_async_wallet_detail_matches_sync(api_client, wallet):
+    sync = api_client.get(f"/api/wallets/{wallet.id}/")
+    response = api_client.get(f"/api/async/wallets/{wallet.id}/")
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/vnd.api+json"
+    assert response.content == sync.content
+
+
+@pytest.mark.django_db
+def test_async_wallet_detail_not_found(api_client):
+    response = api_client.get("/api/async/wallets/999/")
+
+    assert response.status_code == 404
+    assert "errors" in response.json()
+
+
+@pytest.mark.django_db
+def test_async_wallet_list_is_keyset_paginated(api_client, wallet):
+    for i in range(4):
+        Wallet.objects.create(label=f"Wallet {i}")
+
+    first = api_client.get("/api/async/wallets/?page[size]=3").json()
+    second = api_client.get(first["links"]["next"]).json()
+
+    ids = [item["id"] for item in first["data"] + second["data"]]
+    assert ids == [
+        str(pk) for pk in Wallet.objects.order_by("id").values_list("pk", flat=True)
+    ]
+    assert first["meta"]["pagination"]["size"] == 3
+    assert second["links"]["next"] is None
+
+
+@pytest.mark.django_db
+def test_async_transaction_list_matches_sync_cursor_page(
+    api_client, wallet, create_transaction
+):
+    for i in range(5):
+        create_transaction(f"async-{i}", Decimal(i + 1))
+    other = Wallet.objects.create(label="Other Wallet")
+    other.transactions.create(txid="async-other", amount=Decimal("1"))
+
+    query = f"?filter[wallet]={wallet.id}&sort=-amount&page[size]=2&page[cursor]="
+    sync = api_client.get(f"/api/transactions/{query}").json()
+    response = api_client.get(f"/api/async/transactions/{query}").json()
+
+    assert response["data"] == sync["data"]
+    assert response["meta"] == sync["meta"]
+
+    sync_next = api_client.get(sync["links"]["next"]).json()
+    response_next = api_client.get(response["links"]["next"]).json()
+    assert response_next["data"] == sync_next["data"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "query",
+    ["?sort=wallet", "?filter[amount_min]=abc", "?page[cursor]=garbage"],
+)
+def test_async_transaction_list_rejects_invalid_params(api_client, query):
+    response = api_client.get(f"/api/async/transactions/{query}")
+
+    assert response.status_code == 400
+    assert "errors" in response.json()
@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+
+from wallets.models import Transaction, Wallet
+from wallets.services import Transfer, create_transfers
+
+WRITERS = 8
+WRITES_PER_WRITER = 25
+
+
+def run_in_parallel(func, args):
+    def worker(arg):
+        try:
+            return func(arg)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=WRITERS) as executor:
+        return list(executor.map(worker, args))
+
+
+def assert_balance_matches_transactions(wallet):
+    wallet.refresh_from_db()
+    total = wallet.transactions.aggregate(total=Sum("amount"))["total"]
+    assert wallet.balance == (total or Decimal("0"))
+    assert wallet.balance >= Decimal("0")
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_parallel_deposits_are_not_lost():
+    wallet = Wallet.objects.create(label="Contended Wallet")
+
+    def deposit(writer):
+        for i in range(WRITES_PER_WRITER):
+            Transaction.objects.create(
+                wallet_id=wallet.pk, txid=f"dep-{writer}-{i}", amount=Decimal("1.25")
+            )
+
+    run_in_parallel(deposit, range(WRITERS))
+
+    assert_balance_matches_transactions(wallet)
+    assert wallet.balance == Decimal("1.25") * WRITERS * WRITES_PER_WRITER
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_parallel_withdrawals_never_overdraw():
+    wallet = Wallet.objects.create(label="Contended Wallet")
+    Transaction.objects.create(wallet=wallet, txid="seed", amount=Decimal("100"))
+
+    def withdraw(writer):
+        rejected = 0
+        for i in range(WRITES_PER_WRITER):
+            try:
+                Transaction.objects.create(
+                    wallet_id=wallet.pk, txid=f"wd-{writer}-{i}", amount=Decimal("-1")
+                )
+            except ValidationError:
+                rejected += 1
+        return rejected
+
+    rejected = sum(run_in_parallel(withdraw, range(WRITERS)))
+
+    assert_balance_matches_transactions(wallet)
+    assert wallet.balance == Decimal("0")
+    assert rejected == WRITERS * WRITES_PER_WRITER - 100
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_parallel_updates_and_deletes_keep_balance_consistent():
+    wallet = Wallet.objects.create(label="Contended Wallet")
+    transactions = [
+        Transaction.objects.create(wallet=wallet, txid=f"mix-{i}", amount=Decimal("5"))
+        for i in range(WRITERS * 2)
+    ]
+
+    def mutate(tx):
+        if tx.pk % 2:
+            tx.amount = Decimal("7")
+            tx.save()
+        else:
+            tx.delete()
+
+    run_in_parallel(mutate, transactions)
+
+    assert_balance_matches_transactions(wallet)
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_opposite_transfers_do_not_deadlock():
+    wallets = [Wallet.objects.create(label=f"Wallet {i}") for i in range(3)]
+    for wallet in wallets:
+        Transaction.objects.create(
+            wallet=wallet, txid=f"fund-{wallet.pk}", amount=Decimal("1000")
+        )
+
+    def transfer(writer):
+        for i in range(WRITES_PER_WRITER):
+            # Writers move money around the ring in both directions
+            source = wallets[(writer + i) % len(wallets)]
+            destination = wallets[
+                (writer + i + (1 if writer % 2 else -1)) % len(wallets)
+            ]
+            create_transfers(
+                [
+                    Transfer(
+                        txid=f"tr-{writer}-{i}",
+                        source=source,
+                        destination=destination,
+                        amount=Decimal("3"),
+                    ),
+                    Transfer(
+                        txid=f"tr-{writer}-{i}-back",
+                        source=destination,
+                        destination=source,
+                        amount=Decimal("1"),
+                    ),
+                ]
+            )
+
+    run_in_parallel(transfer, range(WRITERS))
+
+    for wallet in wallets:
+        assert_balance_matches_transactions(wallet)
+    assert sum(wallet.balance for wallet in wallets) == Decimal("3000")
+    assert Transaction.objects.count() == 3 + WRITERS * WRITES_PER_WRITER * 4
@@ -0,0 +1,133 @@
+import json
+import os
+import subprocess
+import sys
+from importlib.util import find_spec
+from pathlib import Path
+
+import pytest
+from django.db import connection, connections
+
+from wallets.metrics import DB_CONNECTIONS, pool_metrics, render_metrics
+
+ROOT = Path(__file__).resolve().parents[2]
+
+DATABASE_SETTINGS = """
+import json
+from django.conf import settings
+database = settings.DATABASES["default"]
+print(json.dumps({
+    name: database.get(name)
+    for name in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")
+}))
+"""
+
+pytestmark = pytest.mark.usefixtures("clear_metrics")
+
+
+def database_settings(**environ):
+    output = subprocess.run(
+        [sys.executable, "-c", DATABASE_SETTINGS],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+        env=os.environ | {"DJANGO_SETTINGS_MODULE": "wallet_api.settings"} | environ,
+    ).stdout
+    return json.loads(output)
+
+
+def test_persistent_connections_by_default():
+    database = database_settings()
+
+    assert database["CONN_MAX_AGE"] == 60
+    assert database["CONN_HEALTH_CHECKS"] is True
+    assert "pool" not in (database["OPTIONS"] or {})
+
+
+def test_pool_settings_from_environment():
+    database = database_settings(
+        POSTGRES_POOL="true", POSTGRES_POOL_MIN_SIZE="4", POSTGRES_POOL_MAX_SIZE="16"
+    )
+
+    # Pooled connections are returned to the pool after every request
+    assert database["CONN_MAX_AGE"] == 0
+    assert database["OPTIONS"]["pool"] == {
+        "min_size": 4,
+        "max_size": 16,
+        "timeout": 10.0,
+        "max_idle": 600.0,
+    }
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Connections are checked on PostgreSQL"
+)
+@pytest.mark.django_db
+def test_opened_connections_are_counted():
+    other = type(connections["default"])(connection.settings_dict, alias="other")
+    try:
+        other.ensure_connection()
+    finally:
+        other.close()
+
+    assert DB_CONNECTIONS.values[("other",)] == 1
+    assert 'wallets_db_connections_total{alias="other"} 1' in render_metrics()
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Pooling needs PostgreSQL"
+)
+@pytest.mark.skipif(
+    find_spec("psycopg_pool") is None, reason="psycopg_pool is not installed"
+)
+@pytest.mark.django_db
+def test_pool_checkouts_reuse_connections():
+    pooled = type(connections["default"])(
+        connection.settings_dict
+        | {"CONN_MAX_AGE": 0, "OPTIONS": {"pool": {"min_size": 1, "max_size": 2}}},
+        alias="pooled",
+    )
+    try:
+        for _ in range(3):
+            pooled.ensure_connection()
+            pooled.close()
+        stats = pooled.pool.get_stats()
+    finally:
+        pooled.close_pool()
+
+    assert DB_CONNECTIONS.values[("pooled",)] == 3
+    assert stats["requests_num"] == 3
+    # The pool may open a second connection while filling up, never one per checkout
+    assert stats["connections_num"] <= 2
+    assert stats["pool_size"] <= 2
+
+
+def test_pool_metrics():
+    lines = pool_metrics(
+        {
+            "default": {
+                "pool_min": 2,
+                "pool_max": 10,
+                "pool_size": 3,
+                "pool_available": 1,
+                "requests_waiting": 0,
+                "requests_num": 120,
+                "requests_queued": 4,
+                "requests_wait_ms": 250,
+                "connections_num": 3,
+                "connections_lost": 1,
+                "returns_bad": 1,
+            }
+        }
+    )
+
+    assert 'wallets_db_pool_size{alias="default"} 3' in lines
+    assert 'wallets_db_pool_available{alias="default"} 1' in lines
+    assert 'wallets_db_pool_checkouts_total{alias="default"} 120' in lines
+    assert 'wallets_db_pool_waits_total{alias="default"} 4' in lines
+    assert 'wallets_db_pool_wait_seconds_total{alias="default"} 0.25' in lines
+    assert 'wallets_db_pool_timeouts_total{alias="default"} 0' in lines
+    assert 'wallets_db_pool_discarded_total{alias="default"} 2' in lines
+    assert "# TYPE wallets_db_pool_waits_total counter" in lines
+    assert pool_metrics({}) == []
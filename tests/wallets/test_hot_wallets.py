@@ -0,0 +1,264 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from wallets.models import Transaction, Wallet
+from wallets.services import flush_pending_deposits
+
+
+@pytest.fixture
+def hot_wallet():
+    return Wallet.objects.create(label="Hot Wallet", is_hot=True)
+
+
+@pytest.fixture
+def deposit(hot_wallet):
+    def _deposit(txid: str, amount: Decimal):
+        return Transaction.objects.create(wallet=hot_wallet, txid=txid, amount=amount)
+
+    return _deposit
+
+
+def attributes(api_client, url):
+    response = api_client.get(url)
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_deposits_do_not_touch_the_wallet_row(hot_wallet, django_assert_num_queries):
+    # SAVEPOINT, share lock of the wallet row, INSERT, RELEASE
+    with django_assert_num_queries(4) as captured:
+        tx = Transaction.objects.create(
+            wallet=hot_wallet, txid="hot-1", amount=Decimal("10")
+        )
+
+    assert "UPDATE" not in " ".join(query["sql"] for query in captured)
+    assert tx.applied is False
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("0")
+    assert hot_wallet.transaction_count == 0
+
+
+@pytest.mark.django_db
+def test_reads_add_pending_deposits(api_client, hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+    deposit("hot-2", Decimal("5"))
+
+    data = attributes(api_client, f"/api/wallets/{hot_wallet.pk}/")["data"]
+    assert Decimal(data["attributes"]["balance"]) == Decimal("15")
+    assert data["attributes"]["transaction_count"] == 2
+    assert Decimal(data["attributes"]["total_credits"]) == Decimal("15")
+    assert data["attributes"]["last_transaction_at"] is not None
+
+    for url in ("/api/wallets/", "/api/wallets/?include=", "/api/async/wallets/"):
+        (row,) = attributes(api_client, url)["data"]
+        assert Decimal(row["attributes"]["balance"]) == Decimal("15")
+
+    data = attributes(api_client, f"/api/async/wallets/{hot_wallet.pk}/")["data"]
+    assert Decimal(data["attributes"]["balance"]) == Decimal("15")
+
+
+@pytest.mark.django_db
+def test_flush_folds_pending_deposits(api_client, hot_wallet, deposit):
+    for i in range(5):
+        deposit(f"hot-{i}", Decimal("2"))
+    before = attributes(api_client, f"/api/wallets/{hot_wallet.pk}/")
+
+    assert flush_pending_deposits(batch_size=2) == 5
+
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("10")
+    assert hot_wallet.transaction_count == 5
+    assert not Transaction.objects.filter(applied=False).exists()
+    assert attributes(api_client, f"/api/wallets/{hot_wallet.pk}/") == before
+
+
+@pytest.mark.django_db
+def test_withdrawals_see_pending_deposits(hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+
+    Transaction.objects.create(wallet=hot_wallet, txid="hot-2", amount=Decimal("-4"))
+
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("6")
+    assert not Transaction.objects.filter(applied=False).exists()
+
+    with pytest.raises(ValidationError):
+        Transaction.objects.create(
+            wallet=hot_wallet, txid="hot-3", amount=Decimal("-7")
+        )
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("6")
+
+
+@pytest.mark.django_db
+def test_update_and_delete_pending_deposits(hot_wallet, deposit):
+    updated = deposit("hot-1", Decimal("10"))
+    deleted = deposit("hot-2", Decimal("5"))
+
+    updated.amount = Decimal("3")
+    updated.save()
+    deleted.delete()
+
+    assert updated.applied is True
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("3")
+    assert flush_pending_deposits() == 0
+
+
+@pytest.mark.django_db
+def test_statement_includes_pending_deposits(api_client, hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+
+    response = api_client.get(f"/api/wallets/{hot_wallet.pk}/statement/")
+
+    buckets = response.json()["data"]
+    assert Decimal(buckets[0]["attributes"]["opening_balance"]) == Decimal("0")
+    assert Decimal(buckets[-1]["attributes"]["closing_balance"]) == Decimal("10")
+
+
+@pytest.mark.django_db
+def test_turning_hot_mode_off_flushes(hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+
+    hot_wallet.is_hot = False
+    hot_wallet.save()
+
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("10")
+
+
+@pytest.mark.django_db
+def test_saving_a_wallet_does_not_lock_transactions(django_assert_num_queries):
+    # The INSERT and the UPDATE alone, with no pending deposits looked for
+    with django_assert_num_queries(1):
+        wallet = Wallet.objects.create(label="Cold Wallet")
+    wallet = Wallet.objects.get(pk=wallet.pk)
+    wallet.label = "Renamed"
+    with django_assert_num_queries(1):
+        wallet.save()
+
+
+@pytest.mark.django_db
+def test_turning_hot_mode_off_flushes_a_loaded_wallet(hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+    wallet = Wallet.objects.get(pk=hot_wallet.pk)
+
+    wallet.is_hot = False
+    wallet.save()
+
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("10")
+    assert not Transaction.objects.filter(applied=False).exists()
+
+
+@pytest.mark.django_db
+def test_turning_hot_mode_off_flushes_a_wallet_loaded_without_it(hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+    wallet = Wallet.objects.only("label").get(pk=hot_wallet.pk)
+
+    wallet.is_hot = False
+    wallet.save()
+
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("10")
+    assert not Transaction.objects.filter(applied=False).exists()
+
+
+@pytest.mark.django_db
+def test_wallet_save_keeps_balance_changes(wallet, create_transaction):
+    stale = Wallet.objects.get(pk=wallet.pk)
+    create_transaction("tx-1", Decimal("10"))
+
+    stale.label = "Renamed"
+    stale.save()
+
+    wallet.refresh_from_db()
+    assert wallet.label == "Renamed"
+    assert wallet.balance == Decimal("10")
+
+
+@pytest.mark.django_db
+def test_flush_command(hot_wallet, deposit):
+    deposit("hot-1", Decimal("10"))
+    out = StringIO()
+
+    call_command("flush_hot_wallets", stdout=out)
+
+    assert "Flushed 1 deposits" in out.getvalue()
+    hot_wallet.refresh_from_db()
+    assert hot_wallet.balance == Decimal("10")
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_parallel_deposits_withdrawals_and_flushes_never_overdraw():
+    wallet = Wallet.objects.create(label="Hot Wallet", is_hot=True)
+
+    def work(writer):
+        try:
+            for i in range(20):
+                if writer == 0:
+                    flush_pending_deposits(batch_size=5)
+                    continue
+                amount = Decimal("1") if writer % 2 else Decimal("-2")
+                try:
+                    Transaction.objects.create(
+                        wallet_id=wallet.pk, txid=f"hot-{writer}-{i}", amount=amount
+                    )
+                except ValidationError:
+                    pass
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(work, range(6)))
+    flush_pending_deposits()
+
+    wallet.refresh_from_db()
+    total = wallet.transactions.aggregate(total=Sum("amount"))["total"]
+    assert wallet.balance == total
+    assert wallet.balance >= Decimal("0")
+    assert wallet.transaction_count == wallet.transactions.count()
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_deposit_racing_hot_mode_off_is_applied():
+    wallet = Wallet.objects.create(label="Hot Wallet", is_hot=True)
+    stale = Wallet.objects.get(pk=wallet.pk)
+
+    def deposit():
+        try:
+            return Transaction.objects.create(
+                wallet=stale, txid="hot-1", amount=Decimal("10")
+            )
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with transaction.atomic():
+            wallet.is_hot = False
+            wallet.save()
+            # The deposit still sees the wallet as hot, and waits for the lock
+            future = executor.submit(deposit)
+            time.sleep(0.2)
+            assert not future.done()
+        tx = future.result()
+
+    assert tx.applied is True
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("10")
+    assert not Transaction.objects.filter(applied=False).exists()
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from wallets.models import IdempotencyKey, Transaction, Wallet
+
+
+def post(client, headers, payload, key):
+    return client.post(
+        "/api/transactions/",
+        payload,
+        headers={**headers, "Idempotency-Key": key},
+        format="json",
+    )
+
+
+@pytest.mark.django_db
+def test_retry_replays_stored_response(
+    api_client, headers, wallet, django_assert_max_num_queries, transaction_document
+):
+    payload = transaction_document({"txid": "idem-1", "amount": "10"}, wallet)
+
+    first = post(api_client, headers, payload, "key-1")
+    with django_assert_max_num_queries(4):
+        retry = post(api_client, headers, payload, "key-1")
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert retry["Idempotent-Replayed"] == "true"
+    assert Transaction.objects.count() == 1
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("10")
+
+
+@pytest.mark.django_db
+def test_retry_does_not_validate_or_touch_wallet(
+    api_client, headers, wallet, monkeypatch, transaction_document
+):
+    payload = transaction_document({"txid": "idem-1", "amount": "10"}, wallet)
+    post(api_client, headers, payload, "key-1")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("retry re-ran the write path")
+
+    monkeypatch.setattr("wallets.serializers.TransactionSerializer.validate", fail)
+    monkeypatch.setattr("wallets.models.WalletManager.apply_balance_change", fail)
+
+    assert post(api_client, headers, payload, "key-1").status_code == 201
+
+
+@pytest.mark.django_db
+def test_key_reused_with_different_body(
+    api_client, headers, wallet, transaction_document
+):
+    post(
+        api_client,
+        headers,
+        transaction_document({"txid": "idem-1", "amount": "10"}, wallet),
+        "key-1",
+    )
+
+    response = post(
+        api_client,
+        headers,
+        transaction_document({"txid": "idem-2", "amount": "10"}, wallet),
+        "key-1",
+    )
+
+    assert response.status_code == 422
+    assert Transaction.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_failed_request_is_not_stored(
+    api_client, headers, wallet, transaction_document
+):
+    payload = transaction_document({"txid": "idem-1", "amount": "-10"}, wallet)
+
+    assert post(api_client, headers, payload, "key-1").status_code == 400
+    assert not IdempotencyKey.objects.exists()
+
+    Transaction.objects.create(wallet=wallet, txid="deposit", amount=Decimal("10"))
+    assert post(api_client, headers, payload, "key-1").status_code == 201
+
+
+@pytest.mark.django_db
+def test_expired_key_is_reused(api_client, headers, wallet, transaction_document):
+    payload = transaction_document({"txid": "idem-1", "amount": "10"}, wallet)
+    post(api_client, headers, payload, "key-1")
+    IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    response = post(
+        api_client,
+        headers,
+        transaction_document({"txid": "idem-2", "amount": "5"}, wallet),
+        "key-1",
+    )
+
+    assert response.status_code == 201
+    assert not response.has_header("Idempotent-Replayed")
+    assert Transaction.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_purge_idempotency_keys(wallet):
+    now = timezone.now()
+    IdempotencyKey.objects.create(key="old", fingerprint="x", expires_at=now)
+    IdempotencyKey.objects.create(
+        key="new", fingerprint="x", expires_at=now + timedelta(hours=1)
+    )
+
+    call_command("purge_idempotency_keys")
+
+    assert list(IdempotencyKey.objects.values_list("key", flat=True)) == ["new"]
+
+
+@pytest.mark.django_db
+def test_rejects_empty_key(api_client, headers, wallet, transaction_document):
+    payload = transaction_document({"txid": "idem-1", "amount": "10"}, wallet)
+
+    assert post(api_client, headers, payload, "").status_code == 400
+
+
+@pytest.mark.skipif(
+    connection.vendor == "sqlite", reason="SQLite serializes all writers anyway"
+)
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_duplicates_book_once(headers, transaction_document):
+    wallet = Wallet.objects.create(label="Contended Wallet")
+    payload = transaction_document({"txid": "idem-race", "amount": "1"}, wallet)
+
+    def send(_):
+        try:
+            return post(APIClient(), headers, payload, "race-key")
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(send, range(8)))
+
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.content for response in responses}) == 1
+    assert (
+        sum(response.has_header("Idempotent-Replayed") for response in responses) == 7
+    )
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("1")
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.utils import timezone
+
+from wallets.models import Transaction, Wallet, WalletBalanceSnapshot
+from wallets.services import compact_balance_snapshots, ledger_balance
+
+
+def compact():
+    return compact_balance_snapshots(timezone.now() + timedelta(seconds=1))
+
+
+@pytest.mark.django_db
+def test_ledger_balance_without_snapshots(wallet, create_transaction):
+    create_transaction("l-1", Decimal("10"))
+    create_transaction("l-2", Decimal("-4"))
+
+    assert ledger_balance(wallet.id) == Decimal("6")
+
+
+@pytest.mark.django_db
+def test_compaction_builds_on_previous_snapshot(wallet, create_transaction):
+    create_transaction("l-1", Decimal("10"))
+    create_transaction("l-2", Decimal("5"))
+    (first,) = compact()
+    assert first.balance == Decimal("15")
+    assert first.transaction_count == 2
+
+    tx3 = create_transaction("l-3", Decimal("-3"))
+    (second,) = compact()
+    assert second.transaction_id == tx3.id
+    assert second.balance == Decimal("12")
+    assert second.transaction_count == 3
+
+    assert compact() == []
+
+
+@pytest.mark.django_db
+def test_compaction_cuts_tails_by_transaction_id(wallet, create_transaction):
+    before = timezone.now() + timedelta(seconds=1)
+    late = create_transaction("l-1", Decimal("5"))
+    create_transaction("l-2", Decimal("7"))
+    # Committed out of order: the lower id was created after the cutoff
+    Transaction.objects.filter(pk=late.pk).update(
+        created_at=before + timedelta(minutes=1)
+    )
+
+    (snapshot,) = compact_balance_snapshots(before)
+
+    assert snapshot.balance == Decimal("12")
+    assert snapshot.transaction_count == 2
+    assert ledger_balance(wallet.id) == Decimal("12")
+
+
+@pytest.mark.django_db
+def test_ledger_balance_as_of_transaction(wallet, create_transaction):
+    tx1 = create_transaction("l-1", Decimal("10"))
+    tx2 = create_transaction("l-2", Decimal("5"))
+    compact()
+    tx3 = create_transaction("l-3", Decimal("-3"))
+
+    assert ledger_balance(wallet.id, tx1.id) == Decimal("10")
+    assert ledger_balance(wallet.id, tx2.id) == Decimal("15")
+    assert ledger_balance(wallet.id, tx3.id) == Decimal("12")
+    assert ledger_balance(wallet.id) == Decimal("12")
+
+
+@pytest.mark.django_db
+def test_changing_a_transaction_invalidates_snapshots(wallet, create_transaction):
+    tx = create_transaction("l-1", Decimal("10"))
+    create_transaction("l-2", Decimal("5"))
+    compact()
+
+    tx.amount = Decimal("20")
+    tx.save()
+    assert not WalletBalanceSnapshot.objects.exists()
+    assert ledger_balance(wallet.id) == Decimal("25")
+
+
+@pytest.mark.django_db
+def test_ledger_mode_makes_transactions_immutable(settings, wallet, create_transaction):
+    settings.WALLETS_LEDGER_MODE = True
+    tx = create_transaction("l-1", Decimal("10"))
+
+    tx.amount = Decimal("20")
+    with pytest.raises(ValidationError):
+        tx.save()
+    with pytest.raises(ValidationError):
+        tx.delete()
+
+
+@pytest.mark.django_db
+def test_compact_command_verifies_balances(wallet, create_transaction):
+    create_transaction("l-1", Decimal("10"))
+    out = StringIO()
+
+    call_command(
+        "compact_balance_snapshots",
+        "--min-tail=1",
+        "--settle-seconds=0",
+        "--verify",
+        stdout=out,
+    )
+
+    assert "All wallet balances match" in out.getvalue()
+    assert WalletBalanceSnapshot.objects.filter(wallet=wallet).count() == 1
+
+
+@pytest.mark.django_db
+def test_compact_command_verifies_hot_wallets_with_pending_deposits():
+    hot = Wallet.objects.create(label="Hot wallet", is_hot=True)
+    Transaction.objects.create(wallet=hot, txid="l-hot", amount=Decimal("10"))
+    out = StringIO()
+
+    call_command(
+        "compact_balance_snapshots", "--settle-seconds=0", "--verify", stdout=out
+    )
+
+    assert Transaction.objects.filter(applied=False).exists()
+    assert "All wallet balances match" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_api_rejects_changes_in_ledger_mode(
+    settings, api_client, headers, create_transaction
+):
+    settings.WALLETS_LEDGER_MODE = True
+    tx = create_transaction("l-1", Decimal("10"))
+
+    response = api_client.delete(f"/api/transactions/{tx.id}/", headers=headers)
+
+    assert response.status_code == 400
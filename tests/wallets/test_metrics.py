@@ -0,0 +1,158 @@
+import re
+import time
+from decimal import Decimal
+
+import pytest
+
+from wallets.metrics import Histogram, render_metrics
+from wallets.renderers import FastJSONRenderer
+
+pytestmark = pytest.mark.usefixtures("clear_metrics")
+
+
+def metric_value(text, line_start):
+    (line,) = [line for line in text.splitlines() if line.startswith(line_start + " ")]
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test", (0.1, 1), ("endpoint",))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(("a",), value)
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{endpoint="a",le="0.1"} 2',
+        'test_seconds_bucket{endpoint="a",le="1"} 3',
+        'test_seconds_bucket{endpoint="a",le="+Inf"} 4',
+        'test_seconds_sum{endpoint="a"} 3.65',
+        'test_seconds_count{endpoint="a"} 4',
+    ]
+
+
+@pytest.mark.django_db
+def test_metrics_per_endpoint_and_action(api_client, wallet, create_transaction):
+    create_transaction("tx-1", Decimal("10"))
+    api_client.get(f"/api/wallets/{wallet.pk}/")
+    api_client.get("/api/transactions/")
+    api_client.get("/api/transactions/")
+
+    response = api_client.get("/api/metrics/")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    assert (
+        metric_value(
+            text,
+            'wallets_requests_total{endpoint="transaction-list",action="list",'
+            'status="200"}',
+        )
+        == 2
+    )
+    assert (
+        metric_value(
+            text,
+            'wallets_request_duration_seconds_count{endpoint="wallet-detail",'
+            'action="retrieve"}',
+        )
+        == 1
+    )
+    assert (
+        metric_value(
+            text,
+            'wallets_request_db_queries_sum{endpoint="transaction-list",'
+            'action="list"}',
+        )
+        >= 2
+    )
+    assert (
+        metric_value(
+            text,
+            'wallets_request_phase_duration_seconds_count{endpoint="transaction-list",'
+            'action="list",phase="render"}',
+        )
+        == 2
+    )
+    assert 'wallets_cache_lookups_total{result="miss"}' in text
+
+
+@pytest.mark.django_db
+def test_balance_update_phase_is_recorded(
+    api_client, wallet, headers, transaction_document
+):
+    api_client.post(
+        "/api/transactions/",
+        transaction_document({"txid": "tx-1", "amount": "5"}, wallet),
+        format="json",
+        headers=headers,
+    )
+
+    text = api_client.get("/api/metrics/").content.decode()
+    assert (
+        metric_value(
+            text,
+            'wallets_request_phase_duration_seconds_count{endpoint="transaction-list",'
+            'action="create",phase="balance_update"}',
+        )
+        == 1
+    )
+
+
+@pytest.mark.django_db
+def test_cached_responses_record_their_render_time(api_client, wallet, monkeypatch):
+    render = FastJSONRenderer.render
+
+    def slow_render(*args, **kwargs):
+        time.sleep(0.05)
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(FastJSONRenderer, "render", slow_render)
+    api_client.get(f"/api/wallets/{wallet.pk}/")
+
+    text = api_client.get("/api/metrics/").content.decode()
+    # The cache miss renders in the view, before the middleware sees the response
+    assert (
+        metric_value(
+            text,
+            'wallets_request_phase_duration_seconds_count{endpoint="wallet-detail",'
+            'action="retrieve",phase="render"}',
+        )
+        == 1
+    )
+    assert (
+        metric_value(
+            text,
+            'wallets_request_phase_duration_seconds_sum{endpoint="wallet-detail",'
+            'action="retrieve",phase="render"}',
+        )
+        >= 0.05
+    )
+
+
+@pytest.mark.django_db
+def test_server_timing_header(api_client, wallet, settings):
+    assert "Server-Timing" not in api_client.get("/api/transactions/")
+
+    settings.WALLETS_SERVER_TIMING = True
+    response = api_client.get("/api/transactions/")
+
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=[\d.]+',
+        response["Server-Timing"],
+    )
+
+
+@pytest.mark.django_db
+def test_async_view_queries_are_counted(api_client, wallet):
+    api_client.get(f"/api/async/wallets/{wallet.pk}/")
+
+    assert (
+        metric_value(
+            render_metrics(),
+            'wallets_request_db_queries_sum{endpoint="async-wallet-detail",'
+            'action="get"}',
+        )
+        == 1
+    )
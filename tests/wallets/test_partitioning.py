@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone as django_timezone
+
+from wallets.filters import TransactionFilter
+from wallets.models import Transaction
+from wallets.partitioning import (
+    DEFAULT_PARTITION,
+    default_partition_rows,
+    get_partitions,
+    is_partitioned,
+)
+from wallets.services import ledger_balance
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Partitioning needs PostgreSQL"
+)
+
+
+def month(year, month):
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def partitioned(wallet, create_transaction):
+    """
+    Partitioned table holding one transaction in January and one in March 2026
+    """
+    for txid, created_at in [("p-1", month(2026, 1)), ("p-2", month(2026, 3))]:
+        tx = create_transaction(txid, Decimal("10"))
+        Transaction.objects.filter(pk=tx.pk).update(created_at=created_at)
+
+    call_command("partition_transactions", "convert", months_ahead=2)
+    return wallet
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+@pytest.mark.django_db
+def test_convert_keeps_rows_and_creates_monthly_partitions(partitioned):
+    assert is_partitioned()
+    this_month = django_timezone.now().replace(day=1)
+    partitions = get_partitions()
+    assert month(2026, 1) in partitions
+    assert month(2026, 2) in partitions
+    assert max(partitions) > this_month
+
+    assert set(Transaction.objects.values_list("txid", flat=True)) == {"p-1", "p-2"}
+    tx = Transaction.objects.create(
+        wallet=partitioned, txid="p-3", amount=Decimal("-5")
+    )
+    assert tx.pk > Transaction.objects.get(txid="p-2").pk
+    assert ledger_balance(partitioned.pk) == Decimal("15")
+
+
+@pytest.mark.django_db
+def test_txid_stays_globally_unique(partitioned, create_transaction):
+    # The duplicate would land in another partition than the original
+    with pytest.raises(IntegrityError), transaction.atomic():
+        create_transaction("p-1", Decimal("1"))
+
+    tx = Transaction.objects.get(txid="p-2")
+    tx.txid = "p-renamed"
+    tx.save()
+    create_transaction("p-2", Decimal("1"))
+    with pytest.raises(IntegrityError), transaction.atomic():
+        create_transaction("p-renamed", Decimal("1"))
+
+    Transaction.objects.get(txid="p-renamed").delete()
+    create_transaction("p-renamed", Decimal("1"))
+
+
+@pytest.mark.django_db
+def test_duplicate_txid_is_a_validation_error_in_the_api(
+    api_client, partitioned, headers, transaction_document
+):
+    response = api_client.post(
+        "/api/transactions/",
+        transaction_document({"txid": "p-1", "amount": "1"}, partitioned),
+        format="json",
+        headers=headers,
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_created_at_filters_prune_partitions(partitioned):
+    filterset = TransactionFilter(
+        data={
+            "created_after": "2026-03-01T00:00:00Z",
+            "created_before": "2026-04-01T00:00:00Z",
+        },
+        queryset=Transaction.objects.all(),
+    )
+    assert [tx.txid for tx in filterset.qs] == ["p-2"]
+
+    plan = explain(filterset.qs)
+    assert "wallets_transaction_p2026_03" in plan
+    assert "wallets_transaction_p2026_01" not in plan
+
+
+@pytest.mark.django_db
+def test_maintain_creates_future_and_detaches_old_partitions(partitioned):
+    call_command("partition_transactions", "maintain", months_ahead=6)
+    this_month = django_timezone.now().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    assert len([start for start in get_partitions() if start > this_month]) == 6
+
+    months = (this_month.year - 2026) * 12 + this_month.month - 2
+    call_command("partition_transactions", "maintain", retain_months=months, drop=True)
+
+    assert month(2026, 1) not in get_partitions()
+    assert list(Transaction.objects.values_list("txid", flat=True)) == ["p-2"]
+    # A snapshot covers the detached transaction
+    assert ledger_balance(partitioned.pk) == Decimal("20")
+    # Detached txids stay reserved
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Transaction.objects.create(wallet=partitioned, txid="p-1", amount=1)
+
+
+@pytest.mark.django_db
+def test_rows_past_the_partitions_go_to_the_default_partition(partitioned):
+    this_month = django_timezone.now().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    later = month(this_month.year + 1, this_month.month)
+    tx = Transaction.objects.create(
+        wallet=partitioned, txid="p-later", amount=Decimal("1")
+    )
+    Transaction.objects.filter(pk=tx.pk).update(created_at=later)
+    assert default_partition_rows() == 1
+
+    call_command("partition_transactions", "maintain", months_ahead=12)
+
+    assert default_partition_rows() == 0
+    assert later in get_partitions()
+    plan = explain(Transaction.objects.filter(created_at=later))
+    assert get_partitions()[later] in plan
+    assert DEFAULT_PARTITION not in plan
+    assert Transaction.objects.get(txid="p-later").created_at == later
+    with pytest.raises(IntegrityError), transaction.atomic():
+        Transaction.objects.create(wallet=partitioned, txid="p-later", amount=1)
+
+
+@pytest.mark.django_db
+def test_commands_refuse_the_wrong_state(wallet):
+    with pytest.raises(Exception, match="not partitioned"):
+        call_command("partition_transactions", "maintain")
+
+    call_command("partition_transactions", "convert")
+    with pytest.raises(Exception, match="already partitioned"):
+        call_command("partition_transactions", "convert")
+
+
+@pytest.mark.django_db
+def test_balance_checks_still_apply(partitioned):
+    with pytest.raises(ValidationError):
+        Transaction.objects.create(
+            wallet=partitioned, txid="p-3", amount=Decimal("-100")
+        )
@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.test import APIClient
+
+from wallets.cache import wallet_cache
+from wallets.models import Transaction, Wallet
+from wallets.routers import REPLICA, ReplicaRouter, read_from
+
+pytestmark = pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, "replica"])
+
+
+@pytest.fixture
+def replica(settings):
+    settings.WALLETS_READ_REPLICAS = ["replica"]
+    return "replica"
+
+
+def test_list_and_retrieve_read_from_replica(api_client, replica, create_transaction):
+    wallet = create_transaction("tx-1", Decimal("10")).wallet
+    Wallet.objects.using(replica).create(pk=wallet.pk, label="Replica copy")
+
+    assert api_client.get("/api/transactions/").json()["data"] == []
+    response = api_client.get(f"/api/wallets/{wallet.pk}/")
+    assert response.json()["data"]["attributes"]["label"] == "Replica copy"
+    # Cached only in the shared cache, for as long as reads stick to the primary
+    assert wallet_cache.get_stats()["local_size"] == 0
+    api_client.get(f"/api/wallets/{wallet.pk}/")
+    assert wallet_cache.get_stats()["shared_hits"] == 1
+    assert wallet_cache.get_stats()["local_size"] == 0
+
+
+def test_writes_and_reads_after_them_use_primary(
+    api_client, headers, replica, wallet, settings, transaction_document
+):
+    response = api_client.post(
+        "/api/transactions/",
+        transaction_document({"txid": "tx-1", "amount": "5"}, wallet),
+        format="json",
+        headers=headers,
+    )
+
+    assert response.status_code == 201
+    cookie = response.cookies[settings.WALLETS_REPLICA_COOKIE]
+    assert cookie["max-age"] == settings.WALLETS_REPLICA_STICKY_SECONDS
+    wallet.refresh_from_db()
+    assert wallet.balance == Decimal("5")
+    assert not Transaction.objects.using(replica).exists()
+
+    # The client reads its own write
+    assert len(api_client.get("/api/transactions/").json()["data"]) == 1
+    assert api_client.get(f"/api/wallets/{wallet.pk}/").status_code == 200
+
+    del api_client.cookies[settings.WALLETS_REPLICA_COOKIE]
+    assert api_client.get("/api/transactions/").json()["data"] == []
+
+
+def test_pinned_reads_skip_entries_cached_from_replica(
+    api_client, headers, replica, wallet, transaction_document
+):
+    Wallet.objects.using(replica).create(pk=wallet.pk, label=wallet.label)
+    response = api_client.post(
+        "/api/transactions/",
+        transaction_document({"txid": "tx-1", "amount": "5"}, wallet),
+        format="json",
+        headers=headers,
+    )
+    assert response.status_code == 201
+
+    # Another client caches what the lagging replica returns
+    stale = APIClient(headers=headers).get(f"/api/wallets/{wallet.pk}/")
+    assert Decimal(stale.json()["data"]["attributes"]["balance"]) == Decimal("0")
+
+    response = api_client.get(f"/api/wallets/{wallet.pk}/")
+    assert Decimal(response.json()["data"]["attributes"]["balance"]) == Decimal("5")
+
+
+def test_reads_use_primary_without_replicas(
+    api_client, headers, wallet, settings, transaction_document
+):
+    response = api_client.post(
+        "/api/transactions/",
+        transaction_document({"txid": "tx-1", "amount": "5"}, wallet),
+        format="json",
+        headers=headers,
+    )
+
+    assert settings.WALLETS_REPLICA_COOKIE not in response.cookies
+    assert len(api_client.get("/api/transactions/").json()["data"]) == 1
+
+
+def test_router_sends_writes_to_primary(replica):
+    router = ReplicaRouter()
+
+    assert router.db_for_read(Wallet) == DEFAULT_DB_ALIAS
+    with read_from(REPLICA):
+        assert router.db_for_read(Wallet) == replica
+        assert router.db_for_write(Wallet) == DEFAULT_DB_ALIAS
+
+
+def test_one_replica_serves_a_whole_block(settings):
+    settings.WALLETS_READ_REPLICAS = ["replica_1", "replica_2"]
+    router = ReplicaRouter()
+
+    with read_from(REPLICA):
+        aliases = {router.db_for_read(Wallet) for _ in range(20)}
+    assert len(aliases) == 1
+    assert aliases <= {"replica_1", "replica_2"}
+    assert router.db_for_read(Wallet) == DEFAULT_DB_ALIAS
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from wallets.models import Transaction, Wallet
+
+
+def trigram_installed():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def plan(queryset):
+    with connection.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_seqscan = off")
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("filter[txid]=APPLE", ["banana-apple", "test-apple-1", "test-apple-2"]),
+        ("filter[txid_prefix]=test-apple", ["test-apple-1", "test-apple-2"]),
+        ("filter[txid_prefix]=apple", []),
+        ("filter[txid_exact]=test-apple-1", ["test-apple-1"]),
+        ("filter[txid_exact]=test-apple", []),
+    ],
+)
+def test_txid_search_modes(api_client, create_transaction, query, expected):
+    for txid in ["test-apple-1", "test-apple-2", "banana-apple"]:
+        create_transaction(txid, Decimal("1"))
+
+    response = api_client.get(f"/api/transactions/?{query}&sort=txid")
+
+    assert response.status_code == 200
+    assert [item["attributes"]["txid"] for item in response.json()["data"]] == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("filter[label]=SAVINGS", ["Holiday savings", "Savings"]),
+        ("filter[label_prefix]=sav", ["Savings"]),
+        ("filter[label_exact]=savings", ["Savings"]),
+    ],
+)
+def test_wallet_label_search_modes(api_client, query, expected):
+    for label in ["Savings", "Holiday savings", "Checking"]:
+        Wallet.objects.create(label=label)
+
+    for prefix in ["/api/wallets/", "/api/async/wallets/"]:
+        response = api_client.get(f"{prefix}?{query}&sort=label")
+
+        assert response.status_code == 200
+        labels = [item["attributes"]["label"] for item in response.json()["data"]]
+        assert labels == expected
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Search indexes are PostgreSQL only"
+)
+@pytest.mark.django_db
+def test_prefix_searches_use_indexes():
+    assert "wallets_wallet_label_upper_like" in plan(
+        Wallet.objects.filter(label__istartswith="sav")
+    )
+    assert "wallets_wallet_label_upper_like" in plan(
+        Wallet.objects.filter(label__iexact="savings")
+    )
+    # Served by the pattern index Django creates for the unique txid column
+    assert "Seq Scan" not in plan(Transaction.objects.filter(txid__startswith="test-"))
+
+
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Search indexes are PostgreSQL only"
+)
+@pytest.mark.django_db
+def test_substring_searches_use_trigram_indexes():
+    if not trigram_installed():
+        pytest.skip("pg_trgm is not available on this server")
+
+    assert "wallets_transaction_txid_trgm" in plan(
+        Transaction.objects.filter(txid__icontains="apple")
+    )
+    assert "wallets_wallet_label_trgm" in plan(
+        Wallet.objects.filter(label__icontains="savings")
+    )
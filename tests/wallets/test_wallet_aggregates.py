@@ -0,0 +1,124 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from wallets.models import Transaction, Wallet
+from wallets.services import Transfer, bulk_create_transactions, create_transfers
+
+
+def aggregates(wallet):
+    wallet.refresh_from_db()
+    return (
+        wallet.transaction_count,
+        wallet.total_credits,
+        wallet.total_debits,
+    )
+
+
+@pytest.mark.django_db
+def test_aggregates_follow_creates_updates_and_deletes(wallet, create_transaction):
+    before = timezone.now()
+    create_transaction("agg-1", Decimal("100"))
+    tx = create_transaction("agg-2", Decimal("-30"))
+
+    assert aggregates(wallet) == (2, Decimal("100"), Decimal("30"))
+    assert wallet.last_transaction_at >= before
+
+    tx.amount = Decimal("20")
+    tx.save()
+    assert aggregates(wallet) == (2, Decimal("120"), Decimal("0"))
+
+    tx.delete()
+    assert aggregates(wallet) == (1, Decimal("100"), Decimal("0"))
+
+
+@pytest.mark.django_db
+def test_aggregates_follow_transaction_moved_to_other_wallet(
+    wallet, create_transaction
+):
+    other = Wallet.objects.create(label="Other Wallet")
+    tx = create_transaction("agg-1", Decimal("10"))
+
+    tx.wallet = other
+    tx.save()
+
+    assert aggregates(wallet) == (0, Decimal("0"), Decimal("0"))
+    assert aggregates(other) == (1, Decimal("10"), Decimal("0"))
+    assert other.last_transaction_at is not None
+
+
+@pytest.mark.django_db
+def test_aggregates_follow_bulk_creates_and_transfers(wallet):
+    other = Wallet.objects.create(label="Other Wallet")
+    bulk_create_transactions(
+        [
+            Transaction(wallet=wallet, txid="agg-1", amount=Decimal("50")),
+            Transaction(wallet=wallet, txid="agg-2", amount=Decimal("-5")),
+        ]
+    )
+    create_transfers(
+        [
+            Transfer(
+                txid="agg-tr",
+                source=wallet,
+                destination=other,
+                amount=Decimal("15"),
+            )
+        ]
+    )
+
+    assert aggregates(wallet) == (3, Decimal("50"), Decimal("20"))
+    assert aggregates(other) == (1, Decimal("15"), Decimal("0"))
+
+
+@pytest.mark.django_db
+def test_recompute_command_repairs_aggregates(wallet, create_transaction):
+    create_transaction("agg-1", Decimal("100"))
+    last = create_transaction("agg-2", Decimal("-30"))
+    empty = Wallet.objects.create(label="Empty Wallet")
+    Wallet.objects.update(
+        transaction_count=7,
+        total_credits=Decimal("1"),
+        total_debits=Decimal("1"),
+        last_transaction_at=timezone.now() - timedelta(days=1),
+    )
+
+    call_command("recompute_wallet_aggregates", "--batch-size", "1")
+
+    assert aggregates(wallet) == (2, Decimal("100"), Decimal("30"))
+    assert wallet.last_transaction_at == last.created_at
+    assert aggregates(empty) == (0, Decimal("0"), Decimal("0"))
+    assert empty.last_transaction_at is None
+
+
+@pytest.mark.django_db
+def test_wallet_aggregates_are_sortable_and_filterable(api_client, wallet):
+    busy = Wallet.objects.create(label="Busy Wallet")
+    for i in range(3):
+        busy.transactions.create(txid=f"agg-{i}", amount=Decimal("10"))
+    wallet.transactions.create(txid="agg-single", amount=Decimal("1"))
+
+    response = api_client.get("/api/wallets/?sort=-transaction_count")
+    data = response.json()["data"]
+    assert [item["id"] for item in data] == [str(busy.pk), str(wallet.pk)]
+    assert data[0]["attributes"]["transaction_count"] == 3
+    assert data[0]["attributes"]["total_credits"] == "30.000000000000000000"
+
+    response = api_client.get("/api/wallets/?filter[total_credits_min]=5")
+    assert [item["id"] for item in response.json()["data"]] == [str(busy.pk)]
+
+
+@pytest.mark.django_db
+def test_admin_changelist_does_not_count_per_row(
+    admin_client, django_assert_max_num_queries
+):
+    for i in range(20):
+        Wallet.objects.create(label=f"Wallet {i}")
+
+    with django_assert_max_num_queries(8):
+        response = admin_client.get("/admin/wallets/wallet/")
+
+    assert response.status_code == 200
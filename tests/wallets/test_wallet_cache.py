@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+import pytest
+
+from wallets.cache import wallet_cache
+
+
+def get_balance(api_client, wallet):
+    response = api_client.get(f"/api/wallets/{wallet.id}/")
+    assert response.status_code == 200
+    return Decimal(response.json()["data"]["attributes"]["balance"])
+
+
+@pytest.mark.django_db
+def test_wallet_detail_is_served_from_cache(
+    api_client, wallet, django_assert_num_queries
+):
+    get_balance(api_client, wallet)
+
+    with django_assert_num_queries(0):
+        get_balance(api_client, wallet)
+
+    stats = wallet_cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["local_hits"] == 1
+
+
+@pytest.mark.django_db
+def test_transaction_invalidates_wallet_detail_and_list(
+    api_client, wallet, create_transaction
+):
+    assert get_balance(api_client, wallet) == Decimal("0")
+    api_client.get("/api/wallets/")
+
+    tx = create_transaction("cache-1", Decimal("12"))
+    assert get_balance(api_client, wallet) == Decimal("12")
+    response = api_client.get("/api/wallets/")
+    assert Decimal(response.json()["data"][0]["attributes"]["balance"]) == 12
+
+    tx.delete()
+    assert get_balance(api_client, wallet) == Decimal("0")
+
+
+@pytest.mark.django_db
+def test_wallet_update_invalidates_list(api_client, headers, wallet):
+    api_client.get("/api/wallets/")
+
+    api_client.patch(
+        f"/api/wallets/{wallet.id}/",
+        {
+            "data": {
+                "type": "Wallet",
+                "id": str(wallet.id),
+                "attributes": {"label": "X"},
+            }
+        },
+        headers=headers,
+        format="json",
+    )
+
+    response = api_client.get("/api/wallets/")
+    assert response.json()["data"][0]["attributes"]["label"] == "X"
+
+
+@pytest.mark.django_db
+def test_wallet_delete_invalidates_detail_and_list(api_client, wallet):
+    get_balance(api_client, wallet)
+    assert len(api_client.get("/api/wallets/").json()["data"]) == 1
+
+    assert api_client.delete(f"/api/wallets/{wallet.id}/").status_code == 204
+
+    assert api_client.get(f"/api/wallets/{wallet.id}/").status_code == 404
+    assert api_client.get("/api/wallets/").json()["data"] == []
+
+
+@pytest.mark.django_db
+def test_cache_stats_endpoint(api_client, wallet):
+    get_balance(api_client, wallet)
+    get_balance(api_client, wallet)
+
+    response = api_client.get("/api/cache-stats/", HTTP_ACCEPT="application/json")
+
+    assert response.status_code == 200
+    assert response.json()["misses"] == 1
+    assert response.json()["local_hits"] == 1
+
+
+@pytest.mark.django_db
+def test_entries_cached_before_commit_are_discarded_after_commit(
+    api_client, wallet, create_transaction, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks() as callbacks:
+        create_transaction("cache-1", Decimal("5"))
+        # A concurrent reader could cache the pre-commit state here
+        get_balance(api_client, wallet)
+        hits = wallet_cache.get_stats()["local_hits"]
+
+    for callback in callbacks:
+        callback()
+    get_balance(api_client, wallet)
+
+    assert wallet_cache.get_stats()["local_hits"] == hits
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import copy
 import os
 from pathlib import Path
 
@@ -52,7 +53,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its latency covers every other middleware
+    "wallets.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "wallets.middleware.PrimaryStickinessMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -92,6 +96,56 @@ DATABASES = {
         "PASSWORD": os.environ.get("POSTGRES_PASSWORD"),
         "HOST": os.environ.get("POSTGRES_HOST", "db"),
         "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+        # Connections are kept open between requests, and checked before reuse
+        "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": (
+            os.environ.get("POSTGRES_CONN_HEALTH_CHECKS", "True").lower() == "true"
+        ),
+    }
+}
+
+# Or a psycopg connection pool per process, shared by its threads (use it under ASGI,
+# where persistent connections are not reused). Connections are checked on checkout
+if os.environ.get("POSTGRES_POOL", "False").lower() == "true":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "10")),
+            # Seconds to wait for a connection before failing the request
+            "timeout": float(os.environ.get("POSTGRES_POOL_TIMEOUT", "10")),
+            # Idle connections above min_size are closed after this many seconds
+            "max_idle": float(os.environ.get("POSTGRES_POOL_MAX_IDLE", "600")),
+        }
+    }
+
+# Read replicas as comma separated host[:port], e.g. "replica-1,replica-2:5433", with
+# the credentials of the primary. List and retrieve reads are spread over them
+WALLETS_READ_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.environ.get("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1
+):
+    host, _, port = replica.strip().partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = copy.deepcopy(DATABASES["default"]) | {
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        # Tests read the test database of the primary through replica aliases
+        "TEST": {"MIRROR": "default"},
+    }
+    WALLETS_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["wallets.routers.ReplicaRouter"]
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("DJANGO_CACHE_LOCATION", ""),
     }
 }
 
@@ -153,3 +207,27 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework_json_api.pagination.JsonApiPageNumberPagination",
     "PAGE_SIZE": 10,
 }
+
+# Wallets
+# Ledger mode makes transactions append-only: corrections are new transactions
+WALLETS_LEDGER_MODE = os.environ.get("WALLETS_LEDGER_MODE", "False").lower() == "true"
+# Wallet responses cache: entries per process in front of CACHES["default"]
+WALLETS_CACHE_LOCAL_SIZE = int(os.environ.get("WALLETS_CACHE_LOCAL_SIZE", "1024"))
+WALLETS_CACHE_TIMEOUT = int(os.environ.get("WALLETS_CACHE_TIMEOUT", "300"))
+# Seconds a stored Idempotency-Key response is replayed for
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", "86400"))
+# Send per-request DB, render and total timings in a Server-Timing header
+WALLETS_SERVER_TIMING = (
+    os.environ.get("WALLETS_SERVER_TIMING", "False").lower() == "true"
+)
+# OpenAPI schema artifacts, one per code version (see wallets/schema.py). The version
+# is a hash of the sources unless set, e.g. to the deployed commit
+WALLETS_SCHEMA_DIR = os.environ.get(
+    "WALLETS_SCHEMA_DIR", os.path.join(BASE_DIR, "schema")
+)
+WALLETS_CODE_VERSION = os.environ.get("WALLETS_CODE_VERSION", "")
+# Seconds a client's reads stay on the primary after it writes, covering replica lag
+WALLETS_REPLICA_STICKY_SECONDS = int(
+    os.environ.get("WALLETS_REPLICA_STICKY_SECONDS", "5")
+)
+WALLETS_REPLICA_COOKIE = "wallets_primary"
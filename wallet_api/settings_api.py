@@ -0,0 +1,41 @@
+"""
+API-only runtime profile, for the workers serving the API
+
+Leaves out the admin, auth, sessions, messages, static files and the schema generator,
+so a worker imports and holds only what the API needs. The OpenAPI schema is generated
+once at build time (`manage.py build_schema`) and served from `WALLETS_SCHEMA_DIR`. Run
+the admin and the interactive docs from a worker on `wallet_api.settings`.
+"""
+
+from wallet_api.settings import *  # noqa: F401,F403
+from wallet_api.settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    "rest_framework",
+    "rest_framework_json_api",
+    "django_filters",
+    "wallets",
+]
+
+MIDDLEWARE = [
+    "wallets.middleware.MetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "wallets.middleware.PrimaryStickinessMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "wallet_api.urls_api"
+
+# No HTML is rendered by the API
+TEMPLATES = []
+
+# The API is not authenticated, so requests carry no user (and need no auth models)
+REST_FRAMEWORK = {
+    **{
+        name: value
+        for name, value in REST_FRAMEWORK.items()
+        if name != "DEFAULT_SCHEMA_CLASS"
+    },
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+}
@@ -15,20 +15,59 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import hashlib
+
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (SpectacularAPIView, SpectacularRedocView,
-                                   SpectacularSwaggerView)
+from django.utils.module_loading import import_string
+from django.views.decorators.http import condition
+
+from wallets.schema import code_version
+from wallets.views import schema
+
+
+def lazy_view(import_path: str, **initkwargs):
+    """
+    Class-based view imported on its first request
+    Keeps the schema generator out of worker startup
+    """
+    view = None
+
+    def load(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(import_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return load
+
+
+def docs_etag(request):
+    # The pages embed a CSRF token, which stays valid while the cookie does
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+    return f"{code_version()}-{hashlib.sha256(csrf_cookie.encode()).hexdigest()[:16]}"
+
+
+docs_page = condition(etag_func=docs_etag)
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("wallets.urls")),
-    # Swagger
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    # Swagger, on the schema generated once per code version
+    path("api/schema/", schema, name="schema"),
     path(
         "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        docs_page(
+            lazy_view("drf_spectacular.views.SpectacularSwaggerView", url_name="schema")
+        ),
         name="swagger-ui",
     ),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path(
+        "api/redoc/",
+        docs_page(
+            lazy_view("drf_spectacular.views.SpectacularRedocView", url_name="schema")
+        ),
+        name="redoc",
+    ),
 ]
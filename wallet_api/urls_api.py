@@ -0,0 +1,15 @@
+"""
+URL configuration of the API-only profile (`wallet_api.settings_api`)
+
+The API plus the OpenAPI schema prebuilt by `manage.py build_schema`. The admin and
+the interactive docs are only routed by `wallet_api.urls`.
+"""
+
+from django.urls import include, path
+
+from wallets.views import schema
+
+urlpatterns = [
+    path("api/", include("wallets.urls")),
+    path("api/schema/", schema, name="schema"),
+]
@@ -1,21 +1,31 @@
 from django.contrib import admin
 
-from wallets.models import Transaction, Wallet
+from wallets.models import IdempotencyKey, Transaction, Wallet, WalletBalanceSnapshot
 
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
-    list_display = ("id", "label", "balance", "transaction_count")
-    readonly_fields = ("balance",)
+    list_display = (
+        "id",
+        "label",
+        "balance",
+        "transaction_count",
+        "total_credits",
+        "total_debits",
+        "last_transaction_at",
+        "is_hot",
+    )
+    readonly_fields = (
+        "balance",
+        "transaction_count",
+        "total_credits",
+        "total_debits",
+        "last_transaction_at",
+    )
     search_fields = ("label",)
-    list_filter = ()
+    list_filter = ("is_hot",)
     ordering = ("id",)
 
-    def transaction_count(self, obj):
-        return obj.transactions.count()
-
-    transaction_count.short_description = "Transactions"
-
     class TransactionInline(admin.TabularInline):
         model = Transaction
         extra = 0
@@ -28,7 +38,7 @@ class WalletAdmin(admin.ModelAdmin):
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ("id", "txid", "wallet", "amount", "created_at")
+    list_display = ("id", "txid", "wallet", "amount", "applied", "created_at")
     search_fields = ("txid",)
     list_filter = ("wallet",)
     ordering = ("-created_at",)
@@ -44,3 +54,19 @@ class TransactionAdmin(admin.ModelAdmin):
             },
         ),
     )
+
+
+@admin.register(WalletBalanceSnapshot)
+class WalletBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "wallet", "transaction_id", "balance", "created_at")
+    list_filter = ("wallet",)
+    ordering = ("-transaction_id",)
+    readonly_fields = ("wallet", "transaction_id", "balance", "transaction_count")
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ("key", "status_code", "created_at", "expires_at")
+    search_fields = ("key",)
+    ordering = ("-created_at",)
+    readonly_fields = ("key", "fingerprint", "status_code", "content_type", "content")
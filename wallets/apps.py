@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class WalletsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "wallets"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from wallets.metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
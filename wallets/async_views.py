@@ -0,0 +1,153 @@
+"""
+Async read endpoints, so one ASGI worker can serve many slow or long-lived clients
+
+Documents have the same shape as the DRF endpoints. Lists are always keyset paginated,
+so a page never needs a COUNT(*).
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework_json_api.renderers import JSONRenderer as JsonApiRenderer
+
+from wallets import services
+from wallets.filters import TransactionFilter, WalletFilter
+from wallets.models import Transaction, Wallet
+from wallets.pagination import JsonApiCursorPagination
+from wallets.renderers import ResourceBuilder
+from wallets.views import TransactionViewSet, WalletViewSet
+
+wallet_builder = ResourceBuilder(WalletViewSet.serializer_class)
+transaction_builder = ResourceBuilder(TransactionViewSet.serializer_class)
+
+# Keyset pagination needs non-nullable sort fields
+WALLET_SORT_FIELDS = [
+    field
+    for field in WalletViewSet.ordering_fields
+    if not Wallet._meta.get_field(field).null
+]
+
+
+async def add_pending_changes(rows):
+    if any(row["is_hot"] for row in rows):
+        await sync_to_async(services.add_pending_changes)(rows)
+
+
+def document_response(document, status=200):
+    return HttpResponse(
+        JSONRenderer().render(document),
+        status=status,
+        content_type=JsonApiRenderer.media_type,
+    )
+
+
+def error_response(errors, status=400):
+    return document_response({"errors": errors}, status=status)
+
+
+def get_page_size(request, paginator) -> int:
+    try:
+        page_size = int(request.GET[paginator.page_size_query_param])
+        if page_size <= 0:
+            raise ValueError
+    except (KeyError, ValueError):
+        return paginator.page_size
+    return min(page_size, paginator.max_page_size)
+
+
+def get_ordering(request, default, allowed):
+    """
+    Ordering from the `sort` parameter, restricted to `allowed` fields
+    """
+    sort = request.GET.get("sort")
+    if not sort:
+        return default
+    ordering = [field.strip() for field in sort.split(",") if field.strip()]
+    invalid = [field for field in ordering if field.lstrip("-") not in allowed]
+    if invalid:
+        raise ValidationError(f"invalid sort parameter: {','.join(invalid)}")
+    return ordering
+
+
+def get_filterset(request, filterset_class, queryset):
+    return filterset_class(
+        data={
+            param[len("filter[") : -1]: value
+            for param, value in request.GET.items()
+            if param.startswith("filter[") and param.endswith("]")
+        },
+        queryset=queryset,
+    )
+
+
+async def keyset_page(request, queryset, builder, prepare_rows=None):
+    paginator = JsonApiCursorPagination()
+    paginator.request = request
+    paginator.ordering = paginator.get_ordering(queryset)
+    queryset = queryset.order_by(*paginator.ordering)
+
+    cursor = request.GET.get(paginator.cursor_query_param)
+    if cursor:
+        queryset = queryset.filter(paginator.get_keyset_filter(queryset, cursor))
+
+    page_size = get_page_size(request, paginator)
+    rows = [row async for row in queryset.values(*builder.columns)[: page_size + 1]]
+    page_rows = rows[:page_size]
+
+    next = None
+    if len(rows) > page_size:
+        next = paginator.get_cursor_link(paginator.encode_cursor(page_rows[-1]))
+    if prepare_rows is not None:
+        # After the cursor, which must hold the values the rows were sorted by
+        await prepare_rows(page_rows)
+
+    return {
+        "links": {"first": paginator.get_cursor_link(""), "next": next},
+        "data": builder.build_many(page_rows),
+        "meta": {"pagination": {"size": len(page_rows)}},
+    }
+
+
+async def wallet_detail(request, pk):
+    try:
+        row = await Wallet.objects.values(*wallet_builder.columns).aget(pk=pk)
+    except Wallet.DoesNotExist:
+        return error_response({"detail": "No Wallet matches the given query."}, 404)
+    await add_pending_changes([row])
+    return document_response({"data": wallet_builder.build(row)})
+
+
+async def wallet_list(request):
+    filterset = get_filterset(request, WalletFilter, Wallet.objects.all())
+    if not filterset.is_valid():
+        return error_response(filterset.errors)
+
+    try:
+        ordering = get_ordering(request, WalletViewSet.ordering, WALLET_SORT_FIELDS)
+        document = await keyset_page(
+            request,
+            filterset.qs.order_by(*ordering),
+            wallet_builder,
+            prepare_rows=add_pending_changes,
+        )
+    except ValidationError as exc:
+        return error_response(exc.detail)
+    return document_response(document)
+
+
+async def transaction_list(request):
+    filterset = get_filterset(request, TransactionFilter, Transaction.objects.all())
+    if not filterset.is_valid():
+        return error_response(filterset.errors)
+
+    try:
+        ordering = get_ordering(
+            request, TransactionViewSet.ordering, TransactionViewSet.ordering_fields
+        )
+        document = await keyset_page(
+            request, filterset.qs.order_by(*ordering), transaction_builder
+        )
+    except ValidationError as exc:
+        return error_response(exc.detail)
+    return document_response(document)
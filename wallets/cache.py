@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_SCOPE = "list"
+
+
+class WalletCache:
+    """
+    Two-tier cache for rendered wallet responses
+
+    A per-process LRU sits in front of Django's cache framework. Keys embed a version
+    counter kept in the shared cache and bumped whenever a wallet changes (and again
+    on commit), so entries written before a change can never be served after it.
+    """
+
+    def __init__(self, maxsize: int, timeout: int):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    def version_key(self, scope) -> str:
+        return f"wallets:version:{scope}"
+
+    def get_versions(self, *scopes) -> list[int]:
+        keys = [self.version_key(scope) for scope in scopes]
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # A fresh (or evicted) counter starts from the clock, so it cannot
+                # collide with versions of entries that are still cached
+                cache.add(key, time.time_ns(), timeout=None)
+                versions[key] = cache.get(key)
+        return [versions[key] for key in keys]
+
+    def bump(self, *scopes) -> None:
+        for scope in scopes:
+            key = self.version_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), timeout=None)
+
+    def make_key(self, scope, path: str, media_type: str) -> str:
+        (version,) = self.get_versions(scope)
+        return f"wallets:response:{scope}:{version}:{media_type}:{path}"
+
+    def get(self, key: str):
+        with self.lock:
+            if key in self.local:
+                self.local.move_to_end(key)
+                self.stats["local_hits"] += 1
+                return self.local[key]
+
+        entry = cache.get(key)
+        with self.lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["shared_hits"] += 1
+            value, local = entry
+            if local:
+                self.remember(key, value)
+        return value
+
+    def set(self, key: str, value, timeout: int | None = None) -> None:
+        """
+        Entries with their own `timeout` are only kept in the shared cache, since the
+        per-process LRU does not expire entries. They are stored flagged as such, so
+        hits do not copy them into it either
+        """
+        local = timeout is None
+        cache.set(key, (value, local), timeout=self.timeout if local else timeout)
+        if local:
+            with self.lock:
+                self.remember(key, value)
+
+    def remember(self, key: str, value) -> None:
+        self.local[key] = value
+        self.local.move_to_end(key)
+        while len(self.local) > self.maxsize:
+            self.local.popitem(last=False)
+
+    def clear_local(self) -> None:
+        with self.lock:
+            self.local.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, "local_size": len(self.local)}
+
+
+wallet_cache = WalletCache(
+    maxsize=settings.WALLETS_CACHE_LOCAL_SIZE,
+    timeout=settings.WALLETS_CACHE_TIMEOUT,
+)
+
+
+def invalidate_wallet(wallet_id: int) -> None:
+    """
+    Invalidate cached responses of the wallet now and again once the change commits
+    The second bump discards entries other readers cached from the pre-commit state
+    """
+    wallet_cache.bump(wallet_id, LIST_SCOPE)
+    transaction.on_commit(lambda: wallet_cache.bump(wallet_id, LIST_SCOPE))
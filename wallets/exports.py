@@ -0,0 +1,44 @@
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+
+
+class Echo:
+    """
+    File-like object that returns what is written, for streaming csv.writer output
+    """
+
+    def write(self, value):
+        return value
+
+
+def format_value(value):
+    """
+    Format values the way the JSON:API documents do: exact decimals, ISO 8601 with Z
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+    return value
+
+
+def ndjson_lines(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, map(format_value, row)))) + "\n"
+
+
+def csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([format_value(value) for value in row])
+
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", ndjson_lines),
+    "csv": ("text/csv", csv_lines),
+}
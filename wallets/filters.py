@@ -1,14 +1,90 @@
-from django_filters.rest_framework import CharFilter, FilterSet, NumberFilter
+from django_filters.rest_framework import (
+    BaseInFilter,
+    CharFilter,
+    FilterSet,
+    IsoDateTimeFilter,
+    NumberFilter,
+)
 
-from wallets.models import Transaction
+from wallets.models import Transaction, Wallet
+
+
+class NumberInFilter(BaseInFilter, NumberFilter):
+    """
+    Comma-separated list of numbers
+    """
 
 
 class TransactionFilter(FilterSet):
+    """
+    txid search modes: `txid_exact`, `txid_prefix` (case-sensitive) and `txid`
+    (case-insensitive substring, served by a trigram index on PostgreSQL)
+    `created_after`/`created_before` prune partitions of a partitioned table
+    """
+
     amount_min = NumberFilter(field_name="amount", lookup_expr="gte")
     amount_max = NumberFilter(field_name="amount", lookup_expr="lte")
     wallet = NumberFilter(field_name="wallet")
+    wallet__in = NumberInFilter(field_name="wallet", lookup_expr="in")
     txid = CharFilter(field_name="txid", lookup_expr="icontains")
+    txid_exact = CharFilter(field_name="txid", lookup_expr="exact")
+    txid_prefix = CharFilter(field_name="txid", lookup_expr="startswith")
+    created_after = IsoDateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = IsoDateTimeFilter(field_name="created_at", lookup_expr="lt")
 
     class Meta:
         model = Transaction
-        fields = ["wallet", "txid", "amount_min", "amount_max"]
+        fields = [
+            "wallet",
+            "wallet__in",
+            "txid",
+            "txid_exact",
+            "txid_prefix",
+            "created_after",
+            "created_before",
+            "amount_min",
+            "amount_max",
+        ]
+
+
+class WalletFilter(FilterSet):
+    """
+    Case-insensitive label search modes: `label_exact`, `label_prefix` and `label`
+    (substring, served by a trigram index on PostgreSQL)
+    """
+
+    label = CharFilter(field_name="label", lookup_expr="icontains")
+    label_exact = CharFilter(field_name="label", lookup_expr="iexact")
+    label_prefix = CharFilter(field_name="label", lookup_expr="istartswith")
+    transaction_count_min = NumberFilter(
+        field_name="transaction_count", lookup_expr="gte"
+    )
+    transaction_count_max = NumberFilter(
+        field_name="transaction_count", lookup_expr="lte"
+    )
+    total_credits_min = NumberFilter(field_name="total_credits", lookup_expr="gte")
+    total_credits_max = NumberFilter(field_name="total_credits", lookup_expr="lte")
+    total_debits_min = NumberFilter(field_name="total_debits", lookup_expr="gte")
+    total_debits_max = NumberFilter(field_name="total_debits", lookup_expr="lte")
+    active_after = IsoDateTimeFilter(
+        field_name="last_transaction_at", lookup_expr="gte"
+    )
+    active_before = IsoDateTimeFilter(
+        field_name="last_transaction_at", lookup_expr="lt"
+    )
+
+    class Meta:
+        model = Wallet
+        fields = [
+            "label",
+            "label_exact",
+            "label_prefix",
+            "transaction_count_min",
+            "transaction_count_max",
+            "total_credits_min",
+            "total_credits_max",
+            "total_debits_min",
+            "total_debits_max",
+            "active_after",
+            "active_before",
+        ]
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from wallets.schema import (
+    FORMATS,
+    code_version,
+    generate_schema,
+    prune_schemas,
+    schema_path,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema of the current code version, unless it already "
+        "exists in WALLETS_SCHEMA_DIR"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate an existing schema"
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Remove the schemas of other code versions",
+        )
+
+    def handle(self, *args, **options):
+        schema_version = code_version()
+        paths = [schema_path(schema_version, name) for name in FORMATS]
+        if options["force"] or not all(path.exists() for path in paths):
+            paths = generate_schema(schema_version)
+            for path in paths:
+                self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
+        else:
+            self.stdout.write(f"Schema {schema_version} is up to date")
+        if options["prune"]:
+            for path in prune_schemas(schema_version):
+                self.stdout.write(f"Removed {path}")
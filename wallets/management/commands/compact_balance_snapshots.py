@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from wallets.models import Wallet
+from wallets.services import (
+    add_pending_changes,
+    compact_balance_snapshots,
+    ledger_balance,
+)
+
+
+class Command(BaseCommand):
+    help = "Fold new transactions into wallet balance snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-tail",
+            type=int,
+            default=1000,
+            help="Only snapshot wallets with at least this many new transactions",
+        )
+        parser.add_argument(
+            "--settle-seconds",
+            type=int,
+            default=60,
+            help="Skip transactions younger than this, they may not be committed yet",
+        )
+        parser.add_argument(
+            "--wallet",
+            type=int,
+            action="append",
+            dest="wallets",
+            help="Limit to a wallet id (repeatable)",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Compare ledger balances with stored wallet balances afterwards",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(seconds=options["settle_seconds"])
+        snapshots = compact_balance_snapshots(
+            before, min_tail=options["min_tail"], wallet_ids=options["wallets"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(snapshots)} snapshots"))
+
+        if not options["verify"]:
+            return
+
+        wallets = Wallet.objects.all()
+        if options["wallets"]:
+            wallets = wallets.filter(pk__in=options["wallets"])
+
+        mismatches = 0
+        for wallet in wallets.iterator():
+            # The ledger includes deposits still pending on hot wallets
+            add_pending_changes([wallet])
+            expected = ledger_balance(wallet.pk)
+            if expected != wallet.balance:
+                mismatches += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"{wallet}: balance {wallet.balance}, ledger {expected}"
+                    )
+                )
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{mismatches} wallets do not match"))
+        else:
+            self.stdout.write(self.style.SUCCESS("All wallet balances match"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wallets.services import flush_pending_deposits
+
+
+class Command(BaseCommand):
+    help = "Fold deposits pending on hot wallets into the wallet balances"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Deposits folded per database transaction",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, flushing every this many seconds",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_pending_deposits(options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} deposits"))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from wallets.partitioning import (
+    convert_to_partitioned,
+    create_partitions,
+    default_partition_rows,
+    detach_partitions,
+    is_partitioned,
+)
+from wallets.statements import shift, truncate
+
+
+class Command(BaseCommand):
+    help = (
+        "Partition transactions by created_at month (PostgreSQL only). `convert` "
+        "once, then run `maintain` regularly to add future and detach old partitions"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["convert", "maintain"])
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Keep partitions for this many months after the current one",
+        )
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            help="Detach partitions older than this many months before the current one",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop detached partitions instead of keeping them as plain tables",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning needs PostgreSQL")
+
+        if options["action"] == "convert":
+            if is_partitioned():
+                raise CommandError("Transactions are already partitioned")
+            created = convert_to_partitioned(options["months_ahead"])
+            self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions"))
+            return
+
+        if not is_partitioned():
+            raise CommandError("Transactions are not partitioned, run convert first")
+        month = truncate(timezone.now(), "month")
+        created = create_partitions(
+            month, shift(month, "month", options["months_ahead"] + 1)
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions"))
+        overflow = default_partition_rows()
+        if overflow:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{overflow} transactions are in the default partition, "
+                    "raise --months-ahead to move them into monthly partitions"
+                )
+            )
+
+        if options["retain_months"] is not None:
+            before = shift(month, "month", -options["retain_months"])
+            detached = detach_partitions(before, drop=options["drop"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Detached {len(detached)} partitions")
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from wallets.models import Wallet
+from wallets.services import recompute_wallet_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute wallet transaction counts, totals and last activity"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Wallets locked and recomputed per database transaction",
+        )
+        parser.add_argument(
+            "--wallet",
+            type=int,
+            action="append",
+            dest="wallets",
+            help="Limit to a wallet id (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        wallets = Wallet.objects.order_by("pk")
+        if options["wallets"]:
+            wallets = wallets.filter(pk__in=options["wallets"])
+        wallet_ids = list(wallets.values_list("pk", flat=True))
+
+        batch_size = options["batch_size"]
+        updated = 0
+        for start in range(0, len(wallet_ids), batch_size):
+            updated += recompute_wallet_aggregates(
+                wallet_ids[start : start + batch_size]
+            )
+        self.stdout.write(self.style.SUCCESS(f"Recomputed {updated} wallets"))
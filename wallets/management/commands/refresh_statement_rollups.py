@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from wallets.statements import refresh_statement_rollups
+
+
+class Command(BaseCommand):
+    help = "Roll up complete hours of transactions for wallet statements (ledger mode)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settle-seconds",
+            type=int,
+            default=60,
+            help="Skip transactions younger than this, they may not be committed yet",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(seconds=options["settle_seconds"])
+        written = refresh_statement_rollups(before)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows"))
@@ -0,0 +1,337 @@
+"""
+Per-process request metrics, exposed in the Prometheus text format
+
+`MetricsMiddleware` opens a `RequestStats` for every request. Database queries and
+`timed()` phases running in the request context add to it, including queries of async
+views that run in worker threads, since the context is copied into them. Database
+connections opened, and the connection pools, are reported per alias.
+"""
+
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connections
+
+from wallets.cache import wallet_cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        value = value.replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1) -> None:
+        with self.lock:
+            self.values[tuple(labels)] += amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(
+                    f"{self.name}{format_labels(self.labelnames, labels)} {value:g}"
+                )
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value: float) -> None:
+        labels = tuple(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            if labels not in self.values:
+                self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts, _, _ = entry = self.values[labels]
+            counts[index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        names = (*self.labelnames, "le")
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    le = bound if bound == "+Inf" else f"{bound:g}"
+                    lines.append(
+                        f"{self.name}_bucket{format_labels(names, (*labels, le))} "
+                        f"{cumulative}"
+                    )
+                suffix = format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{suffix} {total:g}")
+                lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+ENDPOINT_LABELS = ("endpoint", "action")
+
+REQUESTS = Counter(
+    "wallets_requests_total", "Requests handled", (*ENDPOINT_LABELS, "status")
+)
+REQUEST_DURATION = Histogram(
+    "wallets_request_duration_seconds",
+    "Total request latency",
+    LATENCY_BUCKETS,
+    ENDPOINT_LABELS,
+)
+DB_DURATION = Histogram(
+    "wallets_request_db_duration_seconds",
+    "Time spent in database queries per request",
+    LATENCY_BUCKETS,
+    ENDPOINT_LABELS,
+)
+DB_QUERIES = Histogram(
+    "wallets_request_db_queries",
+    "Database queries per request",
+    QUERY_BUCKETS,
+    ENDPOINT_LABELS,
+)
+PHASE_DURATION = Histogram(
+    "wallets_request_phase_duration_seconds",
+    "Time spent per request in a phase: render (serializing the response) or "
+    "balance_update (wallet balance UPDATEs, including row lock waits)",
+    LATENCY_BUCKETS,
+    (*ENDPOINT_LABELS, "phase"),
+)
+DB_CONNECTIONS = Counter(
+    "wallets_db_connections_total",
+    "Database connections opened, or checked out of the pool when pooled",
+    ("alias",),
+)
+REQUEST_METRICS = [
+    REQUESTS,
+    REQUEST_DURATION,
+    DB_DURATION,
+    DB_QUERIES,
+    PHASE_DURATION,
+    DB_CONNECTIONS,
+]
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.phases = defaultdict(float)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+current_stats = contextvars.ContextVar("wallets_request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding query counts and times to the current request
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    `connection_created` receiver, counting the connection and recording its queries
+    """
+    DB_CONNECTIONS.inc((connection.alias,))
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed(phase: str):
+    """
+    Add the time spent in the block to `phase` of the current request
+    """
+    stats = current_stats.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.phases[phase] += time.perf_counter() - started
+
+
+def observe_request(endpoint: str, action: str, status: int, stats: RequestStats):
+    labels = (endpoint, action)
+    REQUESTS.inc((*labels, status))
+    REQUEST_DURATION.observe(labels, stats.elapsed())
+    DB_DURATION.observe(labels, stats.db_time)
+    DB_QUERIES.observe(labels, stats.queries)
+    for phase, duration in stats.phases.items():
+        PHASE_DURATION.observe((*labels, phase), duration)
+
+
+def cache_metrics() -> list[str]:
+    stats = wallet_cache.get_stats()
+    return [
+        "# HELP wallets_cache_lookups_total Wallet response cache lookups by result",
+        "# TYPE wallets_cache_lookups_total counter",
+        f'wallets_cache_lookups_total{{result="local_hit"}} {stats["local_hits"]}',
+        f'wallets_cache_lookups_total{{result="shared_hit"}} {stats["shared_hits"]}',
+        f'wallets_cache_lookups_total{{result="miss"}} {stats["misses"]}',
+        "# HELP wallets_cache_local_entries Entries in the per-process cache",
+        "# TYPE wallets_cache_local_entries gauge",
+        f"wallets_cache_local_entries {stats['local_size']}",
+    ]
+
+
+# psycopg_pool statistics: (metric, type, help, stats keys summed, scale)
+POOL_STATS = (
+    ("size", "gauge", "Connections managed by the pool", ("pool_size",), 1),
+    ("available", "gauge", "Idle connections in the pool", ("pool_available",), 1),
+    ("min_size", "gauge", "Configured minimum pool size", ("pool_min",), 1),
+    ("max_size", "gauge", "Configured maximum pool size", ("pool_max",), 1),
+    (
+        "waiting",
+        "gauge",
+        "Checkouts currently waiting for a connection",
+        ("requests_waiting",),
+        1,
+    ),
+    ("checkouts_total", "counter", "Connections checked out", ("requests_num",), 1),
+    (
+        "waits_total",
+        "counter",
+        "Checkouts that waited for a connection",
+        ("requests_queued",),
+        1,
+    ),
+    (
+        "wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection",
+        ("requests_wait_ms",),
+        0.001,
+    ),
+    (
+        "timeouts_total",
+        "counter",
+        "Checkouts failed after the pool timeout",
+        ("requests_errors",),
+        1,
+    ),
+    (
+        "connects_total",
+        "counter",
+        "Connections opened by the pool",
+        ("connections_num",),
+        1,
+    ),
+    (
+        "connect_errors_total",
+        "counter",
+        "Failed attempts to open a connection",
+        ("connections_errors",),
+        1,
+    ),
+    (
+        "discarded_total",
+        "counter",
+        "Connections discarded as broken, on checkout check or return",
+        ("connections_lost", "returns_bad"),
+        1,
+    ),
+)
+
+
+def get_pool_stats() -> dict[str, dict]:
+    """
+    psycopg_pool statistics of every database alias using a connection pool
+    """
+    pools = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            pools[alias] = pool.get_stats()
+    return pools
+
+
+def pool_metrics(pools: dict[str, dict]) -> list[str]:
+    if not pools:
+        return []
+    lines = []
+    for name, metric_type, documentation, keys, scale in POOL_STATS:
+        metric = f"wallets_db_pool_{name}"
+        lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} {metric_type}"]
+        for alias, stats in sorted(pools.items()):
+            # Counters are only present in the statistics once non-zero
+            value = sum(stats.get(key, 0) for key in keys) * scale
+            lines.append(f"{metric}{format_labels(('alias',), (alias,))} {value:g}")
+    return lines
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REQUEST_METRICS:
+        lines += metric.render()
+    lines += cache_metrics()
+    lines += pool_metrics(get_pool_stats())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    for metric in REQUEST_METRICS:
+        with metric.lock:
+            metric.values.clear()
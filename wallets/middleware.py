@@ -0,0 +1,122 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from wallets.metrics import RequestStats, current_stats, observe_request
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count, DB time and render time per endpoint
+    Endpoints are labelled with the URL name and the view action, e.g. `wallet-detail`
+    and `retrieve`. With `WALLETS_SERVER_TIMING` the numbers of the request are also
+    sent in a `Server-Timing` header
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        stats = current_stats.get()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.phases["render"] += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, stats):
+        endpoint, action = get_endpoint(request)
+        observe_request(endpoint, action, response.status_code, stats)
+        if settings.WALLETS_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(stats)
+        return response
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Keeps a client's reads on the primary for `WALLETS_REPLICA_STICKY_SECONDS` after
+    each of its successful writes, with a cookie, so it reads its own writes
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.finish(request, await self.get_response(request))
+
+    def finish(self, request, response):
+        if (
+            settings.WALLETS_READ_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                settings.WALLETS_REPLICA_COOKIE,
+                "1",
+                max_age=settings.WALLETS_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def get_endpoint(request) -> tuple[str, str]:
+    match = request.resolver_match
+    if match is None:
+        return "unmatched", request.method.lower()
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return match.url_name or match.view_name, action
+
+
+def server_timing(stats: RequestStats) -> str:
+    metrics = [f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"']
+    metrics += [
+        f"{phase};dur={duration * 1000:.2f}"
+        for phase, duration in sorted(stats.phases.items())
+    ]
+    metrics.append(f"total;dur={stats.elapsed() * 1000:.2f}")
+    return ", ".join(metrics)
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletBalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "transaction_id",
+                    models.BigIntegerField(
+                        help_text="Last transaction included in the snapshot"
+                    ),
+                ),
+                ("balance", models.DecimalField(decimal_places=18, max_digits=30)),
+                ("transaction_count", models.PositiveBigIntegerField()),
+            ],
+            options={
+                "verbose_name": "Wallet balance snapshot",
+                "verbose_name_plural": "Wallet balance snapshots",
+                "ordering": ["-transaction_id"],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="wallets_tra_wallet__757bec_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["wallet", "id"], name="wallets_tra_wallet__9d13f5_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="walletbalancesnapshot",
+            name="wallet",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="snapshots",
+                to="wallets.wallet",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="walletbalancesnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("wallet", "transaction_id"),
+                name="wallet_snapshot_unique_transaction",
+            ),
+        ),
+    ]
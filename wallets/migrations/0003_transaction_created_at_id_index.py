@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0002_walletbalancesnapshot"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["created_at", "id"], name="wallets_tra_created_f345cb_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0003_transaction_created_at_id_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("key", models.CharField(max_length=255, unique=True)),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        help_text="Hash of the request the key was first used with",
+                        max_length=64,
+                    ),
+                ),
+                ("status_code", models.PositiveSmallIntegerField(null=True)),
+                ("content_type", models.CharField(blank=True, max_length=255)),
+                ("content", models.TextField(blank=True)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "verbose_name": "Idempotency key",
+                "verbose_name_plural": "Idempotency keys",
+            },
+        ),
+    ]
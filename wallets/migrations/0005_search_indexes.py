@@ -0,0 +1,72 @@
+import warnings
+
+from django.db import migrations
+
+# Expressions match the SQL Django generates for the lookups used by the search
+# filters: icontains/istartswith/iexact compile to UPPER(column::text)
+TRIGRAM_INDEXES = [
+    # Substring search (icontains) on txid and label
+    (
+        "wallets_transaction_txid_trgm",
+        "wallets_transaction USING gin (UPPER(txid::text) gin_trgm_ops)",
+    ),
+    (
+        "wallets_wallet_label_trgm",
+        "wallets_wallet USING gin (UPPER(label::text) gin_trgm_ops)",
+    ),
+]
+PATTERN_INDEXES = [
+    # Case-insensitive exact and prefix search (iexact, istartswith) on label.
+    # Case-sensitive txid prefixes use the varchar_pattern_ops index Django
+    # creates for the unique txid column
+    (
+        "wallets_wallet_label_upper_like",
+        "wallets_wallet (UPPER(label::text) text_pattern_ops)",
+    ),
+]
+
+
+def trigram_available(schema_editor) -> bool:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_search_indexes(apps, schema_editor):
+    # Other databases keep searching with sequential scans
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    indexes = list(PATTERN_INDEXES)
+    if trigram_available(schema_editor):
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        indexes += TRIGRAM_INDEXES
+    else:
+        warnings.warn(
+            "pg_trgm is not available, substring search will use sequential scans"
+        )
+
+    for name, definition in indexes:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in TRIGRAM_INDEXES + PATTERN_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so large tables stay writable
+    atomic = False
+
+    dependencies = [
+        ("wallets", "0004_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:58
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_aggregates(apps, schema_editor):
+    Wallet = apps.get_model("wallets", "Wallet")
+    Transaction = apps.get_model("wallets", "Transaction")
+    transactions = (
+        Transaction.objects.filter(wallet=OuterRef("pk")).order_by().values("wallet")
+    )
+
+    def aggregate(expression):
+        return Subquery(transactions.annotate(value=expression).values("value"))
+
+    zero = Value(Decimal("0"))
+    Wallet.objects.update(
+        transaction_count=Coalesce(aggregate(Count("pk")), 0),
+        total_credits=Coalesce(aggregate(Sum("amount", filter=Q(amount__gt=0))), zero),
+        total_debits=Coalesce(
+            aggregate(Sum(-F("amount"), filter=Q(amount__lt=0))), zero
+        ),
+        last_transaction_at=aggregate(Max("created_at")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0005_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wallet",
+            name="last_transaction_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the latest transaction was booked",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="wallet",
+            name="total_credits",
+            field=models.DecimalField(
+                decimal_places=18,
+                default=Decimal("0.0"),
+                help_text="Sum of positive transaction amounts",
+                max_digits=30,
+            ),
+        ),
+        migrations.AddField(
+            model_name="wallet",
+            name="total_debits",
+            field=models.DecimalField(
+                decimal_places=18,
+                default=Decimal("0.0"),
+                help_text="Sum of negative transaction amounts, as a positive number",
+                max_digits=30,
+            ),
+        ),
+        migrations.AddField(
+            model_name="wallet",
+            name="transaction_count",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="wallet",
+            index=models.Index(
+                fields=["last_transaction_at"], name="wallets_wal_last_tr_7de9fd_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0006_wallet_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletStatementRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField(help_text="Start of the hour")),
+                ("net", models.DecimalField(decimal_places=18, max_digits=30)),
+                ("credits", models.DecimalField(decimal_places=18, max_digits=30)),
+                ("debits", models.DecimalField(decimal_places=18, max_digits=30)),
+                ("transaction_count", models.PositiveBigIntegerField()),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statement_rollups",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Wallet statement rollup",
+                "verbose_name_plural": "Wallet statement rollups",
+                "indexes": [
+                    models.Index(
+                        fields=["bucket"], name="wallets_wal_bucket_8b0e29_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("wallet", "bucket"),
+                        name="wallet_statement_rollup_unique_bucket",
+                    )
+                ],
+            },
+        ),
+    ]
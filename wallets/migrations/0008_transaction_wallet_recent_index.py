@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0007_walletstatementrollup"),
+    ]
+
+    operations = [
+        # Only drop the index: altering the field would also drop and re-validate the
+        # foreign key constraint
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="transaction",
+                    name="wallet",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transactions",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    "DROP INDEX IF EXISTS wallets_transaction_wallet_id_f5bd9420",
+                    reverse_sql=(
+                        "CREATE INDEX wallets_transaction_wallet_id_f5bd9420 "
+                        "ON wallets_transaction (wallet_id)"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["wallet", "-created_at", "-id"],
+                include=("txid", "amount"),
+                name="transaction_wallet_recent_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0008_transaction_wallet_recent_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="applied",
+            field=models.BooleanField(
+                default=True,
+                help_text="Whether the amount is included in the wallet balance. Deposits to hot wallets are pending until they are flushed",
+            ),
+        ),
+        migrations.AddField(
+            model_name="wallet",
+            name="is_hot",
+            field=models.BooleanField(
+                default=False,
+                help_text="Book deposits without locking the wallet, folding them in later",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("applied", False)),
+                fields=["wallet", "id"],
+                name="transaction_pending_idx",
+            ),
+        ),
+    ]
@@ -1,9 +1,18 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from decimal import Decimal
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
+from django.db import connections, models, router, transaction
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from wallets.cache import invalidate_wallet
+from wallets.metrics import timed
+
 
 class BaseModel(models.Model):
     """
@@ -17,6 +26,119 @@ class BaseModel(models.Model):
         abstract = True
 
 
+@dataclass
+class BalanceChange:
+    """
+    Change of a wallet balance and of its transaction aggregates
+    """
+
+    delta: Decimal = Decimal("0")
+    count: int = 0
+    credits: Decimal = Decimal("0")
+    debits: Decimal = Decimal("0")
+    last_transaction_at: datetime | None = None
+
+    @classmethod
+    def added(cls, amount: Decimal, at: datetime) -> "BalanceChange":
+        return cls(
+            delta=amount,
+            count=1,
+            credits=max(amount, Decimal("0")),
+            debits=max(-amount, Decimal("0")),
+            last_transaction_at=at,
+        )
+
+    @classmethod
+    def removed(cls, amount: Decimal) -> "BalanceChange":
+        return cls(
+            delta=-amount,
+            count=-1,
+            credits=-max(amount, Decimal("0")),
+            debits=-max(-amount, Decimal("0")),
+        )
+
+    def __add__(self, other: "BalanceChange") -> "BalanceChange":
+        times = [self.last_transaction_at, other.last_transaction_at]
+        return BalanceChange(
+            delta=self.delta + other.delta,
+            count=self.count + other.count,
+            credits=self.credits + other.credits,
+            debits=self.debits + other.debits,
+            last_transaction_at=max(filter(None, times), default=None),
+        )
+
+
+class WalletManager(models.Manager):
+    def apply_balance_change(self, wallet_id: int, change: BalanceChange) -> bool:
+        """
+        Apply the change to the wallet balance and aggregates in one conditional UPDATE
+        The UPDATE row-locks the wallet, so concurrent writers to the same wallet are
+        serialized by the database and none of them is lost. Returns False (and changes
+        nothing) if the balance would become negative
+        """
+        values = {
+            "balance": models.F("balance") + change.delta,
+            "updated_at": timezone.now(),
+        }
+        if change.count:
+            values["transaction_count"] = models.F("transaction_count") + change.count
+        if change.credits:
+            values["total_credits"] = models.F("total_credits") + change.credits
+        if change.debits:
+            values["total_debits"] = models.F("total_debits") + change.debits
+        if change.last_transaction_at is not None:
+            at = models.Value(
+                change.last_transaction_at, output_field=models.DateTimeField()
+            )
+            values["last_transaction_at"] = Greatest(
+                Coalesce("last_transaction_at", at), at
+            )
+
+        with timed("balance_update"):
+            updated = self.filter(pk=wallet_id, balance__gte=-change.delta).update(
+                **values
+            )
+        if updated:
+            invalidate_wallet(wallet_id)
+        return bool(updated)
+
+    def lock_hot_mode(self, wallet_id: int) -> bool:
+        """
+        Whether the wallet is in hot mode, read under a share lock held until commit
+        Deposits take it before staying pending: turning hot mode off waits for them,
+        and deposits waiting for it read the wallet as cold. Share locks do not
+        conflict with each other, so hot deposits still run concurrently
+        """
+        connection = connections[router.db_for_write(self.model)]
+        if not connection.features.has_select_for_update:
+            return self.filter(pk=wallet_id).values_list("is_hot", flat=True).get()
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            # select_for_update() has no FOR SHARE mode
+            cursor.execute(
+                f"SELECT is_hot FROM {table} WHERE id = %s FOR SHARE", [wallet_id]
+            )
+            return cursor.fetchone()[0]
+
+    def flush_pending(self, wallet_ids=None, limit=None, skip_locked=False) -> int:
+        """
+        Fold deposits pending on hot wallets into the wallet balances and aggregates
+        Returns the number of deposits folded. With `skip_locked`, deposits locked by a
+        concurrent flush are left to it instead of waiting for it
+        """
+        with transaction.atomic():
+            pending_ids, changes = Transaction.objects.lock_pending(
+                wallet_ids, limit, skip_locked
+            )
+            # Wallets are locked in id order so concurrent writers cannot deadlock.
+            # Pending transactions are deposits, so these updates cannot fail
+            for wallet_id in sorted(changes):
+                self.apply_balance_change(wallet_id, changes[wallet_id])
+            if pending_ids:
+                Transaction.objects.filter(pk__in=pending_ids).update(applied=True)
+        return len(pending_ids)
+
+
 class Wallet(BaseModel):
     """
     Wallet model
@@ -30,9 +152,48 @@ class Wallet(BaseModel):
         default=Decimal("0.0"),
     )
 
+    # Aggregates of the wallet transactions, kept up to date by every balance change
+    # (see `recompute_wallet_aggregates` to repair them)
+    transaction_count = models.PositiveBigIntegerField(default=0)
+    total_credits = models.DecimalField(
+        max_digits=30,
+        decimal_places=18,
+        default=Decimal("0.0"),
+        help_text="Sum of positive transaction amounts",
+    )
+    total_debits = models.DecimalField(
+        max_digits=30,
+        decimal_places=18,
+        default=Decimal("0.0"),
+        help_text="Sum of negative transaction amounts, as a positive number",
+    )
+    last_transaction_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the latest transaction was booked",
+    )
+
+    is_hot = models.BooleanField(
+        default=False,
+        help_text="Book deposits without locking the wallet, folding them in later",
+    )
+
+    objects = WalletManager()
+
+    # Maintained by `apply_balance_change` only, so saving a wallet never overwrites a
+    # balance change committed after the wallet was read
+    balance_fields = (
+        "balance",
+        "transaction_count",
+        "total_credits",
+        "total_debits",
+        "last_transaction_at",
+    )
+
     class Meta:
         indexes = [
             models.Index(fields=["label"]),
+            models.Index(fields=["last_transaction_at"]),
         ]
         verbose_name = _("Wallet")
         verbose_name_plural = _("Wallets")
@@ -48,6 +209,125 @@ class Wallet(BaseModel):
     def __str__(self) -> str:
         return f"Wallet({self.label})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_hot = instance.__dict__.get("is_hot")
+        return instance
+
+    def save(self, *args, update_fields=None, **kwargs) -> None:
+        """
+        Save the wallet without touching its balance fields
+        Turning hot mode off folds the pending deposits in first, since reads only add
+        those of hot wallets
+        """
+        # Unless the wallet was loaded as cold, whether it is hot is read under the lock
+        cooling = (
+            not self._state.adding
+            and self.__dict__.get("is_hot") is False
+            and getattr(self, "_loaded_is_hot", None) is not False
+        )
+        if not self._state.adding and update_fields is None:
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.balance_fields
+            ]
+        if not cooling:
+            super().save(*args, update_fields=update_fields, **kwargs)
+        else:
+            with transaction.atomic():
+                # Waits for the deposits holding a share lock on the row (see
+                # `lock_hot_mode`) to commit, later ones see the wallet as cold
+                was_hot = (
+                    Wallet.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("is_hot", flat=True)
+                    .first()
+                )
+                if was_hot:
+                    # Withdrawals and flushes lock pending deposits before the wallet,
+                    # the deposits they hold are skipped: they fold them in themselves
+                    # once this commits
+                    Wallet.objects.flush_pending([self.pk], skip_locked=True)
+                super().save(*args, update_fields=update_fields, **kwargs)
+        self._loaded_is_hot = self.is_hot
+        invalidate_wallet(self.pk)
+
+    def delete(self, *args, **kwargs):
+        wallet_id = self.pk
+        result = super().delete(*args, **kwargs)
+        invalidate_wallet(wallet_id)
+        return result
+
+
+def add_balance_change(values: dict, change: BalanceChange) -> None:
+    """
+    Add the change to wallet field values, skipping fields that were not loaded
+    """
+    for name, delta in (
+        ("balance", change.delta),
+        ("transaction_count", change.count),
+        ("total_credits", change.credits),
+        ("total_debits", change.debits),
+    ):
+        if name in values:
+            values[name] += delta
+    if "last_transaction_at" in values:
+        times = [values["last_transaction_at"], change.last_transaction_at]
+        values["last_transaction_at"] = max(filter(None, times), default=None)
+
+
+class TransactionManager(models.Manager):
+    def lock_pending(
+        self, wallet_ids=None, limit=None, skip_locked=False
+    ) -> tuple[list[int], dict[int, BalanceChange]]:
+        """
+        Lock pending deposits (of `wallet_ids`, or of all wallets) in id order
+        Returns their ids and the balance changes they add up to per wallet
+        """
+        pending = self.filter(applied=False)
+        if wallet_ids is not None:
+            pending = pending.filter(wallet_id__in=wallet_ids)
+        rows = (
+            pending.select_for_update(skip_locked=skip_locked)
+            .order_by("pk")
+            .values_list("pk", "wallet_id", "amount", "created_at")
+        )
+        if limit is not None:
+            rows = rows[:limit]
+
+        pending_ids = []
+        changes = defaultdict(BalanceChange)
+        for pk, wallet_id, amount, created_at in rows:
+            pending_ids.append(pk)
+            changes[wallet_id] += BalanceChange.added(amount, created_at)
+        return pending_ids, changes
+
+    def pending_changes(self, wallet_ids) -> dict[int, BalanceChange]:
+        """
+        Balance changes of the deposits pending on the wallets, without locking them
+        """
+        rows = (
+            self.filter(wallet_id__in=wallet_ids, applied=False)
+            .order_by()
+            .values("wallet_id")
+            .annotate(
+                total=models.Sum("amount"),
+                count=models.Count("pk"),
+                last=models.Max("created_at"),
+            )
+        )
+        return {
+            row["wallet_id"]: BalanceChange(
+                delta=row["total"],
+                count=row["count"],
+                credits=row["total"],
+                last_transaction_at=row["last"],
+            )
+            for row in rows
+        }
+
 
 class Transaction(BaseModel):
     """
@@ -58,6 +338,8 @@ class Transaction(BaseModel):
         Wallet,
         related_name="transactions",
         on_delete=models.CASCADE,
+        # Covered by the composite indexes below, which all start with the wallet
+        db_index=False,
     )
     txid = models.CharField(
         max_length=255,
@@ -69,11 +351,34 @@ class Transaction(BaseModel):
         decimal_places=18,
         help_text="Can be negative. Up to 18 digits precision.",
     )
+    applied = models.BooleanField(
+        default=True,
+        help_text="Whether the amount is included in the wallet balance. Deposits to "
+        "hot wallets are pending until they are flushed",
+    )
+
+    objects = TransactionManager()
 
     class Meta:
         indexes = [
-            models.Index(fields=["wallet"]),
+            # Also serves bounded tail sums after a balance snapshot
+            models.Index(fields=["wallet", "id"]),
+            # Small, as deposits are only pending until the next flush
+            models.Index(
+                fields=["wallet", "id"],
+                condition=models.Q(applied=False),
+                name="transaction_pending_idx",
+            ),
+            # Latest transactions of a wallet (or date ranges of it) in the default
+            # order, as an index-only scan of the columns the list endpoint reads
+            models.Index(
+                fields=["wallet", "-created_at", "-id"],
+                include=["txid", "amount"],
+                name="transaction_wallet_recent_idx",
+            ),
             models.Index(fields=["txid"]),
+            # Keyset pagination over the default ordering
+            models.Index(fields=["created_at", "id"]),
         ]
         ordering = ["-created_at"]
         verbose_name = _("Transaction")
@@ -82,6 +387,34 @@ class Transaction(BaseModel):
     def __str__(self) -> str:
         return f"Transaction({self.txid}): {self.amount}"
 
+    # Columns remembered as loaded, so updates can tell what actually changed
+    tracked_fields = ("wallet_id", "txid", "amount")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self) -> None:
+        self._loaded_values = {
+            name: self.__dict__[name]
+            for name in self.tracked_fields
+            if name in self.__dict__
+        }
+
+    def get_changed_fields(self) -> list[str]:
+        """
+        Names of the tracked fields that differ from the loaded row
+        Fields that were not loaded count as changed
+        """
+        loaded = getattr(self, "_loaded_values", {})
+        return [
+            self._meta.get_field(name.removesuffix("_id")).name
+            for name in self.tracked_fields
+            if name not in loaded or loaded[name] != getattr(self, name)
+        ]
+
     def clean(self) -> None:
         """
         Validate that applying this transaction will not cause negative balance
@@ -89,51 +422,224 @@ class Transaction(BaseModel):
         if not self.wallet_id:
             return
 
-        current_balance = self.wallet.balance
         delta = self.amount
+        loaded = getattr(self, "_loaded_values", {})
+        if self.pk and loaded.get("wallet_id") == self.wallet_id:
+            delta -= loaded["amount"]
 
-        if self.pk:
-            old = Transaction.objects.get(pk=self.pk)
-            delta -= old.amount
-
-        projected = current_balance + delta
+        projected = self.wallet.balance + delta
         if projected < Decimal("0.0"):
             raise ValidationError(_("Wallet balance cannot become negative."))
 
-    def save(self, *args, **kwargs) -> None:
+    def save(self, *args, update_fields=None, **kwargs) -> None:
         """
         Save transaction and update wallet balance atomically
+        Updates write only the changed columns. The row is read (locked) again and the
+        wallet balances are touched only when the amount or the wallet changed
         """
-        with transaction.atomic():
-            self.clean()
-            is_update = self.pk is not None
-            old_amount = None
+        if not self._state.adding and settings.WALLETS_LEDGER_MODE:
+            raise ValidationError(_("Transactions are immutable in ledger mode."))
 
-            if is_update:
-                old_amount = Transaction.objects.get(pk=self.pk).amount
+        if not self._state.adding and update_fields is None:
+            update_fields = [*self.get_changed_fields(), "updated_at"]
 
-            super().save(*args, **kwargs)
-
-            if is_update:
-                delta = self.amount - old_amount
-            else:
-                delta = self.amount
+        with transaction.atomic():
+            changes = {}
+            pending_ids = []
+            hot_deposit = self._state.adding and self.wallet.is_hot and self.amount >= 0
+            if hot_deposit:
+                # The wallet may be leaving hot mode, read it again under a share lock
+                hot_deposit = Wallet.objects.lock_hot_mode(self.wallet_id)
+            if hot_deposit:
+                # Folded into the wallet later by `Wallet.objects.flush_pending`
+                self.applied = False
+                invalidate_wallet(self.wallet_id)
+            elif self._state.adding:
+                if self.wallet.is_hot:
+                    # Withdrawals are checked against every deposit booked before them
+                    pending_ids, changes = Transaction.objects.lock_pending(
+                        [self.wallet_id]
+                    )
+                changes[self.wallet_id] = changes.get(
+                    self.wallet_id, BalanceChange()
+                ) + BalanceChange.added(self.amount, timezone.now())
+            elif {"wallet", "wallet_id", "amount"} & set(update_fields):
+                old_wallet_id, old_amount, old_applied = (
+                    Transaction.objects.select_for_update()
+                    .values_list("wallet_id", "amount", "applied")
+                    .get(pk=self.pk)
+                )
+                if old_applied:
+                    changes = {old_wallet_id: BalanceChange.removed(old_amount)}
+                else:
+                    invalidate_wallet(old_wallet_id)
+                changes[self.wallet_id] = changes.get(
+                    self.wallet_id, BalanceChange()
+                ) + BalanceChange.added(self.amount, self.created_at)
+                self.applied = True
+                update_fields = [*update_fields, "applied"]
+                WalletBalanceSnapshot.objects.invalidate(
+                    {old_wallet_id, self.wallet_id}, self.pk
+                )
 
-            self.wallet.balance = self.wallet.balance + delta
-            if self.wallet.balance < Decimal("0.0"):
-                raise ValidationError(_("Wallet balance cannot be negative."))
+            # Wallets are locked in id order so concurrent writers cannot deadlock
+            for wallet_id in sorted(changes):
+                if not Wallet.objects.apply_balance_change(
+                    wallet_id, changes[wallet_id]
+                ):
+                    raise ValidationError(_("Wallet balance cannot be negative."))
+            if pending_ids:
+                Transaction.objects.filter(pk__in=pending_ids).update(applied=True)
 
-            self.wallet.save()
+            super().save(*args, update_fields=update_fields, **kwargs)
+        self.remember_loaded_values()
 
     def delete(self, *args, **kwargs) -> None:
         """
         Deleting a transaction rolls back its effect on the wallet balance
         """
+        if settings.WALLETS_LEDGER_MODE:
+            raise ValidationError(_("Transactions are immutable in ledger mode."))
+
         with transaction.atomic():
-            self.wallet.balance = self.wallet.balance - self.amount
-            if self.wallet.balance < Decimal("0.0"):
+            wallet_id, amount, applied = (
+                Transaction.objects.select_for_update()
+                .values_list("wallet_id", "amount", "applied")
+                .get(pk=self.pk)
+            )
+            if not applied:
+                # Pending deposits are only visible through reads adding them
+                invalidate_wallet(wallet_id)
+            elif not Wallet.objects.apply_balance_change(
+                wallet_id, BalanceChange.removed(amount)
+            ):
                 raise ValidationError(
                     _("Cannot delete: wallet balance would become negative.")
                 )
-            self.wallet.save()
-            super().delete(*args, **kwargs)
+            WalletBalanceSnapshot.objects.invalidate([wallet_id], self.pk)
+            return super().delete(*args, **kwargs)
+
+
+class WalletBalanceSnapshotManager(models.Manager):
+    def invalidate(self, wallet_ids, transaction_id: int) -> None:
+        """
+        Drop snapshots that already include a transaction being changed or removed
+        """
+        self.filter(
+            wallet_id__in=wallet_ids, transaction_id__gte=transaction_id
+        ).delete()
+
+
+class WalletBalanceSnapshot(BaseModel):
+    """
+    Checkpointed sum of wallet transactions up to and including `transaction_id`
+    A balance at any transaction is the latest snapshot before it plus the tail sum
+    """
+
+    wallet = models.ForeignKey(
+        Wallet,
+        related_name="snapshots",
+        on_delete=models.CASCADE,
+    )
+    transaction_id = models.BigIntegerField(
+        help_text="Last transaction included in the snapshot",
+    )
+    balance = models.DecimalField(
+        max_digits=30,
+        decimal_places=18,
+    )
+    transaction_count = models.PositiveBigIntegerField()
+
+    objects = WalletBalanceSnapshotManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "transaction_id"],
+                name="wallet_snapshot_unique_transaction",
+            )
+        ]
+        ordering = ["-transaction_id"]
+        verbose_name = _("Wallet balance snapshot")
+        verbose_name_plural = _("Wallet balance snapshots")
+
+    def __str__(self) -> str:
+        return f"WalletBalanceSnapshot({self.wallet_id}@{self.transaction_id})"
+
+
+class WalletStatementRollup(models.Model):
+    """
+    Hourly transaction totals of a wallet, used for statements in ledger mode
+    Filled for complete hours only by `refresh_statement_rollups`
+    """
+
+    wallet = models.ForeignKey(
+        Wallet,
+        related_name="statement_rollups",
+        on_delete=models.CASCADE,
+    )
+    bucket = models.DateTimeField(help_text="Start of the hour")
+    net = models.DecimalField(max_digits=30, decimal_places=18)
+    credits = models.DecimalField(max_digits=30, decimal_places=18)
+    debits = models.DecimalField(max_digits=30, decimal_places=18)
+    transaction_count = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "bucket"],
+                name="wallet_statement_rollup_unique_bucket",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["bucket"]),
+        ]
+        verbose_name = _("Wallet statement rollup")
+        verbose_name_plural = _("Wallet statement rollups")
+
+    def __str__(self) -> str:
+        return f"WalletStatementRollup({self.wallet_id}@{self.bucket})"
+
+
+class IdempotencyKeyManager(models.Manager):
+    def claim(self, key: str, fingerprint: str):
+        """
+        Get the stored record for the key or create a pending one
+        Must run inside the transaction that handles the request: a concurrent request
+        with the same key blocks on the unique index until that transaction ends
+        """
+        now = timezone.now()
+        self.filter(key=key, expires_at__lte=now).delete()
+        return self.get_or_create(
+            key=key,
+            defaults={
+                "fingerprint": fingerprint,
+                "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            },
+        )
+
+
+class IdempotencyKey(BaseModel):
+    """
+    Response stored for a client supplied `Idempotency-Key`
+    Retries with the same key get the stored response instead of a new write
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text="Hash of the request the key was first used with",
+    )
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=255, blank=True)
+    content = models.TextField(blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = IdempotencyKeyManager()
+
+    class Meta:
+        verbose_name = _("Idempotency key")
+        verbose_name_plural = _("Idempotency keys")
+
+    def __str__(self) -> str:
+        return f"IdempotencyKey({self.key})"
@@ -0,0 +1,130 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import Response
+from rest_framework_json_api.pagination import JsonApiPageNumberPagination
+
+
+class JsonApiCursorPagination(JsonApiPageNumberPagination):
+    """
+    Keyset pagination over the requested sort order, with the primary key as tie-breaker
+
+    Opted into with `page[cursor]` (empty for the first page): each page is a range scan
+    starting after the last row of the previous one, and no COUNT(*) is issued.
+    `links.next` carries an opaque cursor. Requests without `page[cursor]` keep the
+    page number behaviour. Sort fields must be non-nullable.
+    """
+
+    cursor_query_param = "page[cursor]"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.cursor_mode = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_mode = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(self.get_keyset_filter(queryset, cursor))
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page_rows = results[: self.page_size]
+        return self.page_rows
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip("-") in ("pk", "id") for field in ordering):
+            descending = bool(ordering) and ordering[-1].startswith("-")
+            ordering.append("-pk" if descending else "pk")
+        return ordering
+
+    def encode_cursor(self, row):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            if isinstance(row, dict):
+                # values() rows
+                value = row["id" if name == "pk" else name]
+            else:
+                value = getattr(row, name)
+            values.append(str(value))
+        payload = json.dumps({"o": self.ordering, "v": values}).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, queryset, cursor):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if payload["o"] != self.ordering or len(payload["v"]) != len(self.ordering):
+                raise ValueError
+            values = []
+            for field, value in zip(self.ordering, payload["v"]):
+                name = field.lstrip("-")
+                model_field = queryset.model._meta.get_field(
+                    queryset.model._meta.pk.name if name == "pk" else name
+                )
+                values.append(model_field.to_python(value))
+            return values
+        except (
+            ValueError,
+            TypeError,
+            KeyError,
+            FieldDoesNotExist,
+            DjangoValidationError,
+        ):
+            raise ValidationError(self.invalid_cursor_message)
+
+    def get_keyset_filter(self, queryset, cursor):
+        """
+        Rows strictly after the cursor in the (possibly mixed direction) sort order
+        The leading-field bound lets the database use an index range scan
+        """
+        values = self.decode_cursor(queryset, cursor)
+        fields = [field.lstrip("-") for field in self.ordering]
+        descending = [field.startswith("-") for field in self.ordering]
+
+        after = Q()
+        for i, field in enumerate(fields):
+            lookup = "lt" if descending[i] else "gt"
+            condition = Q(**{f"{field}__{lookup}": values[i]})
+            for j in range(i):
+                condition &= Q(**{fields[j]: values[j]})
+            after |= condition
+
+        bound = "lte" if descending[0] else "gte"
+        return Q(**{f"{fields[0]}__{bound}": values[0]}) & after
+
+    def get_cursor_link(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+
+        next = None
+        if self.has_next:
+            next = self.get_cursor_link(self.encode_cursor(self.page_rows[-1]))
+
+        return Response(
+            {
+                "results": data,
+                "meta": {"pagination": {"size": len(self.page_rows)}},
+                "links": {
+                    "first": self.get_cursor_link(""),
+                    "next": next,
+                },
+            }
+        )
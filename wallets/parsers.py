@@ -0,0 +1,17 @@
+from rest_framework_json_api.parsers import JSONParser
+
+
+class BulkJSONParser(JSONParser):
+    """
+    JSON:API parser that also accepts a list of resource objects as primary data
+    """
+
+    def parse_data(self, result, parser_context):
+        data = result.get("data") if isinstance(result, dict) else None
+        if not isinstance(data, list):
+            return super().parse_data(result, parser_context)
+
+        parsed = []
+        for item in data:
+            parsed.append(super().parse_data({"data": item}, parser_context))
+        return parsed
@@ -0,0 +1,242 @@
+"""
+Monthly range partitioning of the transaction table by `created_at` (PostgreSQL only)
+
+A unique index on a partitioned table must contain the partition key, so global `txid`
+uniqueness is kept by a registry table with `txid` as its primary key, maintained by a
+trigger on every insert, txid change and delete. Duplicates fail with the same
+IntegrityError as the unique index on the plain table.
+
+Rows past the last monthly partition land in a default partition instead of failing, and
+are moved into their month's partition when it is created. Before old partitions are
+detached, balance snapshots are compacted up to the end of them, so ledger balances
+still count the detached transactions.
+"""
+
+import re
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from wallets.models import Transaction
+from wallets.services import compact_balance_snapshots
+from wallets.statements import shift, truncate
+
+TABLE = Transaction._meta.db_table
+REGISTRY = f"{TABLE}_txid"
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_PATTERN = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+REGISTRY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION {REGISTRY}_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND (TG_OP = 'DELETE' OR NEW.txid <> OLD.txid) THEN
+        DELETE FROM {REGISTRY} WHERE txid = OLD.txid;
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.txid <> OLD.txid) THEN
+        INSERT INTO {REGISTRY} (txid) VALUES (NEW.txid);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def is_partitioned() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE]
+        )
+        row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def get_partitions() -> dict[datetime, str]:
+    """
+    Monthly partitions by the first day of their month
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+
+    partitions = {}
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            year, month = map(int, match.groups())
+            partitions[datetime(year, month, 1, tzinfo=dt_timezone.utc)] = name
+    return partitions
+
+
+def default_partition_rows() -> int:
+    """
+    Number of rows outside every monthly partition
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+        return cursor.fetchone()[0]
+
+
+def create_partitions(start: datetime, end: datetime) -> list[str]:
+    """
+    Create the missing monthly partitions from the month of `start` until `end`
+    Also creates the default partition if missing. Rows of a new month that are in the
+    default partition are moved into the month's partition
+    """
+    existing = get_partitions()
+    created = []
+    month = truncate(start, "month")
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} "
+            "DEFAULT"
+        )
+        while month < end:
+            following = shift(month, "month", 1)
+            if month not in existing:
+                name = partition_name(month)
+                bounds = f"FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+                    "WHERE created_at >= %s AND created_at < %s)",
+                    [month, following],
+                )
+                (overflow,) = cursor.fetchone()
+                if not overflow:
+                    cursor.execute(
+                        f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}"
+                    )
+                else:
+                    move_from_default(cursor, name, bounds, month, following)
+                created.append(name)
+            month = following
+    return created
+
+
+def move_from_default(
+    cursor, name: str, bounds: str, start: datetime, end: datetime
+) -> None:
+    """
+    Attach a partition holding the rows of the default partition within its bounds
+    A partition cannot be created while the default one holds rows in its range
+    """
+    cursor.execute(
+        f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    # Deleting from the default partition drops the txids from the registry, attaching
+    # does not run the trigger, so they are registered again afterwards
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        "WHERE created_at >= %s AND created_at < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}")
+    cursor.execute(f"INSERT INTO {REGISTRY} (txid) SELECT txid FROM {name}")
+
+
+def detach_partitions(before: datetime, drop: bool = False) -> list[str]:
+    """
+    Detach the partitions that end on or before `before`
+    Detached tables are kept for archiving unless `drop` is set. Their txids stay in
+    the registry, so they cannot be reused. Balance snapshots are compacted up to the
+    end of the last detached partition first, so that ledger balances and
+    `compact_balance_snapshots --verify` still include the detached transactions
+    """
+    partitions = {
+        month: name
+        for month, name in get_partitions().items()
+        if shift(month, "month", 1) <= before
+    }
+    detached = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if partitions:
+            compact_balance_snapshots(shift(max(partitions), "month", 1))
+        for month, name in sorted(partitions.items()):
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            if drop:
+                cursor.execute(f"DROP TABLE {name}")
+            detached.append(name)
+    return detached
+
+
+def convert_to_partitioned(months_ahead: int = 3) -> list[str]:
+    """
+    Replace the plain transaction table with a partitioned copy of it
+    Runs in one transaction holding an exclusive lock, so writes wait until the rows
+    are copied. Indexes (except the txid unique one) and foreign keys are recreated
+    under their old names, the primary key becomes (id, created_at)
+    """
+    old = f"{TABLE}_unpartitioned"
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Deferred foreign key checks pending on the table would block the ALTERs
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s "
+            "AND indexdef NOT LIKE 'CREATE UNIQUE%%'",
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT min(created_at), max(created_at), max(id) FROM {TABLE}")
+        first, last, last_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {old}")
+        cursor.execute(f"ALTER TABLE {old} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        cursor.execute(
+            f"CREATE TABLE {TABLE} "
+            f"(LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        # Identity columns are not supported on partitioned tables before PostgreSQL 17
+        cursor.execute(f"CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')"
+        )
+        if last_id is not None:
+            cursor.execute(f"SELECT setval('{TABLE}_id_seq', %s)", [last_id])
+
+        now = timezone.now()
+        end = shift(truncate(now, "month"), "month", months_ahead + 1)
+        if last is not None:
+            end = max(end, shift(truncate(last, "month"), "month", 1))
+        created = create_partitions(first or now, end)
+
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {old}")
+        cursor.execute(f"DROP TABLE {old}")
+
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey "
+            "PRIMARY KEY (id, created_at)"
+        )
+        # Definitions were read before the rename, so they name the new table
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+        cursor.execute(f"CREATE TABLE {REGISTRY} (txid varchar(255) PRIMARY KEY)")
+        cursor.execute(f"INSERT INTO {REGISTRY} (txid) SELECT txid FROM {TABLE}")
+        cursor.execute(REGISTRY_FUNCTION_SQL)
+        cursor.execute(
+            f"CREATE TRIGGER {REGISTRY}_sync "
+            f"AFTER INSERT OR UPDATE OF txid OR DELETE ON {TABLE} "
+            f"FOR EACH ROW EXECUTE FUNCTION {REGISTRY}_sync()"
+        )
+    return created
@@ -0,0 +1,184 @@
+from copy import copy
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework import fields as drf_fields
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework_json_api.relations import ResourceRelatedField
+from rest_framework_json_api.renderers import JSONRenderer
+from rest_framework_json_api.utils import (
+    format_field_name,
+    format_field_names,
+    get_resource_type_from_queryset,
+    get_resource_type_from_serializer,
+)
+
+
+class ResourceList(list):
+    """
+    Resource objects that are already in JSON:API form
+    Resources of a compound document go in `included`
+    """
+
+    included = ()
+
+
+def get_formatter(field):
+    """
+    Return a function producing the same output as `field.to_representation`
+    Plain decimals and UTC datetimes are formatted directly, anything else
+    goes through the field
+    """
+    if isinstance(field, drf_fields.DecimalField):
+        coerce_to_string = getattr(
+            field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+        )
+        if coerce_to_string and not field.localize and not field.normalize_output:
+            exponent = -field.decimal_places
+
+            def format_decimal(value):
+                # Values stored with the field's scale need no quantization
+                if isinstance(value, Decimal) and value.as_tuple().exponent == exponent:
+                    return format(value, "f")
+                return field.to_representation(value)
+
+            return format_decimal
+
+    if isinstance(field, drf_fields.DateTimeField):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if (
+            output_format is not None
+            and output_format.lower() == drf_fields.ISO_8601
+            and settings.USE_TZ
+            and settings.TIME_ZONE == "UTC"
+        ):
+
+            def format_datetime(value):
+                if value.tzinfo is not None and value.utcoffset() == timedelta(0):
+                    value = value.isoformat()
+                    if value.endswith("+00:00"):
+                        value = value[:-6] + "Z"
+                    return value
+                return field.to_representation(value)
+
+            return format_datetime
+
+    if type(field) is drf_fields.CharField:
+        return str
+
+    return field.to_representation
+
+
+class ResourceBuilder:
+    """
+    Builds JSON:API resource objects from `values()` rows of a serializer's model
+    Field names, formatters and relationship types are resolved once per serializer
+    """
+
+    def __init__(self, serializer_class):
+        self.resource_type = get_resource_type_from_serializer(serializer_class)
+        self.columns = ["id"]
+        self.attributes = []
+        self.relationships = []
+        self.fieldsets = {}
+
+        for name, field in serializer_class().fields.items():
+            if field.write_only or name == "id":
+                continue
+            if isinstance(field, ResourceRelatedField):
+                column = f"{field.source}_id"
+                self.relationships.append(
+                    (
+                        format_field_name(name),
+                        column,
+                        get_resource_type_from_queryset(field.get_queryset()),
+                    )
+                )
+            else:
+                column = field.source
+                self.attributes.append(
+                    (format_field_name(name), column, get_formatter(field))
+                )
+            self.columns.append(column)
+
+    def select(self, fields) -> "ResourceBuilder":
+        """
+        Builder for a sparse fieldset, reading only the columns of `fields`
+        """
+        fields = tuple(fields)
+        if fields not in self.fieldsets:
+            builder = copy(self)
+            builder.attributes = [item for item in self.attributes if item[0] in fields]
+            builder.relationships = [
+                item for item in self.relationships if item[0] in fields
+            ]
+            builder.columns = ["id"] + [
+                column for _, column, _ in builder.attributes + builder.relationships
+            ]
+            builder.fieldsets = {}
+            self.fieldsets[fields] = builder
+        return self.fieldsets[fields]
+
+    def get_relationship(self, name):
+        """
+        Column and resource type of the relationship `name`, None if not selected
+        """
+        for field_name, column, related_type in self.relationships:
+            if field_name == name:
+                return column, related_type
+        return None
+
+    def build(self, row):
+        resource = {"type": self.resource_type, "id": str(row["id"])}
+
+        attributes = {}
+        for name, column, formatter in self.attributes:
+            value = row[column]
+            attributes[name] = None if value is None else formatter(value)
+        if attributes:
+            resource["attributes"] = attributes
+
+        if self.relationships:
+            relationships = {}
+            for name, column, related_type in self.relationships:
+                related_id = row[column]
+                relationships[name] = {
+                    "data": (
+                        None
+                        if related_id is None
+                        else {"type": related_type, "id": str(related_id)}
+                    )
+                }
+            resource["relationships"] = relationships
+
+        return resource
+
+    def build_many(self, rows):
+        return ResourceList(self.build(row) for row in rows)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON:API renderer that passes prebuilt resource lists through unchanged
+    Output is identical to `JSONRenderer` for the same resources
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        resources = data.get("results") if isinstance(data, dict) else data
+        if not isinstance(resources, ResourceList):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        render_data = {}
+        if isinstance(data, dict) and data.get("links"):
+            render_data["links"] = data["links"]
+        render_data["data"] = resources
+        if resources.included:
+            render_data["included"] = resources.included
+        if isinstance(data, dict) and data.get("meta"):
+            render_data["meta"] = format_field_names(data["meta"])
+
+        return renderers.JSONRenderer.render(
+            self, render_data, accepted_media_type, renderer_context
+        )
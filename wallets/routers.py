@@ -0,0 +1,65 @@
+"""
+Read-replica routing
+
+Reads go to the primary unless a view opts in with `read_from(REPLICA)`, which the
+wallet and transaction list and retrieve actions do. Writes, and every read outside
+that context (validation, locking reads, balance updates in `Transaction.save()`), stay
+on the primary. After a successful write the client gets a short-lived cookie that
+keeps its reads on the primary, so it reads its own writes despite replication lag.
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+read_target = contextvars.ContextVar("wallets_read_target", default=None)
+read_alias = contextvars.ContextVar("wallets_read_alias", default=DEFAULT_DB_ALIAS)
+
+
+@contextmanager
+def read_from(target: str):
+    """
+    Route the reads of the block to `PRIMARY` or a `REPLICA`
+    The replica is picked once for the block, so all of its reads (e.g. a page and its
+    count) see the same replication state
+    """
+    alias = DEFAULT_DB_ALIAS
+    if target == REPLICA and settings.WALLETS_READ_REPLICAS:
+        alias = random.choice(settings.WALLETS_READ_REPLICAS)
+    target_token = read_target.set(target)
+    alias_token = read_alias.set(alias)
+    try:
+        yield
+    finally:
+        read_alias.reset(alias_token)
+        read_target.reset(target_token)
+
+
+def pinned_to_primary(request) -> bool:
+    """
+    Whether the client wrote recently, so its reads must see the primary
+    """
+    return settings.WALLETS_REPLICA_COOKIE in request.COOKIES
+
+
+class ReplicaRouter:
+    """
+    Sends reads in a `read_from(REPLICA)` block to the `WALLETS_READ_REPLICAS` alias
+    picked for the block, everything else to the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
@@ -0,0 +1,132 @@
+"""
+OpenAPI schema artifacts keyed by a hash of the code version
+
+Generating the schema introspects every serializer and viewset, so it is done once per
+code version (usually at deploy time, with `manage.py build_schema`) and stored in
+`WALLETS_SCHEMA_DIR` as `openapi-<version>.yml` and `.json`. Processes read the artifact
+of their version once and serve it from memory.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from importlib import import_module
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+
+# Code the schema is generated from: the project packages and the libraries involved
+SOURCE_PACKAGES = ("wallet_api", "wallets")
+LIBRARIES = (
+    "Django",
+    "djangorestframework",
+    "djangorestframework-jsonapi",
+    "django-filter",
+    "drf-spectacular",
+)
+
+FORMATS = {
+    "yaml": ("yml", "application/vnd.oai.openapi"),
+    "json": ("json", "application/vnd.oai.openapi+json"),
+}
+
+generate_lock = threading.Lock()
+
+
+@lru_cache
+def code_version() -> str:
+    """
+    `WALLETS_CODE_VERSION`, or a hash of the project sources and library versions
+    """
+    if settings.WALLETS_CODE_VERSION:
+        return settings.WALLETS_CODE_VERSION
+    digest = hashlib.sha256()
+    for library in LIBRARIES:
+        try:
+            digest.update(f"{library}=={version(library)}\n".encode())
+        except PackageNotFoundError:
+            digest.update(f"{library}\n".encode())
+    for package in SOURCE_PACKAGES:
+        root = Path(import_module(package).__file__).parent
+        for path in sorted(root.rglob("*.py")):
+            digest.update(str(path.relative_to(root.parent)).encode() + b"\0")
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(schema_version: str, schema_format: str) -> Path:
+    extension, _ = FORMATS[schema_format]
+    return Path(settings.WALLETS_SCHEMA_DIR) / f"openapi-{schema_version}.{extension}"
+
+
+@lru_cache
+def read_schema(path: Path) -> bytes:
+    return path.read_bytes()
+
+
+def write_atomic(path: Path, content: bytes) -> None:
+    # Concurrent writers each rename a complete file into place
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=".openapi-")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(content)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def generate_schema(schema_version: str) -> list[Path]:
+    """
+    Generate the schema and write it in every format
+    """
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    renderers = {"yaml": OpenApiYamlRenderer(), "json": OpenApiJsonRenderer()}
+
+    Path(settings.WALLETS_SCHEMA_DIR).mkdir(parents=True, exist_ok=True)
+    paths = []
+    for schema_format, renderer in renderers.items():
+        path = schema_path(schema_version, schema_format)
+        write_atomic(path, renderer.render(schema, renderer_context={}))
+        paths.append(path)
+    return paths
+
+
+def get_schema(schema_format: str = "yaml") -> bytes:
+    """
+    Schema of the running code version, generated first if this process can
+    Raises FileNotFoundError when it was not generated and drf-spectacular is not
+    installed (the API-only profile)
+    """
+    schema_version = code_version()
+    path = schema_path(schema_version, schema_format)
+    try:
+        return read_schema(path)
+    except FileNotFoundError:
+        if not apps.is_installed("drf_spectacular"):
+            raise
+    with generate_lock:
+        if not path.exists():
+            generate_schema(schema_version)
+    return read_schema(path)
+
+
+def prune_schemas(keep_version: str) -> list[Path]:
+    """
+    Remove the artifacts of other code versions
+    """
+    keep = {schema_path(keep_version, schema_format) for schema_format in FORMATS}
+    removed = []
+    for path in Path(settings.WALLETS_SCHEMA_DIR).glob("openapi-*"):
+        if path not in keep:
+            path.unlink(missing_ok=True)
+            removed.append(path)
+    return removed
@@ -1,48 +1,247 @@
 from decimal import Decimal
 
+from django.utils import timezone
 from rest_framework_json_api import serializers
 from rest_framework_json_api.relations import ResourceRelatedField
+from rest_framework_json_api.utils import get_resource_type_from_queryset
 
 from wallets.models import Transaction, Wallet
+from wallets.services import Transfer, bulk_create_transactions, create_transfers
+from wallets.statements import INTERVALS, MAX_BUCKETS, bucket_count, shift, truncate
 
 
 class WalletSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wallet
-        fields = ("id", "label", "balance")
-        read_only_fields = ("balance",)
+        fields = (
+            "id",
+            "label",
+            "balance",
+            "transaction_count",
+            "total_credits",
+            "total_debits",
+            "last_transaction_at",
+            "is_hot",
+        )
+        read_only_fields = (
+            "balance",
+            "transaction_count",
+            "total_credits",
+            "total_debits",
+            "last_transaction_at",
+        )
 
 
 class TransactionSerializer(serializers.ModelSerializer):
     wallet = ResourceRelatedField(queryset=Wallet.objects.all())
 
+    included_serializers = {"wallet": WalletSerializer}
+
     class Meta:
         model = Transaction
         fields = ("id", "wallet", "txid", "amount", "created_at")
         read_only_fields = ("created_at",)
+        # Checked by the database on write: the unique index for txids and the
+        # conditional balance UPDATE (see `Transaction.save`) for balances
+        extra_kwargs = {"txid": {"validators": []}}
 
-    def validate(self, data):
+
+class PreloadedWalletRelatedField(ResourceRelatedField):
+    """
+    Wallet relation resolved from wallets preloaded by the parent list serializer
+    Falls back to a regular lookup (and its error messages) when not preloaded
+    """
+
+    def to_internal_value(self, data):
+        wallets = getattr(self.root, "wallets", {})
+        expected_type = get_resource_type_from_queryset(self.get_queryset())
+        if isinstance(data, dict) and data.get("type") == expected_type:
+            wallet = wallets.get(str(data.get("id")))
+            if wallet is not None:
+                return wallet
+        return super().to_internal_value(data)
+
+
+def preload_wallets(data, fields) -> dict:
+    """
+    Wallets referenced by `fields` of the items in `data`, keyed by id string
+    """
+    wallet_ids = set()
+    if isinstance(data, list):
+        for item in data:
+            for field in fields:
+                wallet = item.get(field) if isinstance(item, dict) else None
+                if isinstance(wallet, dict) and str(wallet.get("id", "")).isdigit():
+                    wallet_ids.add(int(wallet["id"]))
+    return {
+        str(pk): wallet for pk, wallet in Wallet.objects.in_bulk(wallet_ids).items()
+    }
+
+
+class BulkTransactionListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
         """
-        Ensure that wallet balance will not become negative.
+        Load referenced wallets and check txid collisions with one query each
         """
-        wallet = data.get("wallet")
-        amount = data.get("amount")
+        self.wallets = preload_wallets(data, ["wallet"])
+        data = super().to_internal_value(data)
 
-        if self.instance:
-            wallet = wallet or self.instance.wallet
-            amount = amount if amount is not None else self.instance.amount
+        # Collisions are reported per item, like field errors of the items themselves
+        txids = [item["txid"] for item in data]
+        existing = set(
+            Transaction.objects.filter(txid__in=txids).values_list("txid", flat=True)
+        )
 
-        if wallet is None or amount is None:
-            raise serializers.ValidationError("Wallet and amount must be provided.")
+        errors = []
+        seen = set()
+        for txid in txids:
+            if txid in existing:
+                errors.append({"txid": ["Transaction with this txid already exists."]})
+            elif txid in seen:
+                errors.append({"txid": ["Duplicate txid in batch."]})
+            else:
+                errors.append({})
+            seen.add(txid)
 
-        if self.instance:
-            delta = amount - self.instance.amount
-        else:
-            delta = amount
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return data
 
-        projected_balance = wallet.balance + delta
+    def create(self, validated_data):
+        return bulk_create_transactions(
+            [Transaction(**item) for item in validated_data]
+        )
 
-        if projected_balance < Decimal("0.0"):
-            raise serializers.ValidationError("Wallet balance cannot become negative.")
+
+class BulkTransactionSerializer(TransactionSerializer):
+    """
+    Batch item serializer
+    txid uniqueness and wallet balances are checked once for the whole batch
+    """
+
+    wallet = PreloadedWalletRelatedField(queryset=Wallet.objects.all())
+
+    class Meta(TransactionSerializer.Meta):
+        list_serializer_class = BulkTransactionListSerializer
+
+
+class TransferListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        """
+        Load referenced wallets and check txid collisions with one query each
+        """
+        self.wallets = preload_wallets(data, ["source", "destination"])
+        data = super().to_internal_value(data)
+
+        transfers = [Transfer(**item) for item in data]
+        existing = set(
+            Transaction.objects.filter(
+                txid__in=[
+                    txid
+                    for transfer in transfers
+                    for txid in (transfer.debit_txid, transfer.credit_txid)
+                ]
+            ).values_list("txid", flat=True)
+        )
+
+        errors = []
+        seen = set()
+        for transfer in transfers:
+            if {transfer.debit_txid, transfer.credit_txid} & existing:
+                errors.append({"txid": ["Transfer with this txid already exists."]})
+            elif transfer.txid in seen:
+                errors.append({"txid": ["Duplicate txid in batch."]})
+            else:
+                errors.append({})
+            seen.add(transfer.txid)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
 
         return data
+
+    def create(self, validated_data):
+        return create_transfers([Transfer(**item) for item in validated_data])
+
+
+class TransferSerializer(serializers.Serializer):
+    """
+    Transfer between two wallets
+    The resource id is the transfer txid, the booked legs are `debit` and `credit`
+    """
+
+    txid = serializers.CharField(
+        max_length=Transaction._meta.get_field("txid").max_length - len(":credit")
+    )
+    source = PreloadedWalletRelatedField(queryset=Wallet.objects.all())
+    destination = PreloadedWalletRelatedField(queryset=Wallet.objects.all())
+    amount = serializers.DecimalField(
+        max_digits=30, decimal_places=18, min_value=Decimal("1e-18")
+    )
+    debit = ResourceRelatedField(
+        model=Transaction, read_only=True, pk_field=serializers.IntegerField()
+    )
+    credit = ResourceRelatedField(
+        model=Transaction, read_only=True, pk_field=serializers.IntegerField()
+    )
+
+    class Meta:
+        resource_name = "Transfer"
+        list_serializer_class = TransferListSerializer
+
+    def validate(self, data):
+        if data["source"] == data["destination"]:
+            raise serializers.ValidationError(
+                "Source and destination must be different wallets."
+            )
+        return data
+
+
+class StatementQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of a wallet statement
+    `start` is rounded down and `end` up to bucket boundaries. Without them the
+    statement covers the last `default_buckets` buckets up to now
+    """
+
+    default_buckets = {"hour": 24, "day": 31, "month": 12}
+
+    interval = serializers.ChoiceField(choices=INTERVALS, default="day")
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        interval = data["interval"]
+        end = data.get("end") or timezone.now()
+        end_bucket = truncate(end, interval)
+        end = end_bucket if end_bucket == end else shift(end_bucket, interval, 1)
+        if "start" in data:
+            start = truncate(data["start"], interval)
+        else:
+            start = shift(end, interval, -self.default_buckets[interval])
+
+        if start >= end:
+            raise serializers.ValidationError("start must be before end.")
+        if bucket_count(start, end, interval) > MAX_BUCKETS:
+            raise serializers.ValidationError(
+                f"A statement can have at most {MAX_BUCKETS} buckets."
+            )
+        return {"interval": interval, "start": start, "end": end}
+
+
+class StatementBucketSerializer(serializers.Serializer):
+    """
+    One bucket of a wallet statement, identified by wallet id and bucket start
+    """
+
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    opening_balance = serializers.DecimalField(max_digits=30, decimal_places=18)
+    closing_balance = serializers.DecimalField(max_digits=30, decimal_places=18)
+    credits = serializers.DecimalField(max_digits=30, decimal_places=18)
+    debits = serializers.DecimalField(max_digits=30, decimal_places=18)
+    transaction_count = serializers.IntegerField()
+
+    class Meta:
+        resource_name = "WalletStatement"
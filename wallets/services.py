@@ -0,0 +1,239 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from wallets.models import (
+    BalanceChange,
+    Transaction,
+    Wallet,
+    WalletBalanceSnapshot,
+    add_balance_change,
+)
+
+
+def bulk_create_transactions(transactions: list[Transaction]) -> list[Transaction]:
+    """
+    Bulk insert transactions and apply one balance update per touched wallet
+    The whole batch is rolled back if any wallet balance would become negative
+    """
+    now = timezone.now()
+    changes = defaultdict(BalanceChange)
+    for tx in transactions:
+        changes[tx.wallet_id] += BalanceChange.added(tx.amount, now)
+
+    with transaction.atomic():
+        # Wallets are updated in id order so concurrent batches lock rows consistently
+        for wallet_id in sorted(changes):
+            if not Wallet.objects.apply_balance_change(wallet_id, changes[wallet_id]):
+                raise ValidationError(
+                    _("Wallet %(wallet)s balance cannot become negative."),
+                    params={"wallet": wallet_id},
+                )
+
+        return Transaction.objects.bulk_create(transactions)
+
+
+@dataclass
+class Transfer:
+    """
+    Movement of `amount` from `source` to `destination`
+    Booked as a debit and a credit transaction whose txids extend the transfer txid
+    """
+
+    txid: str
+    source: Wallet
+    destination: Wallet
+    amount: Decimal
+    debit: Transaction | None = None
+    credit: Transaction | None = None
+
+    @property
+    def pk(self) -> str:
+        return self.txid
+
+    @property
+    def debit_txid(self) -> str:
+        return f"{self.txid}:debit"
+
+    @property
+    def credit_txid(self) -> str:
+        return f"{self.txid}:credit"
+
+
+def create_transfers(transfers: list[Transfer]) -> list[Transfer]:
+    """
+    Book all transfers in one database transaction, all-or-nothing
+    Balances are checked per wallet after netting every leg of the batch. Wallets are
+    locked in id order, so concurrent transfers in opposite directions cannot deadlock
+    """
+    transactions = []
+    for transfer in transfers:
+        transfer.debit = Transaction(
+            wallet=transfer.source, txid=transfer.debit_txid, amount=-transfer.amount
+        )
+        transfer.credit = Transaction(
+            wallet=transfer.destination,
+            txid=transfer.credit_txid,
+            amount=transfer.amount,
+        )
+        transactions += [transfer.debit, transfer.credit]
+
+    bulk_create_transactions(transactions)
+    return transfers
+
+
+def add_pending_changes(wallets) -> None:
+    """
+    Add deposits pending on hot wallets to their balances and aggregates
+    `wallets` are Wallet instances or `values()` rows of them. Without hot wallets
+    among them nothing is queried
+    """
+    values = [
+        wallet if isinstance(wallet, dict) else wallet.__dict__ for wallet in wallets
+    ]
+    hot = {row["id"]: row for row in values if row.get("is_hot")}
+    if hot:
+        for wallet_id, change in Transaction.objects.pending_changes(hot).items():
+            add_balance_change(hot[wallet_id], change)
+
+
+def flush_pending_deposits(batch_size: int = 1000) -> int:
+    """
+    Fold deposits pending on hot wallets into the wallet balances, a batch at a time
+    Each batch is its own database transaction. Deposits locked by a concurrent flush
+    are left to it
+    """
+    flushed = 0
+    while True:
+        count = Wallet.objects.flush_pending(limit=batch_size, skip_locked=True)
+        flushed += count
+        if count < batch_size:
+            return flushed
+
+
+def ledger_balance(wallet_id: int, transaction_id: int | None = None) -> Decimal:
+    """
+    Wallet balance as of `transaction_id` (inclusive), or as of now
+    Computed as the latest snapshot at or before that point plus the tail after it
+    """
+    snapshots = WalletBalanceSnapshot.objects.filter(wallet_id=wallet_id)
+    tail = Transaction.objects.filter(wallet_id=wallet_id)
+    if transaction_id is not None:
+        snapshots = snapshots.filter(transaction_id__lte=transaction_id)
+        tail = tail.filter(pk__lte=transaction_id)
+
+    balance = Decimal("0")
+    snapshot = snapshots.order_by("-transaction_id").first()
+    if snapshot is not None:
+        balance = snapshot.balance
+        tail = tail.filter(pk__gt=snapshot.transaction_id)
+
+    return balance + (tail.aggregate(total=Sum("amount"))["total"] or Decimal("0"))
+
+
+def compact_balance_snapshots(
+    before: datetime, min_tail: int = 1, wallet_ids=None
+) -> list[WalletBalanceSnapshot]:
+    """
+    Fold transactions up to the last one created before `before` into new snapshots
+    Only tails of at least `min_tail` transactions are folded. Each snapshot extends
+    the previous one, so a run reads only transactions added since the last run
+    """
+    latest_snapshot_id = Subquery(
+        WalletBalanceSnapshot.objects.filter(wallet_id=OuterRef("wallet_id"))
+        .order_by("-transaction_id")
+        .values("transaction_id")[:1]
+    )
+    # Snapshots cover every transaction up to an id, so the tail is cut by id: a
+    # transaction with a lower id but a later created_at is folded with the others
+    cutoff_id = Subquery(
+        Transaction.objects.filter(
+            wallet_id=OuterRef("wallet_id"), created_at__lt=before
+        )
+        .order_by("-pk")
+        .values("pk")[:1]
+    )
+    tails = Transaction.objects.annotate(
+        snapshot_id=Coalesce(latest_snapshot_id, Value(0)), cutoff_id=cutoff_id
+    ).filter(pk__gt=F("snapshot_id"), pk__lte=F("cutoff_id"))
+    if wallet_ids is not None:
+        tails = tails.filter(wallet_id__in=wallet_ids)
+    tails = list(
+        tails.values("wallet_id")
+        .annotate(count=Count("pk"), total=Sum("amount"), last_id=Max("pk"))
+        .filter(count__gte=min_tail)
+        .order_by("wallet_id")
+    )
+
+    previous = {
+        snapshot.wallet_id: snapshot
+        for snapshot in WalletBalanceSnapshot.objects.filter(
+            wallet_id__in=[tail["wallet_id"] for tail in tails],
+            transaction_id=latest_snapshot_id,
+        )
+    }
+
+    snapshots = []
+    for tail in tails:
+        snapshot = previous.get(tail["wallet_id"])
+        snapshots.append(
+            WalletBalanceSnapshot(
+                wallet_id=tail["wallet_id"],
+                transaction_id=tail["last_id"],
+                balance=(snapshot.balance if snapshot else 0) + tail["total"],
+                transaction_count=(snapshot.transaction_count if snapshot else 0)
+                + tail["count"],
+            )
+        )
+    # A concurrent run may have stored the same checkpoint already
+    return WalletBalanceSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+
+
+def wallet_aggregate_values() -> dict:
+    """
+    UPDATE values recomputing wallet aggregates from the wallet's transactions
+    """
+    # Pending deposits are added by the flush that applies them
+    transactions = (
+        Transaction.objects.filter(wallet=OuterRef("pk"), applied=True)
+        .order_by()
+        .values("wallet")
+    )
+
+    def aggregate(expression):
+        return Subquery(transactions.annotate(value=expression).values("value"))
+
+    zero = Value(Decimal("0"))
+    return {
+        "transaction_count": Coalesce(aggregate(Count("pk")), 0),
+        "total_credits": Coalesce(
+            aggregate(Sum("amount", filter=Q(amount__gt=0))), zero
+        ),
+        "total_debits": Coalesce(
+            aggregate(Sum(-F("amount"), filter=Q(amount__lt=0))), zero
+        ),
+        "last_transaction_at": aggregate(Max("created_at")),
+    }
+
+
+def recompute_wallet_aggregates(wallet_ids: list[int]) -> int:
+    """
+    Recompute aggregates of the wallets from their transactions
+    The wallets are locked first, so no write to them is in flight while counting
+    """
+    with transaction.atomic():
+        locked = list(
+            Wallet.objects.select_for_update()
+            .filter(pk__in=wallet_ids)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        return Wallet.objects.filter(pk__in=locked).update(**wallet_aggregate_values())
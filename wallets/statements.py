@@ -0,0 +1,295 @@
+"""
+Wallet statements: balance and volume per hour, day or month
+
+Buckets are computed in one query. Transactions are grouped per bucket and window
+sums over the groups give the running balance, anchored on the current wallet balance,
+so no transaction before the statement start is read. In ledger mode complete hours
+come from `WalletStatementRollup` rows instead of the transactions themselves.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateTimeField,
+    DecimalField,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from wallets.models import Transaction, Wallet, WalletStatementRollup
+
+INTERVALS = ("hour", "day", "month")
+MAX_BUCKETS = 10000
+
+# Running balance per bucket: the current balance minus everything booked since the
+# statement start, plus everything booked up to and including the bucket
+STATEMENT_SQL = """
+SELECT
+    bucket_start,
+    SUM(credit_total),
+    SUM(debit_total),
+    SUM(tx_count),
+    ({balance}) - SUM(SUM(net_total)) OVER () + SUM(SUM(net_total)) OVER (
+        ORDER BY bucket_start
+    )
+FROM ({parts}) parts
+GROUP BY bucket_start
+ORDER BY bucket_start
+"""
+
+
+@dataclass
+class StatementBucket:
+    start: datetime
+    end: datetime
+    opening_balance: Decimal
+    closing_balance: Decimal
+    credits: Decimal = Decimal("0")
+    debits: Decimal = Decimal("0")
+    transaction_count: int = 0
+
+
+def truncate(value: datetime, interval: str) -> datetime:
+    """
+    Start of the UTC bucket containing `value`
+    """
+    value = value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if interval != "hour":
+        value = value.replace(hour=0)
+    if interval == "month":
+        value = value.replace(day=1)
+    return value
+
+
+def shift(value: datetime, interval: str, count: int) -> datetime:
+    """
+    Move a bucket start by `count` buckets
+    """
+    if interval == "hour":
+        return value + timedelta(hours=count)
+    if interval == "day":
+        return value + timedelta(days=count)
+    year, month = divmod(value.year * 12 + value.month - 1 + count, 12)
+    return value.replace(year=year, month=month + 1)
+
+
+def bucket_count(start: datetime, end: datetime, interval: str) -> int:
+    if interval == "month":
+        return (end.year - start.year) * 12 + end.month - start.month
+    step = timedelta(hours=1) if interval == "hour" else timedelta(days=1)
+    return (end - start) // step
+
+
+def statement_watermark() -> datetime | None:
+    """
+    Start of the first hour that is not rolled up yet, or None without rollups
+    """
+    latest = WalletStatementRollup.objects.aggregate(latest=Max("bucket"))["latest"]
+    return None if latest is None else latest + timedelta(hours=1)
+
+
+def bucket_key(field: str, interval: str, end: datetime):
+    # Everything from `end` on is folded into one group, only its net is needed
+    return Case(
+        When(**{f"{field}__gte": end}, then=Value(end)),
+        default=Trunc(field, interval, tzinfo=dt_timezone.utc),
+        output_field=DateTimeField(),
+    )
+
+
+def statement_parts(wallet_id: int, interval: str, start: datetime, end: datetime):
+    zero = Value(Decimal("0"))
+    live_start = start
+
+    rollups = None
+    watermark = statement_watermark() if settings.WALLETS_LEDGER_MODE else None
+    if watermark is not None and watermark > start:
+        live_start = watermark
+        rollups = (
+            WalletStatementRollup.objects.filter(
+                wallet_id=wallet_id, bucket__gte=start, bucket__lt=watermark
+            )
+            .annotate(bucket_start=bucket_key("bucket", interval, end))
+            .values("bucket_start")
+            .annotate(
+                net_total=Sum("net"),
+                credit_total=Sum("credits"),
+                debit_total=Sum("debits"),
+                tx_count=Sum("transaction_count"),
+            )
+            .values_list(
+                "bucket_start", "net_total", "credit_total", "debit_total", "tx_count"
+            )
+            .order_by()
+        )
+
+    live = (
+        Transaction.objects.filter(wallet_id=wallet_id, created_at__gte=live_start)
+        .annotate(bucket_start=bucket_key("created_at", interval, end))
+        .values("bucket_start")
+        .annotate(
+            net_total=Sum("amount"),
+            credit_total=Coalesce(Sum("amount", filter=Q(amount__gt=0)), zero),
+            debit_total=Coalesce(Sum(-F("amount"), filter=Q(amount__lt=0)), zero),
+            tx_count=Count("pk"),
+        )
+        .values_list(
+            "bucket_start", "net_total", "credit_total", "debit_total", "tx_count"
+        )
+        .order_by()
+    )
+    return live if rollups is None else live.union(rollups, all=True)
+
+
+def to_datetime(value) -> datetime:
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value.astimezone(dt_timezone.utc)
+
+
+def to_decimal(value) -> Decimal:
+    return Transaction._meta.get_field("amount").to_python(value)
+
+
+def current_balance(wallet_id: int):
+    """
+    Wallet balance including deposits still pending on a hot wallet
+    """
+    pending = (
+        Transaction.objects.filter(wallet=OuterRef("pk"), applied=False)
+        .order_by()
+        .values("wallet")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    return Wallet.objects.filter(pk=wallet_id).values(
+        total=F("balance")
+        + Coalesce(Subquery(pending), Value(Decimal("0")), output_field=DecimalField())
+    )
+
+
+def wallet_statement(
+    wallet: Wallet, interval: str, start: datetime, end: datetime
+) -> tuple[Decimal, list[StatementBucket]]:
+    """
+    Opening balance and buckets of the wallet from `start` until `end`
+    `start` and `end` must be bucket boundaries. Buckets without transactions are
+    included with an unchanged balance
+    """
+    parts = statement_parts(wallet.pk, interval, start, end)
+    connection = connections[parts.db]
+    sql, params = parts.query.get_compiler(connection=connection).as_sql()
+    balance_sql, balance_params = (
+        current_balance(wallet.pk).query.get_compiler(connection=connection).as_sql()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            STATEMENT_SQL.format(balance=balance_sql, parts=sql),
+            [*balance_params, *params],
+        )
+        rows = cursor.fetchall()
+
+    totals = {}
+    opening = wallet.balance
+    for index, (bucket, credits, debits, count, closing) in enumerate(rows):
+        bucket, closing = to_datetime(bucket), to_decimal(closing)
+        totals[bucket] = (to_decimal(credits), to_decimal(debits), int(count), closing)
+        if index == len(rows) - 1:
+            # The last group holds everything up to now, so it ends at the current
+            # balance and the opening balance follows from the running sums
+            net = sum(credit - debit for credit, debit, _, _ in totals.values())
+            opening = closing - net
+
+    buckets = []
+    balance = opening
+    bucket = start
+    while bucket < end:
+        following = shift(bucket, interval, 1)
+        if bucket in totals:
+            credits, debits, count, closing = totals[bucket]
+            buckets.append(
+                StatementBucket(
+                    bucket, following, balance, closing, credits, debits, count
+                )
+            )
+        else:
+            closing = balance
+            buckets.append(StatementBucket(bucket, following, balance, closing))
+        balance = closing
+        bucket = following
+    return opening, buckets
+
+
+def refresh_statement_rollups(before: datetime, chunk=timedelta(days=1)) -> int:
+    """
+    Roll up the complete hours before `before` that are not rolled up yet
+    Hours are processed in chunks, oldest first, each in its own transaction, so an
+    interrupted run leaves no gap below the watermark. Returns the rows written
+    """
+    cutoff = truncate(before, "hour")
+    start = statement_watermark()
+    if start is None:
+        first = Transaction.objects.aggregate(first=Min("created_at"))["first"]
+        if first is None:
+            return 0
+        start = truncate(first, "hour")
+
+    written = 0
+    while start < cutoff:
+        stop = min(start + chunk, cutoff)
+        totals = (
+            Transaction.objects.filter(created_at__gte=start, created_at__lt=stop)
+            .annotate(hour=Trunc("created_at", "hour", tzinfo=dt_timezone.utc))
+            .values("wallet_id", "hour")
+            .annotate(
+                net=Sum("amount"),
+                credits=Coalesce(
+                    Sum("amount", filter=Q(amount__gt=0)), Value(Decimal("0"))
+                ),
+                debits=Coalesce(
+                    Sum(-F("amount"), filter=Q(amount__lt=0)), Value(Decimal("0"))
+                ),
+                count=Count("pk"),
+            )
+            .order_by()
+        )
+        rollups = [
+            WalletStatementRollup(
+                wallet_id=row["wallet_id"],
+                bucket=row["hour"],
+                net=row["net"],
+                credits=row["credits"],
+                debits=row["debits"],
+                transaction_count=row["count"],
+            )
+            for row in totals
+        ]
+        with transaction.atomic():
+            WalletStatementRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=["wallet", "bucket"],
+                update_fields=["net", "credits", "debits", "transaction_count"],
+            )
+        written += len(rollups)
+        start = stop
+    return written
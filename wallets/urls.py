@@ -1,12 +1,33 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from wallets.views import TransactionViewSet, WalletViewSet
+from wallets import async_views
+from wallets.views import (
+    TransactionViewSet,
+    TransferViewSet,
+    WalletViewSet,
+    cache_stats,
+    metrics,
+)
 
 router = DefaultRouter()
 router.register(r"wallets", WalletViewSet, basename="wallet")
 router.register(r"transactions", TransactionViewSet, basename="transaction")
+router.register(r"transfers", TransferViewSet, basename="transfer")
 
 urlpatterns = [
+    path("cache-stats/", cache_stats, name="cache-stats"),
+    path("metrics/", metrics, name="metrics"),
+    path("async/wallets/", async_views.wallet_list, name="async-wallet-list"),
+    path(
+        "async/wallets/<int:pk>/",
+        async_views.wallet_detail,
+        name="async-wallet-detail",
+    ),
+    path(
+        "async/transactions/",
+        async_views.transaction_list,
+        name="async-transaction-list",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,12 +1,547 @@
-from rest_framework_json_api import filters, views
+import hashlib
+import json
+from contextlib import contextmanager
+from dataclasses import asdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import condition, require_GET, require_safe
+from rest_framework import exceptions, status, viewsets
+from rest_framework.decorators import action, api_view, renderer_classes
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework_json_api import filters, serializers, views
 from rest_framework_json_api.django_filters import DjangoFilterBackend
 
-from wallets.filters import TransactionFilter
-from wallets.models import Transaction, Wallet
-from wallets.serializers import TransactionSerializer, WalletSerializer
+from wallets.cache import LIST_SCOPE, wallet_cache
+from wallets.exports import EXPORT_FORMATS
+from wallets.filters import TransactionFilter, WalletFilter
+from wallets.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from wallets.metrics import render_metrics, timed
+from wallets.models import IdempotencyKey, Transaction, Wallet
+from wallets.pagination import JsonApiCursorPagination
+from wallets.parsers import BulkJSONParser
+from wallets.renderers import FastJSONRenderer, ResourceBuilder, ResourceList
+from wallets.routers import REPLICA, pinned_to_primary, read_from, read_target
+from wallets.schema import FORMATS as SCHEMA_FORMATS
+from wallets.schema import code_version, get_schema
+from wallets.serializers import (
+    BulkTransactionSerializer,
+    StatementBucketSerializer,
+    StatementQuerySerializer,
+    TransactionSerializer,
+    TransferSerializer,
+    WalletSerializer,
+)
+from wallets.services import add_pending_changes
+from wallets.statements import wallet_statement
+
+
+@contextmanager
+def model_validation_errors():
+    """
+    Report model-level validation errors (e.g. balance checks) as 400 responses
+    """
+    try:
+        yield
+    except DjangoValidationError as exc:
+        raise serializers.ValidationError(exc.messages)
+
+
+# The unique constraint of the plain table, or the txid registry's primary key once
+# the table is partitioned (see wallets.partitioning)
+TXID_CONSTRAINTS = {
+    f"{Transaction._meta.db_table}_txid_key",
+    f"{Transaction._meta.db_table}_txid_pkey",
+}
+
+
+def is_txid_collision(exc: IntegrityError) -> bool:
+    diag = getattr(exc.__cause__, "diag", None)
+    if diag is not None:
+        return diag.constraint_name in TXID_CONSTRAINTS
+    # SQLite only names the columns
+    return f"{Transaction._meta.db_table}.txid" in str(exc)
+
+
+@contextmanager
+def txid_collisions():
+    """
+    Report a txid taken by another transaction as a 400 response
+    Uniqueness is left to the unique index instead of a query before every write.
+    Other integrity errors are raised as they are
+    """
+    try:
+        yield
+    except IntegrityError as exc:
+        if not is_txid_collision(exc):
+            raise
+        raise serializers.ValidationError(
+            {"txid": ["Transaction with this txid already exists."]}
+        )
+
+
+class CachedResponseMixin:
+    """
+    Serves successful responses from the wallet cache, keyed by path and media type
+    """
+
+    cached_headers = ("ETag", "Last-Modified", "Cache-Control")
+
+    def cached_response(self, scope, handler, request, *args, **kwargs):
+        key = wallet_cache.make_key(
+            scope, request.get_full_path(), request.accepted_media_type
+        )
+        cached = None
+        # Clients reading their own writes skip entries filled from a lagging replica
+        if not (settings.WALLETS_READ_REPLICAS and pinned_to_primary(request)):
+            cached = wallet_cache.get(key)
+        if cached is not None:
+            content, content_type, headers = cached
+            # Entries are dropped on every change, so a cached ETag is current
+            response = None
+            if "ETag" in headers:
+                response = get_conditional_response(request, etag=headers["ETag"])
+            if response is None:
+                response = HttpResponse(content, content_type=content_type)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response = self.finalize_response(request, response, *args, **kwargs)
+            # Rendered before the middleware attaches its render timing callback
+            with timed("render"):
+                response.render()
+            headers = {
+                name: response[name]
+                for name in self.cached_headers
+                if response.has_header(name)
+            }
+            # A replica may lag behind a change whose invalidation already happened, so
+            # what it returned is only cached for as long as reads stick to the primary
+            timeout = None
+            if getattr(self, "replica_read", False):
+                timeout = settings.WALLETS_REPLICA_STICKY_SECONDS
+            wallet_cache.set(
+                key, (response.content, response["Content-Type"], headers), timeout
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    List and retrieve read from a `WALLETS_READ_REPLICAS` replica
+    Unless an outer block chose the database already, or the client wrote recently and
+    must read its own writes (see `wallets.routers`)
+    """
+
+    replica_read = False
+
+    def replica_response(self, handler, request, *args, **kwargs):
+        if (
+            not settings.WALLETS_READ_REPLICAS
+            or read_target.get() is not None
+            or pinned_to_primary(request)
+        ):
+            return handler(request, *args, **kwargs)
+        self.replica_read = True
+        with read_from(REPLICA):
+            return handler(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.replica_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.replica_response(super().retrieve, request, *args, **kwargs)
+
+
+class PreconditionFailed(exceptions.APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource has changed since it was read (If-Match)."
+    default_code = "precondition_failed"
+
+
+class ConditionalMixin:
+    """
+    Strong ETags and Last-Modified on list and retrieve, and `If-Match` on updates
+    The ETag hashes the columns read for the rows shown, after `prepare` (e.g. with
+    pending deposits added), their `updated_at` where it is read, the pagination and
+    the representation (query string and media type). `If-None-Match` is answered from
+    a probe reading the same rows, without serializing or rendering them. Responses
+    with `include` get no ETag
+    """
+
+    conditional_actions = ("list", "retrieve")
+    last_modified_fields = ("updated_at",)
+    # Read for lists without a sparse fieldset, to send their Last-Modified
+    list_validator_columns = ("updated_at",)
+    lock_object = False
+    prepared = None
+
+    def is_conditional(self, request) -> bool:
+        return self.action in self.conditional_actions and not self.get_includes()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.lock_object:
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def get_columns(self, builder, queryset) -> list[str]:
+        columns = super().get_columns(builder, queryset)
+        if self.get_sparse_fieldset(builder.resource_type) is None:
+            columns += self.list_validator_columns
+        return list(dict.fromkeys(columns))
+
+    def prepare(self, items) -> None:
+        super().prepare(items)
+        self.prepared = items
+
+    def get_validators(self, request, pagination=None):
+        """
+        ETag and last modification time of the rows prepared for the response
+        """
+        builder, _ = self.get_builders()
+        extra = self.list_validator_columns
+        if self.action != "list":
+            extra = self.last_modified_fields
+        columns = list(dict.fromkeys([*builder.columns, *extra]))
+        modified = [name for name in self.last_modified_fields if name in columns]
+        rows = [
+            item if isinstance(item, dict) else item.__dict__ for item in self.prepared
+        ]
+        state = [[row.get(column) for column in columns] for row in rows]
+        payload = json.dumps(
+            [request.get_full_path(), request.accepted_media_type, state, pagination],
+            default=str,
+        )
+        etag = quote_etag(hashlib.sha256(payload.encode()).hexdigest()[:32])
+        last_modified = max(
+            (
+                row[name]
+                for row in rows
+                for name in modified
+                if row.get(name) is not None
+            ),
+            default=None,
+        )
+        return etag, last_modified
+
+    def get_pagination(self, data):
+        return {name: value for name, value in data.items() if name != "results"}
+
+    def probe(self, request):
+        """
+        Validators of the response, from the rows it would show
+        """
+        if self.action == "retrieve":
+            self.get_object()
+            return self.get_validators(request)
+
+        builder, _ = self.get_builders()
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(*self.get_columns(builder, queryset))
+        if self.paginate_queryset(queryset) is None:
+            self.prepare(list(queryset))
+            return self.get_validators(request)
+        response = self.paginator.get_paginated_response(ResourceList())
+        return self.get_validators(request, self.get_pagination(response.data))
+
+    def set_validators(self, response, etag, last_modified):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        # Revalidate every time instead of a heuristic freshness from Last-Modified
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return handler(request, *args, **kwargs)
+        if "If-None-Match" in request.headers:
+            etag, last_modified = self.probe(request)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return self.set_validators(response, etag, last_modified)
+
+        self.prepared = None
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and self.prepared is not None:
+            pagination = None
+            if self.action == "list" and isinstance(response.data, dict):
+                pagination = self.get_pagination(response.data)
+            self.set_validators(response, *self.get_validators(request, pagination))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        if "If-Match" not in request.headers:
+            return super().update(request, *args, **kwargs)
+
+        with transaction.atomic():
+            # The row stays locked until the update, so the check cannot go stale
+            self.lock_object = True
+            self.prepare([self.get_object()])
+            etag, _ = self.get_validators(request)
+            etags = parse_etags(request.headers["If-Match"])
+            if "*" not in etags and etag not in etags:
+                raise PreconditionFailed()
+            return super().update(request, *args, **kwargs)
+
+
+class IdempotencyKeyReused(exceptions.APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Idempotency-Key was already used with a different request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotentCreateMixin:
+    """
+    Replays the stored response when a create is retried with the same `Idempotency-Key`
+    Only successful responses are stored, failed requests can be retried as they are
+    """
+
+    idempotency_header = "Idempotency-Key"
+
+    def get_request_fingerprint(self, request) -> str:
+        payload = json.dumps(
+            [request.method, request.path, request.data], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+
+        max_length = IdempotencyKey._meta.get_field("key").max_length
+        if not key or len(key) > max_length:
+            raise serializers.ValidationError(
+                {
+                    self.idempotency_header: [
+                        f"Must be between 1 and {max_length} characters."
+                    ]
+                }
+            )
+
+        fingerprint = self.get_request_fingerprint(request)
+        with transaction.atomic():
+            # Blocks while a request with the same key is in flight
+            record, created = IdempotencyKey.objects.claim(key, fingerprint)
+            if not created:
+                return self.replay(record, fingerprint)
+
+            response = super().create(request, *args, **kwargs)
+            response = self.finalize_response(request, response, *args, **kwargs)
+            with timed("render"):
+                response.render()
+            record.status_code = response.status_code
+            record.content_type = response["Content-Type"]
+            record.content = response.content.decode()
+            record.save(update_fields=["status_code", "content_type", "content"])
+        return response
+
+    def replay(self, record, fingerprint):
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyReused()
+        response = HttpResponse(
+            record.content,
+            status=record.status_code,
+            content_type=record.content_type,
+        )
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+
+RESOURCE_BUILDERS = {}
 
 
-class WalletViewSet(views.ModelViewSet):
+def get_resource_builder(serializer_class) -> ResourceBuilder:
+    if serializer_class not in RESOURCE_BUILDERS:
+        RESOURCE_BUILDERS[serializer_class] = ResourceBuilder(serializer_class)
+    return RESOURCE_BUILDERS[serializer_class]
+
+
+class FastListMixin:
+    """
+    Builds list documents from `values()` rows instead of serializer instances
+    Only the columns of the requested sparse fieldsets are read, on the regular
+    serializer path too. Relationships in `included_viewsets` are included with one
+    query each (a join on the serializer path); any other `include` takes the regular
+    serializer path, which rejects it
+    """
+
+    fast_list = True
+    renderer_classes = [FastJSONRenderer]
+    # Included relationship -> viewset of the related resources
+    included_viewsets = {}
+    # Columns read besides those of the serialized fields
+    extra_columns = ()
+    projected_actions = ("list", "retrieve")
+
+    @staticmethod
+    def prepare_rows(rows):
+        """
+        Adjust rows (or instances) read for the response before they are rendered
+        """
+
+    def get_resource_builder(self):
+        return get_resource_builder(self.get_serializer_class())
+
+    def get_sparse_fieldset(self, resource_type):
+        value = self.request.query_params.get(f"fields[{resource_type}]")
+        return None if value is None else value.split(",")
+
+    def get_includes(self) -> list[str]:
+        value = self.request.query_params.get("include")
+        return value.split(",") if value else []
+
+    def get_builders(self):
+        """
+        Builders of the primary resources and of the included ones, by relationship
+        Included relationships missing from a sparse fieldset are not included
+        """
+        builder = self.get_resource_builder()
+        fields = self.get_sparse_fieldset(builder.resource_type)
+        if fields is not None:
+            builder = builder.select(fields)
+
+        included = {}
+        for name in self.get_includes():
+            if name in self.included_viewsets and builder.get_relationship(name):
+                related = get_resource_builder(
+                    self.included_viewsets[name].serializer_class
+                )
+                fields = self.get_sparse_fieldset(related.resource_type)
+                included[name] = related if fields is None else related.select(fields)
+        return builder, included
+
+    def get_columns(self, builder, queryset) -> list[str]:
+        # Sort fields are read too, cursors are built from them
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        columns = [*builder.columns, *self.extra_columns]
+        columns += [
+            field.lstrip("-") for field in ordering if field.lstrip("-") != "pk"
+        ]
+        return list(dict.fromkeys(columns))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.projected_actions:
+            _, included = self.get_builders()
+            if included:
+                queryset = queryset.select_related(*included)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        sparse = any(param.startswith("fields[") for param in self.request.query_params)
+        if not sparse or self.action not in self.projected_actions:
+            return queryset
+
+        builder, included = self.get_builders()
+        columns = self.get_columns(builder, queryset)
+        for name, related in included.items():
+            viewset = self.included_viewsets[name]
+            columns += [
+                f"{name}__{column}"
+                for column in [*related.columns, *viewset.extra_columns]
+            ]
+        return queryset.only(*columns)
+
+    def prepare(self, items) -> None:
+        """
+        Prepare rows or instances read for the response, and the related instances
+        joined to them for `include`
+        """
+        self.prepare_rows(items)
+        _, included = self.get_builders()
+        for name in included:
+            related = [
+                getattr(item, name) for item in items if not isinstance(item, dict)
+            ]
+            self.included_viewsets[name].prepare_rows(
+                [instance for instance in related if instance is not None]
+            )
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method in SAFE_METHODS:
+            self.prepare([instance])
+        return instance
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.prepare(page)
+        return page
+
+    def use_fast_list(self, request):
+        return self.fast_list and all(
+            name in self.included_viewsets for name in self.get_includes()
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list(request):
+            return super().list(request, *args, **kwargs)
+
+        builder, included = self.get_builders()
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.values(*self.get_columns(builder, queryset))
+
+        page = self.paginate_queryset(queryset)
+        rows = page
+        if page is None:
+            rows = list(queryset)
+            self.prepare(rows)
+
+        resources = builder.build_many(rows)
+        resources.included = self.build_included(builder, included, rows)
+        if page is not None:
+            return self.get_paginated_response(resources)
+        return Response(resources)
+
+    def build_included(self, builder, included, rows):
+        """
+        Related resources of the rows, each read once, in the order JSONRenderer uses
+        """
+        resources = {}
+        for name, related in included.items():
+            column, _ = builder.get_relationship(name)
+            ids = {row[column] for row in rows if row[column] is not None}
+            if not ids:
+                continue
+            viewset = self.included_viewsets[name]
+            related_rows = list(
+                viewset.queryset.filter(pk__in=ids).values(
+                    *dict.fromkeys([*related.columns, *viewset.extra_columns])
+                )
+            )
+            viewset.prepare_rows(related_rows)
+            for resource in related.build_many(related_rows):
+                resources[(resource["type"], resource["id"])] = resource
+        return ResourceList(resources[key] for key in sorted(resources))
+
+
+class WalletViewSet(
+    CachedResponseMixin,
+    ReplicaReadMixin,
+    ConditionalMixin,
+    FastListMixin,
+    views.ModelViewSet,
+):
     """
     API endpoint for wallets
     Balance is read-only and calculated automatically
@@ -24,19 +559,237 @@ class WalletViewSet(views.ModelViewSet):
         "delete",
     ]  # IDK what methods are needed (like can we delete wallet? Depends on requirements)
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    ordering_fields = ["id", "label"]
+    filterset_class = WalletFilter
+    ordering_fields = [
+        "id",
+        "label",
+        "balance",
+        "transaction_count",
+        "total_credits",
+        "total_debits",
+        "last_transaction_at",
+    ]
     ordering = ["id", "label"]
 
+    # Pending deposits of hot wallets are added to what is read
+    extra_columns = ("is_hot",)
+    prepare_rows = staticmethod(add_pending_changes)
+    last_modified_fields = ("updated_at", "last_transaction_at")
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(LIST_SCOPE, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not kwargs["pk"].isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(
+            int(kwargs["pk"]), super().retrieve, request, *args, **kwargs
+        )
+
+    statement_builder = ResourceBuilder(StatementBucketSerializer)
+
+    @action(detail=True, methods=["get"], url_path="statement")
+    def statement(self, request, *args, **kwargs):
+        """
+        Opening and closing balance, credits and debits per `interval` (hour, day or
+        month) from `start` until `end`
+        Statements with an explicit `end` are cached until the wallet changes
+        """
+        if "end" not in request.query_params or not kwargs["pk"].isdigit():
+            return self.get_statement(request, *args, **kwargs)
+        return self.cached_response(
+            int(kwargs["pk"]), self.get_statement, request, *args, **kwargs
+        )
+
+    def get_statement(self, request, *args, **kwargs):
+        wallet = self.get_object()
+        serializer = StatementQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        opening, buckets = wallet_statement(wallet, **serializer.validated_data)
+
+        rows = [
+            {"id": f"{wallet.pk}:{bucket.start:%Y-%m-%dT%H:%M:%SZ}", **asdict(bucket)}
+            for bucket in buckets
+        ]
+        balance_field = StatementBucketSerializer().fields["opening_balance"]
+        meta = StatementQuerySerializer(serializer.validated_data).data
+        meta["opening_balance"] = balance_field.to_representation(opening)
+        return Response(
+            {"results": self.statement_builder.build_many(rows), "meta": meta}
+        )
+
 
-class TransactionViewSet(views.ModelViewSet):
+class TransactionViewSet(
+    IdempotentCreateMixin,
+    ReplicaReadMixin,
+    ConditionalMixin,
+    FastListMixin,
+    views.ModelViewSet,
+):
     """
     API endpoint for transactions
     Creates, updates, and deletes transactions, modifying the wallet balance
     """
 
-    queryset = Transaction.objects.select_related("wallet").all()
+    queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
+    included_viewsets = {"wallet": WalletViewSet}
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_class = TransactionFilter
+    pagination_class = JsonApiCursorPagination
     ordering_fields = ["amount", "created_at", "txid"]
     ordering = ["-created_at"]
+    # Lists stay index-only scans of the covering indexes, without Last-Modified
+    list_validator_columns = ()
+
+    bulk_max_size = 10000
+    export_fields = ("id", "wallet", "txid", "amount", "created_at")
+    export_chunk_size = 2000
+
+    def perform_create(self, serializer):
+        with model_validation_errors(), txid_collisions():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with model_validation_errors(), txid_collisions():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with model_validation_errors():
+            instance.delete()
+
+    def get_serializer_class(self):
+        if self.action == "bulk_create":
+            return BulkTransactionSerializer
+        return super().get_serializer_class()
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        parser_classes=[BulkJSONParser],
+    )
+    def bulk_create(self, request, *args, **kwargs):
+        """
+        Create a batch of transactions all-or-nothing
+        Errors are reported per item, in the order items were sent
+        """
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.bulk_max_size
+        )
+        serializer.is_valid(raise_exception=True)
+        # Another writer may store one of the txids after validation
+        with model_validation_errors(), txid_collisions():
+            serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, *args, **kwargs):
+        """
+        Stream filtered transactions as NDJSON (default) or CSV (`export_format=csv`)
+        Rows are read through a server-side cursor, so memory use does not grow
+        with the size of the export
+        """
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format not in EXPORT_FORMATS:
+            raise serializers.ValidationError(
+                {"export_format": [f"Must be one of: {', '.join(EXPORT_FORMATS)}."]}
+            )
+        content_type, lines = EXPORT_FORMATS[export_format]
+
+        queryset = self.filter_queryset(Transaction.objects.all())
+        rows = queryset.values_list(*self.export_fields).iterator(
+            chunk_size=self.export_chunk_size
+        )
+        response = StreamingHttpResponse(
+            lines(self.export_fields, rows), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="transactions.{export_format}"'
+        )
+        return response
+
+
+class TransferViewSet(viewsets.GenericViewSet):
+    """
+    API endpoint for transfers between wallets
+    Accepts one transfer or a list of them, booked all-or-nothing
+    """
+
+    serializer_class = TransferSerializer
+    parser_classes = [BulkJSONParser]
+    max_size = 5000
+
+    def create(self, request, *args, **kwargs):
+        many = isinstance(request.data, list)
+        serializer = self.get_serializer(
+            data=request.data if many else [request.data],
+            many=True,
+            max_length=self.max_size,
+        )
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if not many and isinstance(errors, list):
+                errors = errors[0]
+            raise serializers.ValidationError(errors)
+
+        try:
+            with model_validation_errors():
+                serializer.save()
+        except IntegrityError:
+            # Another writer stored one of the txids after validation
+            raise serializers.ValidationError(
+                {"txid": ["Transfer with this txid already exists."]}
+            )
+
+        if many:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        child = self.get_serializer(serializer.instance[0])
+        return Response(child.data, status=status.HTTP_201_CREATED)
+
+
+@require_GET
+def metrics(request):
+    """
+    Request and cache metrics of this process in the Prometheus text format
+    """
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
+def get_schema_format(request):
+    return request.GET.get("format", "yaml")
+
+
+def schema_etag(request):
+    if get_schema_format(request) in SCHEMA_FORMATS:
+        return f"{code_version()}-{get_schema_format(request)}"
+    return None
+
+
+@require_safe
+@condition(etag_func=schema_etag)
+def schema(request):
+    """
+    OpenAPI schema of the running code version, generated once per version
+    `?format=json` for JSON. Clients revalidate with the code version as ETag
+    """
+    schema_format = get_schema_format(request)
+    if schema_format not in SCHEMA_FORMATS:
+        raise Http404(f"Unknown schema format: {schema_format}")
+    try:
+        content = get_schema(schema_format)
+    except FileNotFoundError:
+        raise Http404("Schema not generated: python manage.py build_schema")
+    _, content_type = SCHEMA_FORMATS[schema_format]
+    response = HttpResponse(content, content_type=f"{content_type}; charset=utf-8")
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@api_view(["GET"])
+@renderer_classes([JSONRenderer])
+def cache_stats(request):
+    """
+    Hit and miss counters of the wallet cache in this process
+    """
+    return Response(wallet_cache.get_stats())